@@ -2,34 +2,50 @@
 """
 PDF Password Remover
 A GUI application to remove passwords from PDF files
+Run with --profile-startup to print how long each step of the start takes.
 GitHub: https://github.com/yourusername/pdf-password-remover
 """
 
+import sys
+
+from pdfunlocker.startup import StartupProfile
+
+# Times the start from here when run with --profile-startup
+PROFILE = StartupProfile()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkinter import scrolledtext
 import os
 import time
-import shutil
-import tempfile
-import sys
-import webbrowser
-from datetime import datetime
 
-# Try to import PDF libraries
-try:
-    import pikepdf
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+# pikepdf is imported in the background once the window is up, and the
+# candidate sources (mask, wordlist, Markov model) when first used
+from pdfunlocker import core, stats
+from pdfunlocker.background import SearchThread, UPDATE_INTERVAL_MS
+from pdfunlocker.cache import TriedCache
+from pdfunlocker.dedup import deduplicate
+from pdfunlocker.engine import default_workers
+from pdfunlocker.logconsole import FLUSH_INTERVAL_MS, LogConsole
+from pdfunlocker.rules import RuleSet
+from pdfunlocker.schedule import Scheduler, WordSource
+from pdfunlocker.session import Session
+
+PROFILE.mark("imports")
 
 # Version
 VERSION = "1.0.0"
 GITHUB_URL = "https://github.com/yourusername/pdf-password-remover"
 
+# How the mask is used: on its own, or added to every common password and wordlist word
+MASK_ONLY = "Mask only"
+MASK_AFTER_WORDS = "After each word"
+MASK_BEFORE_WORDS = "Before each word"
+
 class PDFUnlockerApp:
-    def __init__(self, root):
+    def __init__(self, root, profile=None):
         self.root = root
+        self.profile = profile or StartupProfile(enabled=False)
         self.root.title(f"PDF Password Remover v{VERSION}")
         self.root.geometry("850x700")
         
@@ -39,19 +55,60 @@ class PDFUnlockerApp:
         # Variables
         self.pdf_file = ""
         self.password = ""
+        self.owner_only = False
         self.unlocked_file = ""
-        self.temp_dir = tempfile.mkdtemp(prefix="pdf_unlocker_")
+        self.verifier = None
+        self.verifier_file = ""
+        self.search_thread = None
+        self.library_thread = None
+        self.wordlist = None
+        self.wordlist_count = None  # Known once counted in the background
+        self.markov = None
+        
+        # Log lines are shown in batches and kept in full on disk
+        self.console = LogConsole()
         
-        # Common passwords to try
-        self.common_passwords = self.load_common_passwords()
+        # Common passwords to try (variations are generated lazily)
+        self.rules = RuleSet()
+        self.common_count = core.common_password_count(self.rules)
         
         # Setup UI
         self.setup_ui()
+        self.profile.mark("widgets")
         
-        # Check library
-        if not PDF_AVAILABLE:
+        # Check library (only whether it is installed: importing it waits
+        # until the window is shown, see load_pdf_library)
+        if not core.PDF_AVAILABLE:
+            self.show_library_error()
+        
+        self.root.after(FLUSH_INTERVAL_MS, self.flush_log)
+    
+    def load_pdf_library(self):
+        """Import pikepdf on a background thread (called once the window is shown)"""
+        if not core.PDF_AVAILABLE:
+            return
+        import threading
+        self.library_thread = threading.Thread(
+            target=self.profile.run, args=("pikepdf (background)", core.load_pdf_library),
+            daemon=True)
+        self.library_thread.start()
+        self.root.after(UPDATE_INTERVAL_MS, self.check_pdf_library)
+    
+    def check_pdf_library(self):
+        """Show the setup screen if pikepdf turned out to be unusable"""
+        if self.library_thread.is_alive():
+            self.root.after(UPDATE_INTERVAL_MS, self.check_pdf_library)
+            return
+        if self.profile.enabled:
+            self.log_message(f"Startup: {self.profile.summary()}")
+        if not core.PDF_AVAILABLE:
             self.show_library_error()
     
+    def open_github(self):
+        """Open the project page in the default browser"""
+        import webbrowser
+        webbrowser.open(GITHUB_URL)
+    
     def set_icon(self):
         """Try to set window icon"""
         icon_paths = [
@@ -68,61 +125,6 @@ class PDFUnlockerApp:
                 except:
                     pass
     
-    def load_common_passwords(self):
-        """Load common passwords for brute force attack"""
-        passwords = [
-            # Most common passwords worldwide
-            "", "123456", "password", "12345678", "qwerty",
-            "123456789", "12345", "1234", "111111", "1234567",
-            "dragon", "123123", "admin", "welcome", "monkey",
-            "letmein", "password1", "abc123", "123", "login",
-            
-            # Common variations
-            "passw0rd", "master", "hello", "test", "demo",
-            "admin123", "letmein123", "welcome123", "password123",
-            "123qwe", "1q2w3e4r", "qazwsx", "password@123",
-            
-            # Year based
-            "2020", "2021", "2022", "2023", "2024", "2025",
-            "2019", "2018", "2017",
-            
-            # Simple words
-            "sunshine", "iloveyou", "trustno1", "superman",
-            "mustang", "football", "baseball", "starwars",
-            "computer", "corona2020", "covid19",
-            
-            # Business/Office
-            "company", "business", "work", "office", "home",
-            "user", "client", "customer", "member", "guest",
-            "employee", "staff", "manager", "director", "owner",
-            
-            # Common defaults
-            "changeme", "default", "temp", "temp123", "pass",
-            "access", "secret", "private", "god", "love",
-        ]
-        
-        # Add some variations
-        variations = []
-        for pwd in passwords:
-            if pwd:  # Skip empty for variations
-                variations.extend([
-                    pwd,
-                    pwd.upper(),
-                    pwd + "!",
-                    pwd + "@",
-                    pwd + "#",
-                    pwd + "$",
-                    pwd + "123",
-                    pwd + "456",
-                    pwd + "789",
-                ])
-        
-        # Add empty password
-        variations.append("")
-        
-        # Remove duplicates and return
-        return list(set(variations))[:200]  # Limit to 200 passwords
-    
     def show_library_error(self):
         """Show library installation error"""
         for widget in self.root.winfo_children():
@@ -150,7 +152,7 @@ class PDFUnlockerApp:
                   command=self.install_library, width=15).pack(side=tk.LEFT, padx=5)
         
         ttk.Button(btn_frame, text="📖 View GitHub", 
-                  command=lambda: webbrowser.open(GITHUB_URL), width=15).pack(side=tk.LEFT, padx=5)
+                  command=self.open_github, width=15).pack(side=tk.LEFT, padx=5)
         
         ttk.Button(btn_frame, text="🚪 Exit", 
                   command=self.root.quit, width=15).pack(side=tk.LEFT, padx=5)
@@ -292,7 +294,7 @@ class PDFUnlockerApp:
         
         # GitHub button
         ttk.Button(title_frame, text="GitHub", 
-                  command=lambda: webbrowser.open(GITHUB_URL),
+                  command=self.open_github,
                   width=8).pack(side=tk.RIGHT)
         
         # Help button
@@ -335,13 +337,29 @@ class PDFUnlockerApp:
         quick_frame = ttk.Frame(pass_frame)
         quick_frame.pack(fill=tk.X, pady=(0, 10))
         
-        ttk.Button(quick_frame, text="Try Common Passwords", 
-                  command=self.try_common_passwords,
-                  width=20).pack(side=tk.LEFT, padx=(0, 10))
+        self.try_btn = ttk.Button(quick_frame, text="Try Common Passwords", 
+                                 command=self.try_common_passwords,
+                                 width=20)
+        self.try_btn.pack(side=tk.LEFT, padx=(0, 10))
         
         ttk.Button(quick_frame, text="Check If Encrypted", 
                   command=self.check_encryption,
-                  width=18).pack(side=tk.LEFT)
+                  width=18).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(quick_frame, text="Wordlist...", 
+                  command=self.browse_wordlist,
+                  width=12).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(quick_frame, text="Markov...", 
+                  command=self.browse_markov_corpus,
+                  width=10).pack(side=tk.LEFT)
+        
+        # Worker processes for the search
+        self.workers_var = tk.IntVar(value=default_workers())
+        ttk.Spinbox(quick_frame, from_=1, to=max(64, default_workers()),
+                   textvariable=self.workers_var,
+                   width=4).pack(side=tk.RIGHT)
+        ttk.Label(quick_frame, text="Workers:").pack(side=tk.RIGHT, padx=(0, 5))
         
         # Manual password entry
         manual_frame = ttk.Frame(pass_frame)
@@ -362,9 +380,30 @@ class PDFUnlockerApp:
         ttk.Button(manual_frame, text="Test Password", 
                   command=self.test_manual_password).pack(side=tk.LEFT)
         
+        # Rule options
+        self.mutate_wordlist_var = tk.BooleanVar()
+        ttk.Checkbutton(pass_frame, text="Apply variation rules to wordlist", 
+                       variable=self.mutate_wordlist_var).pack(anchor='w', pady=(5, 0))
+        
+        # Mask attack (replaces the lists when filled in, or is combined with their words)
+        mask_frame = ttk.Frame(pass_frame)
+        mask_frame.pack(fill=tk.X, pady=(5, 0))
+        
+        ttk.Label(mask_frame, text="Mask:").pack(side=tk.LEFT)
+        self.mask_var = tk.StringVar()
+        ttk.Entry(mask_frame, textvariable=self.mask_var, 
+                 width=30).pack(side=tk.LEFT, padx=10)
+        self.mask_mode_var = tk.StringVar(value=MASK_ONLY)
+        ttk.Combobox(mask_frame, textvariable=self.mask_mode_var,
+                    values=[MASK_ONLY, MASK_AFTER_WORDS, MASK_BEFORE_WORDS],
+                    state='readonly', width=16).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Label(mask_frame, text="e.g. ?u?l?l?l?d?d  (?l ?u ?d ?s ?a)", 
+                 font=('Arial', 9)).pack(side=tk.LEFT)
+        
         # Password stats
         self.pass_stats = ttk.Label(pass_frame, 
-                                   text=f"Common passwords loaded: {len(self.common_passwords)}",
+                                   text=f"Common passwords: up to {self.common_count} "
+                                        f"({len(self.rules)} variation rules)",
                                    font=('Arial', 9))
         self.pass_stats.pack(anchor='w', pady=(5, 0))
     
@@ -424,7 +463,7 @@ class PDFUnlockerApp:
                                     style="Primary.TButton")
         self.unlock_btn.pack(side=tk.LEFT, padx=(0, 10))
         
-        self.save_btn = ttk.Button(action_frame, text="💾 Save Unlocked PDF", 
+        self.save_btn = ttk.Button(action_frame, text="💾 Save Another Copy", 
                                   command=self.save_unlocked_pdf,
                                   state='disabled',
                                   width=20)
@@ -435,6 +474,14 @@ class PDFUnlockerApp:
                                   state='disabled',
                                   width=20)
         self.open_btn.pack(side=tk.LEFT)
+        
+        # How the unlocked copy is written
+        self.save_profile_var = tk.StringVar(value=core.DEFAULT_SAVE_PROFILE)
+        ttk.Combobox(action_frame, textvariable=self.save_profile_var,
+                    values=list(core.SAVE_PROFILES),
+                    state='readonly',
+                    width=10).pack(side=tk.RIGHT)
+        ttk.Label(action_frame, text="Save profile:").pack(side=tk.RIGHT, padx=(0, 5))
     
     def setup_status_bar(self):
         """Setup status bar"""
@@ -458,8 +505,7 @@ Features:
 How to Use:
 1. Click 'Browse' to select a PDF file
 2. Click 'Try Common Passwords' or enter password manually
-3. Click 'Unlock PDF' to remove password
-4. Click 'Save Unlocked PDF' to save the file
+3. Click 'Unlock PDF' and choose where to save the unlocked file
 
 Requirements:
 - Python 3.6 or higher
@@ -487,12 +533,110 @@ Note: Use only on PDF files you own or have permission to unlock.
         )
         
         if filename:
+            if filename != self.pdf_file:
+                # A password found for the previous file does not apply to this one
+                self.password = ""
+                self.owner_only = False
+                self.unlock_btn.config(state='disabled')
+                self.save_btn.config(state='disabled')
             self.pdf_file = filename
             self.file_var.set(filename)
             
             # Update file info
             self.update_file_info()
     
+    def browse_wordlist(self):
+        """Add a wordlist file (plain or gzip/xz/zstd) to the search"""
+        filename = filedialog.askopenfilename(
+            title="Select Wordlist",
+            filetypes=[("Wordlists", "*.txt *.lst *.dic *.gz *.xz *.zst"),
+                       ("All files", "*.*")]
+        )
+        
+        if not filename:
+            return
+        
+        from pdfunlocker.wordlist import Wordlist
+        try:
+            wordlist = Wordlist(filename)
+        except Exception as e:
+            self.wordlist = None
+            messagebox.showerror("Error", f"Cannot use wordlist:\n{str(e)}")
+            return
+        self.wordlist = wordlist
+        self.wordlist_count = None
+        
+        if wordlist.compression is not None:
+            # Only a full decompression could count it
+            self.show_wordlist(wordlist.compression)
+            return
+        
+        # Counting reads the whole file: do it off the event loop
+        import threading
+        counted = {}
+        
+        def count():
+            try:
+                counted["count"] = wordlist.count()
+            except OSError as e:
+                counted["error"] = e
+        
+        thread = threading.Thread(target=count, daemon=True)
+        thread.start()
+        self.pass_stats.config(text=f"Common passwords: up to {self.common_count}"
+                                    f" + wordlist {os.path.basename(wordlist.path)}"
+                                    f" (counting...)")
+        self.root.after(UPDATE_INTERVAL_MS, self.check_wordlist_count, wordlist, thread, counted)
+    
+    def check_wordlist_count(self, wordlist, thread, counted):
+        """Show the wordlist's size once the background count is done"""
+        if thread.is_alive():
+            self.root.after(UPDATE_INTERVAL_MS, self.check_wordlist_count,
+                            wordlist, thread, counted)
+            return
+        if wordlist is not self.wordlist:
+            return  # Another wordlist was picked meanwhile
+        if "error" in counted:
+            self.wordlist = None
+            messagebox.showerror("Error", f"Cannot use wordlist:\n{counted['error']}")
+            return
+        self.wordlist_count = counted["count"]
+        self.show_wordlist(f"{self.wordlist_count} passwords")
+    
+    def show_wordlist(self, size):
+        name = os.path.basename(self.wordlist.path)
+        self.log_message(f"Wordlist: {name} ({size})")
+        self.pass_stats.config(text=f"Common passwords: up to {self.common_count}"
+                                    f" + wordlist {name} ({size})")
+    
+    def browse_markov_corpus(self):
+        """Train a Markov model on a password file and add its candidates"""
+        filename = filedialog.askopenfilename(
+            title="Select Password Corpus for the Markov Model",
+            filetypes=[("Wordlists", "*.txt *.lst *.dic *.gz *.xz *.zst"),
+                       ("All files", "*.*")]
+        )
+        
+        if not filename:
+            return
+        
+        from pdfunlocker.markov import MarkovSource
+        from pdfunlocker.wordlist import Wordlist
+        try:
+            Wordlist(filename)  # Readable, and its compression is supported
+            self.markov = MarkovSource(filename)
+        except Exception as e:
+            self.markov = None
+            messagebox.showerror("Error", f"Cannot use corpus:\n{str(e)}")
+            return
+        
+        # The model is trained (or read from the cache) when the search starts
+        name = os.path.basename(filename)
+        self.log_message(f"Markov corpus: {name} (order {self.markov.order}, "
+                         f"length {self.markov.min_length}-{self.markov.max_length})")
+        self.pass_stats.config(text=f"Common passwords: up to {self.common_count}"
+                                    f" + Markov model of {name}")
+    
     def update_file_info(self):
         """Update file information display"""
         if not self.pdf_file:
@@ -509,12 +653,33 @@ Note: Use only on PDF files you own or have permission to unlock.
                 self.file_info.config(text=info_text, foreground="green")
                 self.log_message(f"Selected: {os.path.basename(self.pdf_file)}")
                 self.update_status(f"File selected: {os.path.basename(self.pdf_file)}")
+                self.detect_owner_only()
             else:
                 self.file_info.config(text="✗ File not found", foreground="red")
                 self.log_message(f"Error: File not found")
         except Exception as e:
             self.file_info.config(text=f"✗ Error: {str(e)[:50]}", foreground="red")
     
+    def detect_owner_only(self):
+        """Enable unlocking straight away when only an owner password is set"""
+        self.owner_only = False
+        try:
+            info = core.check_encryption(self.pdf_file)
+        except Exception:
+            return False
+        if info.owner_only:
+            self.use_owner_only()
+        return self.owner_only
+    
+    def use_owner_only(self):
+        """The empty user password opens the file: skip guessing"""
+        self.owner_only = True
+        self.password = ""
+        self.log_message("✓ Only an owner password is set - no guessing needed")
+        self.log_message("  Click 'Unlock PDF' to remove the restrictions")
+        self.unlock_btn.config(state='normal')
+        self.update_status("Owner password only - ready to unlock")
+    
     def check_encryption(self):
         """Check if PDF is encrypted"""
         if not self.pdf_file:
@@ -525,7 +690,7 @@ Note: Use only on PDF files you own or have permission to unlock.
             messagebox.showerror("Error", "Selected file does not exist")
             return
         
-        if not PDF_AVAILABLE:
+        if not core.PDF_AVAILABLE:
             messagebox.showerror("Error", "PDF library not available")
             return
         
@@ -533,47 +698,55 @@ Note: Use only on PDF files you own or have permission to unlock.
         self.log_message("Checking PDF encryption...")
         
         try:
-            with open(self.pdf_file, 'rb') as f:
-                try:
-                    pdf = pikepdf.Pdf.open(f)
-                    if pdf.is_encrypted:
-                        self.log_message("✓ File is ENCRYPTED (password protected)")
-                        messagebox.showinfo("Encryption Check", 
-                            "This PDF is ENCRYPTED.\n\n"
-                            "You need a password to unlock it.")
-                    else:
-                        self.log_message("✓ File is NOT ENCRYPTED")
-                        messagebox.showinfo("Encryption Check", 
-                            "This PDF is NOT ENCRYPTED.\n\n"
-                            "No password needed to open it.")
-                except pikepdf.PasswordError:
-                    self.log_message("✓ File is ENCRYPTED (password protected)")
-                    messagebox.showinfo("Encryption Check", 
-                        "This PDF is ENCRYPTED.\n\n"
-                        "You need a password to unlock it.")
+            info = core.check_encryption(self.pdf_file)
+            if info.owner_only:
+                self.log_message(f"✓ File is ENCRYPTED - {info.description}")
+                self.use_owner_only()
+                messagebox.showinfo("Encryption Check", 
+                    "This PDF only has an OWNER password.\n\n"
+                    "It opens without a password; click 'Unlock PDF' "
+                    "to remove the printing/copying restrictions.")
+            elif info.encrypted:
+                self.log_message(f"✓ File is ENCRYPTED (password protected) - {info.description}")
+                messagebox.showinfo("Encryption Check", 
+                    "This PDF is ENCRYPTED.\n\n"
+                    "You need a password to unlock it.")
+            else:
+                self.log_message("✓ File is NOT ENCRYPTED")
+                messagebox.showinfo("Encryption Check", 
+                    "This PDF is NOT ENCRYPTED.\n\n"
+                    "No password needed to open it.")
         except Exception as e:
             self.log_message(f"✗ Error checking file: {str(e)}")
             messagebox.showerror("Error", f"Could not check file:\n{str(e)}")
     
     def log_message(self, message):
-        """Add message to log"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.status_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.status_text.see(tk.END)
-        self.root.update()
+        """Add message to log (shown at the next flush)"""
+        self.console.add(message)
+    
+    def flush_log(self):
+        """Insert queued log lines in one go and trim the oldest (runs on a timer)"""
+        text, removed = self.console.flush()
+        if text:
+            self.status_text.insert(tk.END, text)
+            if removed:
+                self.status_text.delete("1.0", f"{removed + 1}.0")
+            self.status_text.see(tk.END)
+        self.root.after(FLUSH_INTERVAL_MS, self.flush_log)
     
     def update_status(self, message):
         """Update status bar"""
         self.status_bar.config(text=f"Status: {message}")
     
     def clear_log(self):
-        """Clear the log"""
+        """Clear the log window (the log file keeps everything)"""
+        self.console.clear()
         self.status_text.delete(1.0, tk.END)
         self.log_message("Log cleared")
     
     def copy_log(self):
-        """Copy log to clipboard"""
-        log_content = self.status_text.get(1.0, tk.END)
+        """Copy the full log to the clipboard"""
+        log_content = self.console.read()
         self.root.clipboard_clear()
         self.root.clipboard_append(log_content)
         self.log_message("Log copied to clipboard")
@@ -588,8 +761,8 @@ Note: Use only on PDF files you own or have permission to unlock.
         
         if filename:
             try:
-                with open(filename, 'w') as f:
-                    f.write(self.status_text.get(1.0, tk.END))
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(self.console.read())
                 self.log_message(f"Log saved to: {filename}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save log:\n{str(e)}")
@@ -604,13 +777,52 @@ Note: Use only on PDF files you own or have permission to unlock.
             messagebox.showerror("Error", "Selected file does not exist")
             return
         
-        if not PDF_AVAILABLE:
+        if not core.PDF_AVAILABLE:
             messagebox.showerror("Error", "PDF library not available")
             return
         
         self.log_message("\n" + "="*50)
+        
+        # Nothing to guess when the empty user password opens the file
+        if self.owner_only or self.detect_owner_only():
+            self.log_message("No search needed - click 'Unlock PDF'")
+            return
+        
+        # A password recovered in an earlier run opens the file at once
+        cache = TriedCache.for_document(self.pdf_file)
+        known = core.recall_password(self.pdf_file, cache)
+        if known is not None:
+            self.password = known
+            display_pass = core.display_password(known)
+            self.log_message(f"✓ Password remembered from an earlier run: {display_pass}")
+            self.update_status(f"Password found: {display_pass}")
+            self.unlock_btn.config(state='normal')
+            messagebox.showinfo("Success", 
+                f"Password found!\n\n"
+                f"Password: {display_pass}\n"
+                f"(remembered from an earlier run)\n\n"
+                f"Click 'Unlock PDF' to remove the password.")
+            return
+        
         self.log_message("Starting common password test...")
-        self.log_message(f"Testing {len(self.common_passwords)} passwords")
+        from pdfunlocker.mask import MaskError
+        try:
+            candidates, total = self.build_candidates()
+        except MaskError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.log_message(f"Testing {total if total is not None else 'all'} passwords")
+        
+        # Offer to pick up where an interrupted search of this document stopped
+        session = Session.for_document(self.pdf_file, self.attack_config())
+        start = session.load()
+        if start and not messagebox.askyesno(
+                "Resume Search",
+                f"A previous search of this document stopped after {start} passwords.\n\n"
+                f"Resume from there?"):
+            start = 0
+        if start:
+            self.log_message(f"Resuming after password {start}")
         
         # Reset progress
         self.progress_var.set(0)
@@ -618,69 +830,181 @@ Note: Use only on PDF files you own or have permission to unlock.
         
         # Disable buttons during process
         self.unlock_btn.config(state='disabled')
+        self.try_btn.config(state='disabled')
+        
+        # Run the search in the background and poll it from the event loop
+        verifier = self.get_verifier()
+        self.search_thread = SearchThread(self.pdf_file, candidates,
+                                          verifier=verifier,
+                                          workers=self.get_workers(),
+                                          total=total,
+                                          start=start,
+                                          session=session,
+                                          cache=cache)
+        self.search_thread.start()
+        self.root.after(UPDATE_INTERVAL_MS, self.poll_search)
+    
+    def build_candidates(self):
+        """Combine the candidate sources; returns (iterable, total or None)"""
+        mask_text = self.mask_var.get().strip()
+        if mask_text:
+            from pdfunlocker.mask import Mask
+            mask = Mask(mask_text)
+            mode = self.mask_mode_var.get()
+            if mode == MASK_ONLY:
+                self.log_message(f"Mask {mask_text}: {mask.keyspace} candidates")
+                return mask, mask.keyspace
+            
+            # Every common password and wordlist word with the mask added to it
+            from pdfunlocker.hybrid import Hybrid
+            words = [core.COMMON_PASSWORDS]
+            if self.wordlist is not None:
+                words.append(self.wordlist)
+            hybrid = Hybrid(words, mask, prepend=(mode == MASK_BEFORE_WORDS))
+            self.log_message(f"Hybrid {hybrid.pattern}")
+            return hybrid, None  # Sized by the search thread: it reads the wordlist
+        
+        # Common passwords and the wordlist interleaved, most likely first
+        schedule = Scheduler([], [core.common_source(self.rules)])
+        total = self.common_count
+        
+        if self.wordlist is not None:
+            count = self.wordlist_count  # None (unknown total) until counted
+            if self.mutate_wordlist_var.get():
+                schedule.add(WordSource(self.wordlist, self.rules, name="wordlist"))
+                count = self.rules.keyspace(count) if count is not None else None
+            else:
+                schedule.add(WordSource(self.wordlist, name="wordlist"))
+            total = total + count if count is not None else None
         
-        # Try passwords
-        found = False
+        if self.markov is not None:
+            schedule.add(self.markov)
+            total = None
         
-        for i, password in enumerate(self.common_passwords):
-            # Update progress
-            progress = (i + 1) / len(self.common_passwords) * 100
-            self.progress_var.set(progress)
-            
-            # Update time
-            elapsed = time.time() - self.start_time
-            self.time_label.config(text=f"Time: {elapsed:.1f}s")
-            
-            # Show which password we're trying
-            display_pass = "''" if password == "" else f"'{password}'"
-            self.update_status(f"Testing: {display_pass}")
-            self.root.update()
-            
-            # Try the password
-            if self.test_password(password):
-                self.password = password
-                elapsed = time.time() - self.start_time
-                
-                self.log_message(f"\n✓ SUCCESS! Password found: {display_pass}")
-                self.log_message(f"✓ Found at attempt #{i+1}")
-                self.log_message(f"✓ Time taken: {elapsed:.1f} seconds")
-                
-                self.update_status(f"Password found: {display_pass}")
-                found = True
-                break
+        # Each candidate once, however the lists and rules overlap
+        verifier = self.get_verifier()
+        revision = verifier.revision if verifier is not None else None
+        return deduplicate(schedule, revision=revision), total
+    
+    def attack_config(self):
+        """Describe the current attack so a saved session can be matched to it"""
+        wordlist = None
+        if self.wordlist is not None:
+            wordlist = [os.path.abspath(self.wordlist.path), os.path.getsize(self.wordlist.path)]
+        mask_text = self.mask_var.get().strip()
+        if mask_text:
+            if self.mask_mode_var.get() == MASK_ONLY:
+                return {"mask": mask_text}
+            return {"mask": mask_text, "hybrid": self.mask_mode_var.get(), "wordlist": wordlist}
+        return {
+            "common_rules": self.rules.rules,
+            "wordlist": wordlist,
+            "mutate": bool(self.mutate_wordlist_var.get()),
+            "markov": [os.path.abspath(self.markov.corpus), self.markov.order]
+                      if self.markov is not None else None,
+            "order": "likelihood",
+            "dedup": True,
+        }
+    
+    def poll_search(self):
+        """Apply queued search events to the UI (runs about 10 times a second)"""
+        thread = self.search_thread
+        if thread is None:
+            return
+        
+        attempts, lines, final = thread.drain()
+        total = thread.total
+        
+        for line in lines:
+            self.log_message(line)
+        
+        if attempts is not None and total:
+            self.progress_var.set(attempts / total * 100)
+        
+        # Live throughput and ETA in the status bar, per-worker rates by the clock
+        snapshot = thread.meter.snapshot()
+        position = snapshot["position"]
+        counted = f"{position}/{total}" if total else f"{position}"
+        self.update_status(f"Testing: {counted} - {stats.describe(snapshot)}")
+        
+        elapsed = time.time() - self.start_time
+        workers = stats.describe_workers(snapshot)
+        time_text = f"Time: {elapsed:.1f}s"
+        if workers:
+            time_text += f"  |  Per worker: {workers}"
+        self.time_label.config(text=time_text)
+        
+        if final is None:
+            self.root.after(UPDATE_INTERVAL_MS, self.poll_search)
+            return
         
+        self.search_thread = None
+        self.try_btn.config(state='normal')
+        self.log_message(f"Throughput: {stats.format_rate(snapshot['average'])} average"
+                         + (f" (per worker: {workers})" if workers else ""))
+        kind, value = final
+        if kind == "error":
+            self.log_message(f"✗ Error during search: {value}")
+            self.update_status("Search failed")
+            messagebox.showerror("Error", f"Password search failed:\n{value}")
+        else:
+            self.finish_search(value)
+    
+    def finish_search(self, result):
+        """Report the outcome of a password search"""
         self.progress_var.set(100)
+        elapsed = time.time() - self.start_time
         
-        if found:
+        if result.found:
+            self.password = result.password
+            display_pass = core.display_password(result.password)
+            
+            self.log_message(f"\n✓ SUCCESS! Password found: {display_pass}")
+            self.log_message(f"✓ Found at attempt #{result.index+1}")
+            self.log_message(f"✓ Time taken: {elapsed:.1f} seconds")
+            
+            self.update_status(f"Password found: {display_pass}")
+            
             self.unlock_btn.config(state='normal')
             messagebox.showinfo("Success", 
                 f"Password found!\n\n"
                 f"Password: {display_pass}\n"
-                f"Attempts: {i+1}\n"
+                f"Attempts: {result.index+1}\n"
                 f"Time: {elapsed:.1f}s\n\n"
                 f"Click 'Unlock PDF' to remove the password.")
         else:
-            elapsed = time.time() - self.start_time
-            self.log_message(f"\n✗ No password found after {len(self.common_passwords)} attempts")
+            self.log_message(f"\n✗ No password found after {result.attempts} attempts")
             self.log_message(f"✗ Time spent: {elapsed:.1f} seconds")
             self.update_status("No password found")
             
             messagebox.showinfo("No Password Found", 
                 f"No common password worked.\n\n"
-                f"Tested: {len(self.common_passwords)} passwords\n"
+                f"Tested: {result.attempts} passwords\n"
                 f"Time: {elapsed:.1f} seconds\n\n"
                 "Please try entering the password manually.")
     
+    def get_workers(self):
+        """Worker processes from the spinbox, or the default if it holds no valid number"""
+        try:
+            workers = self.workers_var.get()
+        except tk.TclError:  # Typed text that is not a number
+            workers = 0
+        if workers < 1:
+            workers = default_workers()
+            self.log_message(f"Invalid number of workers - using {workers}")
+            self.workers_var.set(workers)
+        return workers
+    
+    def get_verifier(self):
+        """Read the encryption parameters once per selected file"""
+        if self.verifier_file != self.pdf_file:
+            self.verifier_file = self.pdf_file
+            self.verifier = core.load_verifier(self.pdf_file)
+        return self.verifier
+    
     def test_password(self, password):
         """Test if password works"""
-        try:
-            with open(self.pdf_file, 'rb') as f:
-                pdf = pikepdf.Pdf.open(f, password=password)
-                # Try to access something to verify
-                _ = len(pdf.pages)
-                return True
-        except:
-            return False
+        return core.verify(self.pdf_file, password, self.get_verifier())
     
     def test_manual_password(self):
         """Test manually entered password"""
@@ -720,8 +1044,8 @@ Note: Use only on PDF files you own or have permission to unlock.
             messagebox.showerror("Error", "Incorrect password!")
     
     def unlock_pdf(self):
-        """Unlock the PDF file"""
-        if not self.password:
+        """Unlock the PDF file straight to a location chosen by the user"""
+        if not self.password and not self.owner_only:
             messagebox.showerror("Error", "No password available")
             return
         
@@ -733,64 +1057,82 @@ Note: Use only on PDF files you own or have permission to unlock.
             messagebox.showerror("Error", "Selected file does not exist")
             return
         
+        save_path = self.ask_save_path("Save Unlocked PDF")
+        if not save_path:
+            return
+        
+        if self.write_unlocked_pdf(save_path):
+            self.unlock_btn.config(state='disabled')
+    
+    def save_unlocked_pdf(self):
+        """Save another unlocked copy somewhere else"""
+        if not self.unlocked_file:
+            messagebox.showerror("Error", "No unlocked file available")
+            return
+        
+        save_path = self.ask_save_path("Save Another Unlocked Copy")
+        if save_path:
+            self.write_unlocked_pdf(save_path)
+    
+    def ask_save_path(self, title):
+        """Ask where the unlocked PDF goes (next to the original by default)"""
+        base_name = os.path.splitext(os.path.basename(self.pdf_file))[0]
+        return filedialog.asksaveasfilename(
+            title=title,
+            defaultextension=".pdf",
+            initialfile=f"{base_name}_unlocked.pdf",
+            initialdir=os.path.dirname(self.pdf_file),
+            filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
+        )
+    
+    def write_unlocked_pdf(self, save_path):
+        """Decrypt once, directly into save_path; returns True on success"""
         try:
             self.log_message("\n" + "="*50)
             self.log_message("Starting PDF unlock process...")
-            self.update_status("Opening encrypted PDF...")
+            self.log_message(f"Saving as: {save_path}")
+            self.update_status("Unlocking PDF...")
             
-            # Open encrypted PDF
-            with open(self.pdf_file, 'rb') as f:
-                pdf = pikepdf.Pdf.open(f, password=self.password)
-                
-                self.log_message("✓ PDF opened successfully")
-                self.update_status("Creating unlocked file...")
-                
-                # Create unlocked filename
-                original_name = os.path.basename(self.pdf_file)
-                base_name, ext = os.path.splitext(original_name)
-                if not ext or ext.lower() != '.pdf':
-                    ext = '.pdf'
-                
-                unlocked_name = f"{base_name}_unlocked{ext}"
-                self.unlocked_file = os.path.join(self.temp_dir, unlocked_name)
-                
-                # Save without encryption
-                self.log_message(f"Saving as: {unlocked_name}")
-                pdf.save(self.unlocked_file)
+            # Written to a temp file beside save_path, then renamed into place
+            profile = self.save_profile_var.get() or core.DEFAULT_SAVE_PROFILE
+            result = core.unlock(self.pdf_file, self.password, save_path, profile)
+            page_count = result.pages
+            size = result.size / 1024
+            self.unlocked_file = save_path
+            
+            self.log_message("✓ PDF unlocked successfully!")
+            self.log_message(f"  File: {save_path}")
+            self.log_message(f"  Profile: {result.profile}")
+            self.log_message(f"  Size: {size:.1f} KB")
+            self.log_message(f"  Pages: {page_count}")
+            self.log_message(f"  Time: {result.seconds:.2f}s")
+            
+            # Enable buttons
+            self.save_btn.config(state='normal')
+            self.open_btn.config(state='normal')
+            
+            self.update_status("PDF unlocked and saved")
+            
+            # Ask user what to do next
+            choice = messagebox.askyesnocancel(
+                "Success",
+                f"PDF unlocked successfully!\n\n"
+                f"Location: {save_path}\n"
+                f"Pages: {page_count}\n"
+                f"Size: {size:.1f} KB\n\n"
+                "What would you like to do?\n\n"
+                "Yes = Open the PDF file\n"
+                "No = Open containing folder\n"
+                "Cancel = Close this message"
+            )
+            
+            if choice is True:
+                self.open_file(save_path)
+            elif choice is False:
+                self.open_folder(os.path.dirname(save_path))
+            return True
                 
-                # Verify file was created
-                if os.path.exists(self.unlocked_file):
-                    size = os.path.getsize(self.unlocked_file) / 1024
-                    self.log_message(f"✓ PDF unlocked successfully!")
-                    self.log_message(f"  File: {unlocked_name}")
-                    self.log_message(f"  Size: {size:.1f} KB")
-                    
-                    # Test if unlocked file can be opened
-                    try:
-                        with pikepdf.Pdf.open(self.unlocked_file) as test_pdf:
-                            page_count = len(test_pdf.pages)
-                            self.log_message(f"  Pages: {page_count}")
-                            self.log_message(f"  ✓ File verified and accessible")
-                    except Exception as e:
-                        self.log_message(f"  ⚠️ Warning: Could not verify file - {str(e)}")
-                    
-                    # Enable buttons
-                    self.save_btn.config(state='normal')
-                    self.open_btn.config(state='normal')
-                    self.unlock_btn.config(state='disabled')
-                    
-                    self.update_status("PDF unlocked - ready to save")
-                    
-                    messagebox.showinfo("Success", 
-                        f"PDF unlocked successfully!\n\n"
-                        f"Original: {original_name}\n"
-                        f"Unlocked: {unlocked_name}\n"
-                        f"Size: {size:.1f} KB\n\n"
-                        f"Click 'Save Unlocked PDF' to save the file.")
-                else:
-                    raise Exception("Failed to create unlocked file")
-                    
-        except pikepdf.PasswordError:
+        except core.PasswordError:
             self.log_message("✗ Password error - incorrect password")
             self.update_status("Error: Incorrect password")
             messagebox.showerror("Error", 
@@ -804,68 +1146,7 @@ Note: Use only on PDF files you own or have permission to unlock.
             messagebox.showerror("Error", 
                 f"Failed to unlock PDF:\n\n{str(e)}\n\n"
                 "Please check the file and try again.")
-    
-    def save_unlocked_pdf(self):
-        """Save the unlocked PDF"""
-        if not self.unlocked_file or not os.path.exists(self.unlocked_file):
-            messagebox.showerror("Error", "No unlocked file available")
-            return
-        
-        self.log_message("\n" + "="*50)
-        self.log_message("Saving unlocked PDF...")
-        
-        # Get default directory
-        default_dir = os.path.dirname(self.pdf_file) if self.pdf_file else ""
-        
-        # Suggest filename
-        suggested_name = os.path.basename(self.unlocked_file)
-        
-        # Ask for save location
-        save_path = filedialog.asksaveasfilename(
-            title="Save Unlocked PDF",
-            defaultextension=".pdf",
-            initialfile=suggested_name,
-            initialdir=default_dir,
-            filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
-        )
-        
-        if save_path:
-            try:
-                self.update_status("Saving file...")
-                
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                
-                # Copy file
-                shutil.copy2(self.unlocked_file, save_path)
-                
-                if os.path.exists(save_path):
-                    size = os.path.getsize(save_path) / 1024
-                    self.log_message(f"✓ File saved: {save_path}")
-                    self.log_message(f"  Size: {size:.1f} KB")
-                    
-                    self.update_status(f"File saved successfully")
-                    
-                    # Ask user what to do next
-                    choice = messagebox.askyesnocancel(
-                        "Success",
-                        f"PDF saved successfully!\n\n"
-                        f"Location: {save_path}\n"
-                        f"Size: {size:.1f} KB\n\n"
-                        "What would you like to do?\n\n"
-                        "Yes = Open the PDF file\n"
-                        "No = Open containing folder\n"
-                        "Cancel = Close this message"
-                    )
-                    
-                    if choice is True:
-                        self.open_file(save_path)
-                    elif choice is False:
-                        self.open_folder(os.path.dirname(save_path))
-                
-            except Exception as e:
-                self.log_message(f"✗ Error saving: {str(e)}")
-                messagebox.showerror("Save Error", f"Failed to save file:\n{str(e)}")
+        return False
     
     def open_file_location(self):
         """Open the folder containing unlocked file"""
@@ -909,6 +1190,56 @@ Note: Use only on PDF files you own or have permission to unlock.
         self.log_message("\n" + "="*50)
         self.log_message("Closing application...")
         
-        try:
-            if os.path.exists(self.temp_dir):
-                shutil
\ No newline at end of file
+        # Stop a running search and let it save its session
+        if self.search_thread is not None:
+            self.search_thread.stop()
+            self.search_thread.join(timeout=5)
+        
+        self.console.close()
+        self.root.destroy()
+
+def main():
+    """Main function"""
+    # Create main window
+    root = tk.Tk()
+    PROFILE.mark("Tk root")
+    
+    # Create application
+    app = PDFUnlockerApp(root, PROFILE)
+    
+    # Handle window closing
+    root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    
+    # Center window
+    root.update_idletasks()
+    width = root.winfo_width()
+    height = root.winfo_height()
+    x = (root.winfo_screenwidth() // 2) - (width // 2)
+    y = (root.winfo_screenheight() // 2) - (height // 2)
+    root.geometry(f'{width}x{height}+{x}+{y}')
+    
+    # Set minimum size
+    root.minsize(750, 600)
+    
+    # Draw the window before anything slow happens
+    root.update()
+    PROFILE.mark("first paint")
+    app.load_pdf_library()
+    
+    # Start main loop
+    root.mainloop()
+
+if __name__ == "__main__":
+    # Check for Python version
+    if sys.version_info < (3, 6):
+        print("Error: Python 3.6 or higher is required")
+        print(f"Current version: {sys.version}")
+        input("Press Enter to exit...")
+        sys.exit(1)
+    
+    # Needed for worker processes in frozen Windows builds
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
+    # Run the application
+    main()
@@ -2,51 +2,81 @@
 """
 PDF Password Remover - Fixed Version
 Simple GUI to remove passwords from PDF files
+Run with --profile-startup to print how long each step of the start takes.
 """
 
+import sys
+
+from pdfunlocker.startup import StartupProfile
+
+# Times the start from here when run with --profile-startup
+PROFILE = StartupProfile()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkinter import scrolledtext
 import os
-import time
-import shutil
-import tempfile
-import sys
 
-# Try to import PDF libraries
-try:
-    import pikepdf
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+# pikepdf is imported in the background once the window is up
+from pdfunlocker import core, stats
+from pdfunlocker.background import SearchThread, UPDATE_INTERVAL_MS
+from pdfunlocker.logconsole import FLUSH_INTERVAL_MS, LogConsole
+
+PROFILE.mark("imports")
 
 class PDFUnlockerApp:
-    def __init__(self, root):
+    def __init__(self, root, profile=None):
         self.root = root
+        self.profile = profile or StartupProfile(enabled=False)
         self.root.title("PDF Password Remover v2.0")
         self.root.geometry("800x650")
         
         # Variables
         self.pdf_file = ""
         self.password = ""
+        self.owner_only = False
         self.unlocked_file = ""
-        self.temp_dir = tempfile.mkdtemp(prefix="pdf_unlocker_")
-        
-        # Common passwords to try
-        self.common_passwords = [
-            "", "123456", "password", "12345678", "qwerty",
-            "123456789", "12345", "1234", "111111", "1234567",
-            "dragon", "123123", "admin", "welcome", "monkey",
-            "letmein", "password1", "abc123", "123", "login",
-            "passw0rd", "master", "hello", "test", "demo",
-            "admin123", "letmein123", "welcome123", "password123"
-        ]
+        self.verifier = None
+        self.verifier_file = ""
+        self.search_thread = None
+        self.library_thread = None
+        
+        # Log lines are shown in batches and kept in full on disk
+        self.console = LogConsole()
+        
+        # Common passwords to try (variations are generated lazily)
+        self.common_count = core.common_password_count()
         
         # Setup UI
         self.setup_ui()
+        self.profile.mark("widgets")
         
-        # Check library
-        if not PDF_AVAILABLE:
+        # Check library (only whether it is installed: importing it waits
+        # until the window is shown, see load_pdf_library)
+        if not core.PDF_AVAILABLE:
+            self.show_library_error()
+        
+        self.root.after(FLUSH_INTERVAL_MS, self.flush_log)
+    
+    def load_pdf_library(self):
+        """Import pikepdf on a background thread (called once the window is shown)"""
+        if not core.PDF_AVAILABLE:
+            return
+        import threading
+        self.library_thread = threading.Thread(
+            target=self.profile.run, args=("pikepdf (background)", core.load_pdf_library),
+            daemon=True)
+        self.library_thread.start()
+        self.root.after(UPDATE_INTERVAL_MS, self.check_pdf_library)
+    
+    def check_pdf_library(self):
+        """Show the setup screen if pikepdf turned out to be unusable"""
+        if self.library_thread.is_alive():
+            self.root.after(UPDATE_INTERVAL_MS, self.check_pdf_library)
+            return
+        if self.profile.enabled:
+            self.log_message(f"Startup: {self.profile.summary()}")
+        if not core.PDF_AVAILABLE:
             self.show_library_error()
     
     def show_library_error(self):
@@ -182,9 +212,10 @@ class PDFUnlockerApp:
         pass_frame.pack(fill=tk.X, pady=(0, 10))
         
         # Try common passwords button
-        ttk.Button(pass_frame, text="Try Common Passwords", 
-                  command=self.try_common_passwords,
-                  width=20).pack(pady=(0, 10))
+        self.try_btn = ttk.Button(pass_frame, text="Try Common Passwords", 
+                                 command=self.try_common_passwords,
+                                 width=20)
+        self.try_btn.pack(pady=(0, 10))
         
         # Manual password entry
         manual_frame = ttk.Frame(pass_frame)
@@ -233,7 +264,7 @@ class PDFUnlockerApp:
                                     width=15)
         self.unlock_btn.pack(side=tk.LEFT, padx=(0, 10))
         
-        self.download_btn = ttk.Button(action_frame, text="💾 Save Unlocked PDF", 
+        self.download_btn = ttk.Button(action_frame, text="💾 Save Another Copy", 
                                       command=self.save_unlocked_pdf,
                                       state='disabled',
                                       width=20)
@@ -255,7 +286,6 @@ class PDFUnlockerApp:
         
         # Initialize log
         self.log_message("Application started")
-        self.log_message(f"Temp directory: {self.temp_dir}")
     
     def toggle_password(self):
         """Toggle password visibility"""
@@ -272,6 +302,12 @@ class PDFUnlockerApp:
         )
         
         if filename:
+            if filename != self.pdf_file:
+                # A password found for the previous file does not apply to this one
+                self.password = ""
+                self.owner_only = False
+                self.unlock_btn.config(state='disabled')
+                self.download_btn.config(state='disabled')
             self.pdf_file = filename
             self.file_var.set(filename)
             
@@ -298,38 +334,52 @@ class PDFUnlockerApp:
     
     def check_encryption(self):
         """Check if PDF is encrypted"""
-        if not PDF_AVAILABLE:
+        if not core.PDF_AVAILABLE:
             return
         
+        self.owner_only = False
         try:
-            with open(self.pdf_file, 'rb') as f:
-                try:
-                    pdf = pikepdf.Pdf.open(f)
-                    if pdf.is_encrypted:
-                        self.log_message("File is encrypted ✓")
-                    else:
-                        self.log_message("File is NOT encrypted - no password needed")
-                        messagebox.showinfo("Info", 
-                            "This PDF is not encrypted.\n"
-                            "No password needed to open it.")
-                except pikepdf.PasswordError:
-                    self.log_message("File is encrypted ✓ (password protected)")
+            info = core.check_encryption(self.pdf_file)
+            if info.owner_only:
+                # The empty user password opens it: no guessing needed
+                self.owner_only = True
+                self.password = ""
+                self.log_message(f"File is encrypted ✓ ({info.description})")
+                self.log_message("Only an owner password is set - click 'Unlock PDF' "
+                                 "to remove the restrictions")
+                self.unlock_btn.config(state='normal')
+                self.update_status("Owner password only - ready to unlock")
+            elif info.encrypted:
+                self.log_message(f"File is encrypted ✓ ({info.description})")
+            else:
+                self.log_message("File is NOT encrypted - no password needed")
+                messagebox.showinfo("Info", 
+                    "This PDF is not encrypted.\n"
+                    "No password needed to open it.")
         except Exception as e:
             self.log_message(f"Error checking file: {str(e)}")
     
     def log_message(self, message):
-        """Add message to log"""
-        timestamp = time.strftime("%H:%M:%S")
-        self.status_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.status_text.see(tk.END)
-        self.root.update()
+        """Add message to log (shown at the next flush)"""
+        self.console.add(message)
+    
+    def flush_log(self):
+        """Insert queued log lines in one go and trim the oldest (runs on a timer)"""
+        text, removed = self.console.flush()
+        if text:
+            self.status_text.insert(tk.END, text)
+            if removed:
+                self.status_text.delete("1.0", f"{removed + 1}.0")
+            self.status_text.see(tk.END)
+        self.root.after(FLUSH_INTERVAL_MS, self.flush_log)
     
     def update_status(self, message):
         """Update status bar"""
         self.status_bar.config(text=f"Status: {message}")
     
     def clear_log(self):
-        """Clear the log"""
+        """Clear the log window (the log file keeps everything)"""
+        self.console.clear()
         self.status_text.delete(1.0, tk.END)
         self.log_message("Log cleared")
     
@@ -343,10 +393,15 @@ class PDFUnlockerApp:
             messagebox.showerror("Error", "Selected file does not exist")
             return
         
-        if not PDF_AVAILABLE:
+        if not core.PDF_AVAILABLE:
             messagebox.showerror("Error", "PDF library not available")
             return
         
+        if self.owner_only:
+            self.log_message("Only an owner password is set - no search needed, "
+                             "click 'Unlock PDF'")
+            return
+        
         self.log_message("\n" + "="*50)
         self.log_message("Trying common passwords...")
         
@@ -355,33 +410,51 @@ class PDFUnlockerApp:
         
         # Disable buttons during process
         self.unlock_btn.config(state='disabled')
+        self.try_btn.config(state='disabled')
+        
+        # Run the search in the background and poll it from the event loop
+        self.search_thread = SearchThread(self.pdf_file, core.common_passwords(),
+                                          verifier=self.get_verifier(),
+                                          total=self.common_count)
+        self.search_thread.start()
+        self.root.after(UPDATE_INTERVAL_MS, self.poll_search)
+    
+    def poll_search(self):
+        """Apply queued search events to the UI (runs about 10 times a second)"""
+        thread = self.search_thread
+        if thread is None:
+            return
         
-        # Try passwords
-        found = False
-        total = len(self.common_passwords)
+        attempts, lines, final = thread.drain()
+        total = thread.total
         
-        for i, password in enumerate(self.common_passwords):
-            # Update progress
-            progress = (i + 1) / total * 100
-            self.progress_var.set(progress)
-            self.update_status(f"Testing password {i+1}/{total}")
-            
-            # Show which password we're trying (masked for empty)
-            display_pass = "''" if password == "" else f"'{password}'"
-            self.log_message(f"Trying: {display_pass}")
-            self.root.update()
-            
-            # Try the password
-            if self.test_password(password):
-                self.password = password
-                self.log_message(f"✓ SUCCESS! Password found: {display_pass}")
-                self.update_status(f"Password found: {display_pass}")
-                found = True
-                break
+        for line in lines:
+            self.log_message(line)
         
-        self.progress_var.set(100)
+        if attempts is not None:
+            self.progress_var.set(attempts / total * 100)
+        snapshot = thread.meter.snapshot()
+        self.update_status(f"Testing password {snapshot['position']}/{total} - "
+                           f"{stats.describe(snapshot)}")
         
-        if found:
+        if final is None:
+            self.root.after(UPDATE_INTERVAL_MS, self.poll_search)
+            return
+        
+        self.search_thread = None
+        self.try_btn.config(state='normal')
+        self.progress_var.set(100)
+        kind, result = final
+        
+        if kind == "error":
+            self.log_message(f"✗ Error during search: {result}")
+            self.update_status("Search failed")
+        elif result.found:
+            self.password = result.password
+            display_pass = core.display_password(result.password)
+            self.log_message(f"✓ SUCCESS! Password found: {display_pass}")
+            self.update_status(f"Password found: {display_pass}")
+            
             self.unlock_btn.config(state='normal')
             messagebox.showinfo("Success", 
                 f"Password found!\n\n"
@@ -394,16 +467,16 @@ class PDFUnlockerApp:
                 "None of the common passwords worked.\n\n"
                 "Please try entering the password manually in the field above.")
     
+    def get_verifier(self):
+        """Read the encryption parameters once per selected file"""
+        if self.verifier_file != self.pdf_file:
+            self.verifier_file = self.pdf_file
+            self.verifier = core.load_verifier(self.pdf_file)
+        return self.verifier
+    
     def test_password(self, password):
         """Test if password works"""
-        try:
-            with open(self.pdf_file, 'rb') as f:
-                pdf = pikepdf.Pdf.open(f, password=password)
-                # Try to access something to verify
-                _ = len(pdf.pages)
-                return True
-        except:
-            return False
+        return core.verify(self.pdf_file, password, self.get_verifier())
     
     def test_manual_password(self):
         """Test manually entered password"""
@@ -438,8 +511,8 @@ class PDFUnlockerApp:
             messagebox.showerror("Error", "Incorrect password!")
     
     def unlock_pdf(self):
-        """Unlock the PDF file"""
-        if not self.password:
+        """Unlock the PDF file straight to a location chosen by user"""
+        if not self.password and not self.owner_only:
             messagebox.showerror("Error", "No password available")
             return
         
@@ -451,65 +524,82 @@ class PDFUnlockerApp:
             messagebox.showerror("Error", "Selected file does not exist")
             return
         
+        save_path = self.ask_save_path("Save Unlocked PDF")
+        if not save_path:
+            return
+        
+        if self.write_unlocked_pdf(save_path):
+            self.unlock_btn.config(state='disabled')
+    
+    def save_unlocked_pdf(self):
+        """Save another unlocked copy to a location chosen by user"""
+        if not self.unlocked_file:
+            messagebox.showerror("Error", "No unlocked file available. Please unlock a PDF first.")
+            return
+        
+        save_path = self.ask_save_path("Save Another Unlocked Copy")
+        if save_path:
+            self.write_unlocked_pdf(save_path)
+    
+    def ask_save_path(self, title):
+        """Ask where to save the unlocked PDF"""
+        base_name = os.path.splitext(os.path.basename(self.pdf_file))[0]
+        return filedialog.asksaveasfilename(
+            title=title,
+            defaultextension=".pdf",
+            initialfile=f"{base_name}_unlocked.pdf",
+            initialdir=os.path.dirname(self.pdf_file),  # Start in same directory as original
+            filetypes=[
+                ("PDF files", "*.pdf"),
+                ("All files", "*.*")
+            ]
+        )
+    
+    def write_unlocked_pdf(self, save_path):
+        """Decrypt the PDF directly into save_path; returns True on success"""
         try:
             self.log_message("\n" + "="*50)
             self.log_message("Starting PDF unlock process...")
-            self.update_status("Opening encrypted PDF...")
+            self.log_message(f"Saving to: {save_path}")
+            self.update_status("Unlocking PDF...")
             
-            # Open encrypted PDF
-            with open(self.pdf_file, 'rb') as f:
-                pdf = pikepdf.Pdf.open(f, password=self.password)
-                
-                self.log_message("✓ PDF opened successfully")
-                self.update_status("Creating unlocked file...")
-                
-                # Create unlocked filename
-                original_name = os.path.basename(self.pdf_file)
-                base_name, ext = os.path.splitext(original_name)
-                if not ext or ext.lower() != '.pdf':
-                    ext = '.pdf'
-                
-                unlocked_name = f"{base_name}_unlocked{ext}"
-                self.unlocked_file = os.path.join(self.temp_dir, unlocked_name)
-                
-                # Save without encryption
-                self.log_message(f"Saving as: {unlocked_name}")
-                pdf.save(self.unlocked_file)
+            # Written once, to a temp file beside save_path that is renamed into place
+            result = core.unlock(self.pdf_file, self.password, save_path)
+            page_count = result.pages
+            size = result.size / 1024
+            self.unlocked_file = save_path
+            
+            self.log_message("✓ PDF unlocked successfully!")
+            self.log_message(f"  Location: {save_path}")
+            self.log_message(f"  Size: {size:.1f} KB")
+            self.log_message(f"  Pages: {page_count}")
+            self.log_message(f"  Time: {result.seconds:.2f}s")
+            
+            # Enable download button
+            self.download_btn.config(state='normal')
+            self.open_btn.config(state='normal')
+            
+            self.update_status(f"File saved: {os.path.basename(save_path)}")
+            
+            # Ask if user wants to open the file or folder
+            response = messagebox.askyesnocancel("Success", 
+                f"PDF unlocked successfully!\n\n"
+                f"Location: {save_path}\n"
+                f"Pages: {page_count}\n"
+                f"Size: {size:.1f} KB\n\n"
+                f"What would you like to do?\n\n"
+                f"Yes = Open the PDF file\n"
+                f"No = Open the folder\n"
+                f"Cancel = Do nothing")
+            
+            if response is not None:  # User didn't click Cancel
+                if response:  # Yes - Open the PDF file
+                    self.open_file(save_path)
+                else:  # No - Open the folder
+                    self.open_folder(os.path.dirname(save_path))
+            return True
                 
-                # Verify file was created
-                if os.path.exists(self.unlocked_file):
-                    size = os.path.getsize(self.unlocked_file) / 1024
-                    self.log_message(f"✓ PDF unlocked successfully!")
-                    self.log_message(f"  File: {unlocked_name}")
-                    self.log_message(f"  Size: {size:.1f} KB")
-                    self.log_message(f"  Location: {self.unlocked_file}")
-                    
-                    # Test if unlocked file can be opened
-                    try:
-                        with pikepdf.Pdf.open(self.unlocked_file) as test_pdf:
-                            page_count = len(test_pdf.pages)
-                            self.log_message(f"  Pages: {page_count}")
-                            self.log_message(f"  ✓ File verified and accessible")
-                    except Exception as e:
-                        self.log_message(f"  ⚠️ Warning: Could not verify file - {str(e)}")
-                    
-                    # Enable download button
-                    self.download_btn.config(state='normal')
-                    self.open_btn.config(state='normal')
-                    self.unlock_btn.config(state='disabled')
-                    
-                    self.update_status("PDF unlocked - ready to save")
-                    
-                    messagebox.showinfo("Success", 
-                        f"PDF unlocked successfully!\n\n"
-                        f"Original: {original_name}\n"
-                        f"Unlocked: {unlocked_name}\n"
-                        f"Size: {size:.1f} KB\n\n"
-                        f"Click 'Save Unlocked PDF' to save the file.")
-                else:
-                    raise Exception("Failed to create unlocked file")
-                    
-        except pikepdf.PasswordError:
+        except core.PasswordError:
             self.log_message("✗ Password error - incorrect password")
             self.update_status("Error: Incorrect password")
             messagebox.showerror("Error", 
@@ -524,87 +614,9 @@ class PDFUnlockerApp:
                 f"Failed to unlock PDF:\n\n{str(e)}\n\n"
                 "Please check:\n"
                 "1. The PDF file is not corrupted\n"
-                "2. You have the correct password\n"
-                "3. You have permission to modify the file")
-    
-    def save_unlocked_pdf(self):
-        """Save the unlocked PDF to a location chosen by user"""
-        if not self.unlocked_file or not os.path.exists(self.unlocked_file):
-            messagebox.showerror("Error", "No unlocked file available. Please unlock a PDF first.")
-            return
-        
-        self.log_message("\n" + "="*50)
-        self.log_message("Saving unlocked PDF...")
-        
-        # Get the original PDF's directory as default location
-        default_dir = os.path.dirname(self.pdf_file) if self.pdf_file else ""
-        
-        # Suggest a filename
-        suggested_name = os.path.basename(self.unlocked_file)
-        
-        # Ask for save location
-        save_path = filedialog.asksaveasfilename(
-            title="Save Unlocked PDF",
-            defaultextension=".pdf",
-            initialfile=suggested_name,
-            initialdir=default_dir,  # Start in same directory as original
-            filetypes=[
-                ("PDF files", "*.pdf"),
-                ("All files", "*.*")
-            ]
-        )
-        
-        if save_path:
-            try:
-                self.update_status("Saving file...")
-                self.log_message(f"Attempting to save to: {save_path}")
-                
-                # Check if target directory exists
-                target_dir = os.path.dirname(save_path)
-                if target_dir and not os.path.exists(target_dir):
-                    os.makedirs(target_dir, exist_ok=True)
-                    self.log_message(f"Created directory: {target_dir}")
-                
-                # Copy the file
-                shutil.copy2(self.unlocked_file, save_path)
-                
-                # Verify the copy was successful
-                if os.path.exists(save_path):
-                    size = os.path.getsize(save_path) / 1024
-                    self.log_message(f"✓ File saved successfully!")
-                    self.log_message(f"  Location: {save_path}")
-                    self.log_message(f"  Size: {size:.1f} KB")
-                    
-                    self.update_status(f"File saved: {os.path.basename(save_path)}")
-                    
-                    # Ask if user wants to open the file or folder
-                    response = messagebox.askyesnocancel("Success", 
-                        f"PDF saved successfully!\n\n"
-                        f"Location: {save_path}\n"
-                        f"Size: {size:.1f} KB\n\n"
-                        f"What would you like to do?\n\n"
-                        f"Yes = Open the PDF file\n"
-                        f"No = Open the folder\n"
-                        f"Cancel = Do nothing")
-                    
-                    if response is not None:  # User didn't click Cancel
-                        if response:  # Yes - Open the PDF file
-                            self.open_file(save_path)
-                        else:  # No - Open the folder
-                            self.open_folder(os.path.dirname(save_path))
-                
-                else:
-                    raise Exception("File was not created at destination")
-                
-            except Exception as e:
-                self.log_message(f"✗ Error saving file: {str(e)}")
-                self.update_status(f"Error saving file")
-                messagebox.showerror("Save Error", 
-                    f"Failed to save file:\n\n{str(e)}\n\n"
-                    "Please check:\n"
-                    "1. You have write permission to the destination\n"
-                    "2. The destination drive has enough space\n"
-                    "3. The file is not open in another program")
+                "2. You have write permission to the destination\n"
+                "3. The destination drive has enough space")
+        return False
     
     def open_file_location(self):
         """Open the folder containing the unlocked file"""
@@ -651,21 +663,19 @@ class PDFUnlockerApp:
         self.log_message("\n" + "="*50)
         self.log_message("Cleaning up...")
         
-        try:
-            # Clean up temp directory
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir, ignore_errors=True)
-                self.log_message(f"Cleaned temp directory: {self.temp_dir}")
-        except Exception as e:
-            self.log_message(f"Error cleaning up: {str(e)}")
+        # Stop a running search
+        if self.search_thread is not None:
+            self.search_thread.stop()
         
         self.log_message("Application closed")
+        self.console.close()
         self.root.destroy()
 
 def main():
     """Main function"""
     # Create main window
     root = tk.Tk()
+    PROFILE.mark("Tk root")
     
     # Set window icon (optional)
     try:
@@ -674,7 +684,7 @@ def main():
         pass
     
     # Create application
-    app = PDFUnlockerApp(root)
+    app = PDFUnlockerApp(root, PROFILE)
     
     # Handle window closing
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
@@ -690,17 +700,25 @@ def main():
     # Set minimum size
     root.minsize(700, 500)
     
+    # Draw the window before anything slow happens
+    root.update()
+    PROFILE.mark("first paint")
+    app.load_pdf_library()
+    
     # Start main loop
     root.mainloop()
 
 if __name__ == "__main__":
     # Check for Python version
-    import sys
     if sys.version_info < (3, 6):
         print("Error: Python 3.6 or higher is required")
         print(f"Current version: {sys.version}")
         input("Press Enter to exit...")
         sys.exit(1)
     
+    # Needed for worker processes in frozen Windows builds
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
     # Run the application
     main()
\ No newline at end of file
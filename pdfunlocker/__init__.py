@@ -0,0 +1,4 @@
+"""
+PDF Password Remover core
+Shared, UI-free logic used by the desktop front-ends.
+"""
@@ -0,0 +1,106 @@
+"""
+Background search runner
+Runs a password search on a worker thread and reports through a queue,
+so a GUI can redraw at its own pace instead of once per candidate.
+"""
+
+import queue
+import threading
+
+from . import core
+from .engine import ParallelSearch, is_indexed
+from .stats import ThroughputMeter
+
+# How often the GUI should drain the event queue (about 10 Hz)
+UPDATE_INTERVAL_MS = 100
+
+
+class SearchThread(threading.Thread):
+    """core.search() of a document on a daemon thread
+
+    Events put on self.events:
+      ("progress", attempts)  - candidates done so far (including skipped ones)
+      ("log", message)        - a line for the log
+      ("done", SearchResult)  - the search finished
+      ("error", message)      - the search failed
+
+    self.meter (a stats.ThroughputMeter) can be read at any time for rates,
+    per-worker rates and the ETA. Without a total, an index-addressable
+    source is sized on the thread (a hybrid attack reads its wordlists to
+    do so) and self.total is set once that is done.
+    """
+
+    def __init__(self, path, candidates, verifier=None, workers=None, total=None,
+                 start=0, session=None, cache=None):
+        super().__init__(daemon=True)
+        self.events = queue.Queue()
+        self.path = path
+        self.candidates = candidates
+        if total is None and hasattr(candidates, "__len__"):
+            total = len(candidates)
+        self.total = total
+        self.meter = ThroughputMeter(total, start)
+        self.verifier = verifier
+        self.workers = workers
+        self.start_index = start
+        self.session = session
+        self.cache = cache
+        self.search = None
+        self._stop_requested = threading.Event()
+
+    def stop(self):
+        """Ask the search to finish early"""
+        self._stop_requested.set()
+        search = self.search
+        if search is not None:
+            search.stop()
+
+    def run(self):
+        try:
+            if self.total is None and is_indexed(self.candidates):
+                self.total = self.meter.total = self.candidates.keyspace
+                self.events.put(("log", f"{self.total} passwords in all"))
+            result = core.search(self.path, self.candidates, self.workers,
+                                 progress=self._report, verifier=self.verifier,
+                                 start=self.start_index, session=self.session,
+                                 cache=self.cache, meter=self.meter,
+                                 log=self._warn, started=self._attach)
+        except Exception as e:
+            self.events.put(("error", str(e)))
+            return
+        if result.skipped:
+            self.events.put(("log", f"Skipped {result.skipped} passwords already "
+                                    f"known to be wrong"))
+        self.events.put(("done", result))
+
+    def _attach(self, search):
+        """Keep the engine core.search is about to run, so stop() can reach it"""
+        self.search = search
+        if isinstance(search, ParallelSearch):
+            self.events.put(("log", f"Using {search.workers} worker process(es), "
+                                    f"{search.chunk_size} passwords per chunk"))
+        if self._stop_requested.is_set():
+            search.stop()
+
+    def _warn(self, message):
+        self.events.put(("log", f"⚠️ {message}"))
+
+    def _report(self, attempts):
+        self.events.put(("progress", self.start_index + attempts))
+
+    def drain(self):
+        """Collect queued events: returns (latest attempts or None, log lines, final event or None)"""
+        attempts = None
+        lines = []
+        final = None
+        while True:
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                return attempts, lines, final
+            if kind == "progress":
+                attempts = value
+            elif kind == "log":
+                lines.append(value)
+            else:
+                final = (kind, value)
@@ -0,0 +1,247 @@
+"""
+Batch recovery
+Finds the PDFs under directories and glob patterns, classifies their
+encryption on a thread pool (the work is mostly I/O), then recovers the
+encrypted ones on a single shared process pool: the cheapest documents
+first, and every password found so far is tried first on the rest, since
+files from the same source often share one.
+"""
+
+import csv
+import glob
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import core
+from .cache import TriedCache
+from .engine import WorkerPool, chunk_size_for_cost
+from .security import PasswordVerifier
+
+CLASSIFY_THREADS = 16
+
+REPORT_FIELDS = ["file", "status", "algorithm", "password", "attempts", "seconds",
+                 "output", "error"]
+
+
+def find_pdfs(inputs):
+    """Expand files, directories (searched recursively) and glob patterns"""
+    found = []
+    seen = set()
+
+    def add(path):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            found.append(path)
+
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(".pdf"):
+                        add(os.path.join(root, name))
+        elif glob.has_magic(item):
+            for path in sorted(glob.glob(item, recursive=True)):
+                if os.path.isfile(path):
+                    add(path)
+        else:
+            add(item)
+    return found
+
+
+class BatchItem:
+    """One document of a batch and what happened to it"""
+
+    def __init__(self, path):
+        self.path = path
+        self.status = "pending"
+        self.params = None
+        self.owner_only = False
+        self.algorithm = ""
+        self.password = None
+        self.attempts = 0
+        self.seconds = 0.0
+        self.output = ""
+        self.error = ""
+        self.cost = None  # estimated seconds per candidate (None: no fast path)
+
+    def as_dict(self):
+        return {
+            "file": self.path,
+            "status": self.status,
+            "algorithm": self.algorithm,
+            "password": "" if self.password is None else _text(self.password),
+            "attempts": self.attempts,
+            "seconds": round(self.seconds, 3),
+            "output": self.output,
+            "error": self.error,
+        }
+
+
+def _text(password):
+    if isinstance(password, bytes):
+        return password.decode("utf-8", "replace")
+    return password
+
+
+def _classify_one(path):
+    item = BatchItem(path)
+    try:
+        info = core.check_encryption(path)
+    except Exception as e:
+        item.status = "error"
+        item.error = str(e)
+        return item
+    item.status = "encrypted" if info.encrypted else "not encrypted"
+    item.params = info.params
+    item.owner_only = info.owner_only
+    if info.params is not None:
+        item.algorithm = f"{info.params.algorithm} R{info.params.R}"
+    return item
+
+
+def classify(paths, threads=CLASSIFY_THREADS):
+    """Check every file's encryption in parallel; returns BatchItems in input order"""
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        return list(executor.map(_classify_one, paths))
+
+
+def _unlocked_path(output_dir, path):
+    base_name = os.path.splitext(os.path.basename(path))[0]
+    output = os.path.join(output_dir, f"{base_name}_unlocked.pdf")
+    number = 2
+    while os.path.exists(output):
+        output = os.path.join(output_dir, f"{base_name}_unlocked_{number}.pdf")
+        number += 1
+    return output
+
+
+class BatchRecovery:
+    """Recovers the encrypted documents of a batch on one shared pool
+
+    make_candidates() must return a fresh candidate source for each document.
+    """
+
+    def __init__(self, make_candidates, workers=None, chunk_size=None, output_dir=None,
+                 use_cache=True, log=None, save_profile=core.DEFAULT_SAVE_PROFILE):
+        self.make_candidates = make_candidates
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.output_dir = output_dir
+        self.use_cache = use_cache
+        self.save_profile = save_profile
+        self.log = log or (lambda line: None)
+        self.recovered = []  # distinct passwords, in the order they were found
+        self._backends = {}
+
+    def _backend(self, item):
+        """(whether the fast verifier is used, seconds per candidate), decided once per kind
+
+        See core.choose_verifier; (False, None) when there is no fast path.
+        """
+        params = item.params
+        if not PasswordVerifier.supports(params):
+            return False, None
+        key = (params.R, params.key_length, params.method)
+        if key not in self._backends:
+            verifier, cost = core.choose_verifier(item.path, PasswordVerifier(params),
+                                                  self.workers)
+            self._backends[key] = verifier is not None, cost
+        return self._backends[key]
+
+    def run(self, items):
+        """Recover every encrypted item (shortest expected work first)"""
+        pending = [item for item in items if item.status == "encrypted"]
+        for item in pending:
+            item.cost = 0.0 if item.owner_only else self._backend(item)[1]
+        # Owner-password-only documents need no search: first. Documents
+        # without a fast path need pikepdf for every candidate: last
+        pending.sort(key=lambda item: (item.cost is None, item.cost or 0.0))
+
+        with WorkerPool(self.workers) as pool:
+            for number, item in enumerate(pending, 1):
+                self.log(f"[{number}/{len(pending)}] {item.path} ({item.algorithm or 'encrypted'})")
+                started = time.perf_counter()
+                try:
+                    self._recover(item, pool)
+                except core.PDFLibraryError:
+                    raise
+                except Exception as e:
+                    item.status = "error"
+                    item.error = str(e)
+                item.seconds = time.perf_counter() - started
+                self.log(f"    {item.status}"
+                         + (f": {core.display_password(item.password)}" if item.password is not None else "")
+                         + f" ({item.attempts} attempts, {item.seconds:.1f}s)")
+        return items
+
+    def _recover(self, item, pool):
+        if item.owner_only:
+            # The empty user password opens it; only the restrictions go
+            item.status = "owner only"
+            item.password = ""
+            self._save(item, "")
+            return
+
+        cache = TriedCache.for_document(item.path) if self.use_cache else None
+        fast, _ = self._backend(item)
+        verifier = PasswordVerifier(item.params) if fast else None
+        chunk_size = self.chunk_size
+        if chunk_size is None and verifier is not None:
+            chunk_size = chunk_size_for_cost(item.cost, batch_size=verifier.batch_size)
+
+        password = core.recall_password(item.path, cache) if cache is not None else None
+        if password is None and self.recovered:
+            # Passwords of sibling documents first
+            result = core.search(item.path, list(self.recovered), chunk_size=chunk_size,
+                                 verifier=verifier, cache=cache, pool=pool)
+            item.attempts += result.attempts
+            password = result.password if result.found else None
+        if password is None:
+            result = core.search(item.path, self.make_candidates(), chunk_size=chunk_size,
+                                 verifier=verifier, cache=cache, pool=pool)
+            item.attempts += result.attempts
+            password = result.password if result.found else None
+
+        if password is None:
+            item.status = "not found"
+            return
+        item.status = "recovered"
+        item.password = password
+        if password not in self.recovered:
+            self.recovered.append(password)
+        self._save(item, password)
+
+    def _save(self, item, password):
+        """Write the unlocked copy when an output directory was given"""
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            item.output = _unlocked_path(self.output_dir, item.path)
+            result = core.unlock(item.path, password, item.output, self.save_profile)
+            self.log(f"    saved {item.output} ({result.description})")
+
+
+def write_report(items, path):
+    """Write the batch report as JSON (*.json) or CSV (anything else)"""
+    rows = [item.as_dict() for item in items]
+    if path.lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+            f.write("\n")
+        return
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def summarize(items):
+    """Count items per status, e.g. {'recovered': 3, 'not encrypted': 10}"""
+    counts = {}
+    for status, group in itertools.groupby(sorted(item.status for item in items)):
+        counts[status] = len(list(group))
+    return counts
@@ -0,0 +1,219 @@
+"""
+Verification throughput benchmark
+Builds synthetic encrypted documents with pikepdf for every security
+revision at several page counts, then measures how many wrong candidates
+per second each checking method rejects. Results are plain dicts ready
+to be dumped as JSON, so runs can be compared between versions.
+"""
+
+import itertools
+import os
+import platform
+import shutil
+import tempfile
+import time
+import warnings
+
+from . import core
+from .security import AES_AVAILABLE, load_verifier
+from .vectorized import NUMPY_AVAILABLE
+
+# (label, revision, AES, algorithm) for every fixture the benchmark builds
+PROFILES = [
+    ("R2", 2, False, "RC4-40"),
+    ("R3", 3, False, "RC4-128"),
+    ("R4-RC4", 4, False, "RC4-128"),
+    ("R4-AES", 4, True, "AES-128"),
+    ("R5", 5, True, "AES-256"),
+    ("R6", 6, True, "AES-256"),
+]
+
+DEFAULT_PAGES = [1, 100, 1000]
+DEFAULT_SECONDS = 1.0
+MIN_CALLS = 3
+
+USER_PASSWORD = "benchmark"
+OWNER_PASSWORD = "benchmark-owner"
+
+# Text drawn on every page, so file size grows with the page count
+PAGE_TEXT = "The quick brown fox jumps over the lazy dog. " * 8
+
+
+def _page_content(number):
+    lines = [b"BT /F1 10 Tf 36 800 Td 12 TL"]
+    for row in range(40):
+        text = f"Page {number} line {row}: {PAGE_TEXT}"[:110]
+        lines.append(b"(" + text.encode("ascii") + b") '")
+    lines.append(b"ET")
+    return b"\n".join(lines)
+
+
+def build_fixture(path, revision, aes, pages):
+    """Write an encrypted document with the given revision and page count"""
+    pdf = core.pikepdf.new()
+    font = pdf.make_indirect(core.pikepdf.Dictionary(
+        Type=core.pikepdf.Name.Font,
+        Subtype=core.pikepdf.Name.Type1,
+        BaseFont=core.pikepdf.Name.Helvetica,
+    ))
+    for number in range(pages):
+        pdf.add_blank_page(page_size=(595, 842))
+        page = pdf.pages[-1]
+        page.Resources = core.pikepdf.Dictionary(Font=core.pikepdf.Dictionary(F1=font))
+        page.Contents = pdf.make_stream(_page_content(number + 1))
+    encryption = core.pikepdf.Encryption(owner=OWNER_PASSWORD, user=USER_PASSWORD,
+                                         R=revision, aes=aes,
+                                         metadata=aes)
+    with warnings.catch_warnings():
+        # pikepdf warns that R5 is deprecated; it is still found in the wild
+        warnings.simplefilter("ignore")
+        pdf.save(path, encryption=encryption)
+    pdf.close()
+
+
+def wrong_candidates():
+    """An endless stream of distinct wrong passwords"""
+    number = 0
+    while True:
+        yield b"wrong%d" % number
+        number += 1
+
+
+def measure(check, seconds=DEFAULT_SECONDS, batch_size=1):
+    """Call check on wrong candidates for about `seconds`
+
+    check takes one candidate, or a list of batch_size candidates when
+    batch_size > 1. Returns (candidates checked, elapsed).
+    """
+    candidates = wrong_candidates()
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        if batch_size > 1:
+            matched = check(list(itertools.islice(candidates, batch_size)))
+        else:
+            matched = check(next(candidates))
+        if matched:
+            raise RuntimeError("Benchmark candidate unexpectedly matched")
+        calls += batch_size
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds and calls >= MIN_CALLS:
+            return calls, elapsed
+
+
+def _open_method(path):
+    """Open the document with pikepdf for every candidate"""
+    return lambda candidate: core.verify(path, candidate)
+
+
+def _verifier_method(path):
+    """Check candidates against the precomputed /Encrypt values"""
+    verifier = load_verifier(path)
+    if verifier is None:
+        return None
+    return verifier.verify
+
+
+def _batch_method(path):
+    """Hand candidates to the verifier in batches of its batch_size, as the engine does"""
+    verifier = load_verifier(path)
+    if verifier is None:
+        return None
+
+    def check(candidates):
+        return verifier.find(candidates) is not None
+
+    check.batch_size = verifier.batch_size
+    return check
+
+
+# name -> factory(path) returning check(candidate), or None if not applicable;
+# a check with a batch_size attribute takes a list of that many candidates
+METHODS = {
+    "open": _open_method,
+    "verifier": _verifier_method,
+    "batch": _batch_method,
+}
+
+# Speedups reported for every fixture: (method, relative to method)
+SPEEDUPS = [("batch", "verifier"), ("batch", "open")]
+
+
+def run(pages=None, profiles=None, methods=None, seconds=DEFAULT_SECONDS, log=None):
+    """Run the benchmark; returns a JSON-ready dict"""
+    if not core.PDF_AVAILABLE:
+        raise core.PDFLibraryError("The benchmark needs pikepdf to build its fixtures "
+                                   "(pip install pikepdf)")
+    pages = pages or DEFAULT_PAGES
+    profiles = [p for p in PROFILES if not profiles or p[0] in profiles]
+    methods = methods or list(METHODS)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "pikepdf": core.pikepdf.__version__,
+        "aes_available": AES_AVAILABLE,
+        "numpy_available": NUMPY_AVAILABLE,
+        "seconds_per_measurement": seconds,
+        "results": [],
+    }
+
+    directory = tempfile.mkdtemp(prefix="pdf_unlocker_bench_")
+    try:
+        for label, revision, aes, algorithm in profiles:
+            for page_count in pages:
+                path = os.path.join(directory, f"{label}-{page_count}.pdf")
+                build_fixture(path, revision, aes, page_count)
+                file_size = os.path.getsize(path)
+                rates = {}
+
+                for method in methods:
+                    entry = {
+                        "profile": label,
+                        "revision": revision,
+                        "algorithm": algorithm,
+                        "pages": page_count,
+                        "file_size": file_size,
+                        "method": method,
+                    }
+                    factory = METHODS[method]
+                    started = time.perf_counter()
+                    check = factory(path)
+                    entry["setup_seconds"] = round(time.perf_counter() - started, 6)
+                    if check is None:
+                        entry["skipped"] = "not supported for this document"
+                    else:
+                        batch_size = getattr(check, "batch_size", 1)
+                        calls, elapsed = measure(check, seconds, batch_size)
+                        if batch_size > 1:
+                            entry["batch_size"] = batch_size
+                        entry["candidates"] = calls
+                        entry["seconds"] = round(elapsed, 6)
+                        entry["rate"] = round(calls / elapsed, 2)
+                    rates[method] = entry.get("rate")
+                    for faster, baseline in SPEEDUPS:
+                        if method == faster and rates.get(faster) and rates.get(baseline):
+                            entry.setdefault("speedup", {})[baseline] = round(
+                                rates[faster] / rates[baseline], 2)
+                    report["results"].append(entry)
+                    if log:
+                        log(_describe(entry))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return report
+
+
+def _describe(entry):
+    head = (f"{entry['profile']:<7} {entry['algorithm']:<8} {entry['pages']:>5} pages "
+            f"{entry['file_size'] / 1024:>9.1f} KB  {entry['method']:<9}")
+    if "rate" not in entry:
+        return f"{head} skipped ({entry['skipped']})"
+    text = f"{head} {entry['rate']:>12.1f} candidates/s"
+    for baseline, ratio in entry.get("speedup", {}).items():
+        text += f"  ({ratio:.2f}x {baseline})"
+    return text
+
@@ -0,0 +1,261 @@
+"""
+Per-document "already tried" cache
+Remembers, across runs, which candidates are known to be wrong for a
+document, so re-running the common list or an overlapping wordlist skips
+them. Keyed by the encryption fingerprint (/Encrypt values and /ID), so
+it survives renames. Wrong candidates go into a Bloom filter (a false
+positive only means an untried candidate is skipped, at the configured
+rate); recovered passwords are kept exactly, so a known document opens
+at once. A search checks and updates the filter a whole chunk at a time
+(with NumPy when available), so it keeps up with the workers.
+"""
+
+import hashlib
+import json
+import math
+import os
+import struct
+
+from . import vectorized
+from .session import atomic_write, data_dir, document_fingerprint
+
+# First filter layer: capacity and false positive rate; each further layer
+# doubles the capacity and halves the rate so the total stays bounded
+INITIAL_CAPACITY = 1 << 20
+ERROR_RATE = 0.001
+
+# Chunks smaller than this are checked one candidate at a time
+MIN_BATCH = 32
+
+FILTER_MAGIC = b"PUTRIED1"
+_LAYER_HEADER = struct.Struct(">QQII")
+
+
+def _key(candidate):
+    if isinstance(candidate, str):
+        return candidate.encode("utf-8")
+    return bytes(candidate)
+
+
+def _digest(key):
+    return hashlib.blake2b(key, digest_size=16).digest()
+
+
+def _numpy(count):
+    """NumPy for a batch of count keys, or None to go one key at a time"""
+    if count < MIN_BATCH or not vectorized.NUMPY_AVAILABLE:
+        return None
+    return vectorized.load_numpy()
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over byte strings"""
+
+    def __init__(self, capacity, error_rate, bits=None, count=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.size = (size + 7) // 8 * 8
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray(self.size // 8)
+        self.count = count
+
+    def _positions(self, key):
+        digest = _digest(key)
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, key):
+        bits = self.bits
+        new = False
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+
+    def _positions_array(self, np, digests):
+        """Bit positions of many keys at once (rows match _positions)"""
+        values = np.frombuffer(b"".join(digests), dtype="<u8").reshape(-1, 2)
+        size = np.uint64(self.size)
+        # (h1 + i * h2) % size, reduced first so that nothing overflows 64 bits
+        h1 = values[:, 0] % size
+        h2 = (values[:, 1] | np.uint64(1)) % size
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % size
+
+    def _bits_set(self, np, positions):
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        return ((bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1).all(axis=1)
+
+    def contains_many(self, np, digests):
+        """A boolean array: whether each key (given as its digest) is in the filter"""
+        return self._bits_set(np, self._positions_array(np, digests))
+
+    def add_many(self, np, digests):
+        """Add distinct keys given as their digests"""
+        positions = self._positions_array(np, digests)
+        new = ~self._bits_set(np, positions)
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        np.bitwise_or.at(bits, positions >> 3,
+                         np.left_shift(1, positions & 7).astype(np.uint8))
+        self.count += int(new.sum())
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+
+class TriedFilter:
+    """A growing stack of Bloom filters of candidates known to be wrong"""
+
+    def __init__(self, layers=None):
+        self.layers = layers or [BloomFilter(INITIAL_CAPACITY, ERROR_RATE)]
+
+    def __len__(self):
+        return sum(layer.count for layer in self.layers)
+
+    def __contains__(self, candidate):
+        key = _key(candidate)
+        for layer in self.layers:
+            if key in layer:
+                return True
+        return False
+
+    def add(self, candidate):
+        key = _key(candidate)
+        for layer in self.layers[:-1]:
+            if key in layer:
+                return
+        last = self.layers[-1]
+        if last.full:
+            last = BloomFilter(last.capacity * 2, last.error_rate / 2)
+            self.layers.append(last)
+        last.add(key)
+
+    def check(self, candidates):
+        """Whether each candidate is in the filter, as a list of bools"""
+        np = _numpy(len(candidates))
+        if np is None:
+            return [candidate in self for candidate in candidates]
+        digests = [_digest(_key(candidate)) for candidate in candidates]
+        found = np.zeros(len(digests), dtype=bool)
+        for layer in self.layers:
+            found |= layer.contains_many(np, digests)
+        return found.tolist()
+
+    def update(self, candidates):
+        """Add every candidate (a whole chunk at once when NumPy is available)"""
+        candidates = list(candidates)
+        np = _numpy(len(candidates))
+        if np is None:
+            for candidate in candidates:
+                self.add(candidate)
+            return
+        digests = list(dict.fromkeys(_digest(_key(candidate)) for candidate in candidates))
+        if len(self.layers) > 1:
+            known = np.zeros(len(digests), dtype=bool)
+            for layer in self.layers[:-1]:
+                known |= layer.contains_many(np, digests)
+            digests = [digest for digest, old in zip(digests, known.tolist()) if not old]
+        while digests:
+            last = self.layers[-1]
+            if last.full:
+                last = BloomFilter(last.capacity * 2, last.error_rate / 2)
+                self.layers.append(last)
+            room = max(1, last.capacity - last.count)
+            last.add_many(np, digests[:room])
+            digests = digests[room:]
+
+    def to_bytes(self):
+        parts = [FILTER_MAGIC, struct.pack(">I", len(self.layers))]
+        for layer in self.layers:
+            parts.append(struct.pack(">d", layer.error_rate))
+            parts.append(_LAYER_HEADER.pack(layer.capacity, layer.count,
+                                            layer.size, layer.hashes))
+            parts.append(bytes(layer.bits))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data.startswith(FILTER_MAGIC):
+            raise ValueError("Not a tried-candidates filter")
+        pos = len(FILTER_MAGIC)
+        (layer_count,) = struct.unpack_from(">I", data, pos)
+        pos += 4
+        layers = []
+        for _ in range(layer_count):
+            (error_rate,) = struct.unpack_from(">d", data, pos)
+            pos += 8
+            capacity, count, size, hashes = _LAYER_HEADER.unpack_from(data, pos)
+            pos += _LAYER_HEADER.size
+            bits = bytearray(data[pos:pos + size // 8])
+            pos += size // 8
+            layer = BloomFilter(capacity, error_rate, bits, count)
+            if layer.size != size or layer.hashes != hashes or len(bits) != size // 8:
+                raise ValueError("Corrupt tried-candidates filter")
+            layers.append(layer)
+        return cls(layers)
+
+
+class TriedCache:
+    """The persistent cache for one document"""
+
+    def __init__(self, fingerprint, directory=None):
+        self.fingerprint = fingerprint
+        self.directory = directory or os.path.join(data_dir(), "cache")
+        self.filter_path = os.path.join(self.directory, f"{fingerprint}.tried")
+        self.passwords_path = os.path.join(self.directory, "passwords.json")
+        self.tried = self._load_filter()
+        self._saved_count = len(self.tried)
+
+    @classmethod
+    def for_document(cls, path, directory=None):
+        return cls(document_fingerprint(path), directory)
+
+    def _load_filter(self):
+        try:
+            with open(self.filter_path, "rb") as f:
+                return TriedFilter.from_bytes(f.read())
+        except (OSError, ValueError, struct.error):
+            return TriedFilter()
+
+    def save(self):
+        """Write the filter if it grew since it was loaded or last saved"""
+        if len(self.tried) != self._saved_count:
+            atomic_write(self.filter_path, self.tried.to_bytes())
+            self._saved_count = len(self.tried)
+
+    def _load_passwords(self):
+        try:
+            with open(self.passwords_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def known_password(self):
+        """The password recovered for this document before, or None"""
+        value = self._load_passwords().get(self.fingerprint)
+        if value is None:
+            return None
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            return None
+
+    def remember(self, password):
+        """Store the recovered password"""
+        passwords = self._load_passwords()
+        passwords[self.fingerprint] = _key(password).hex()
+        atomic_write(self.passwords_path, json.dumps(passwords, indent=2).encode("utf-8"))
@@ -0,0 +1,633 @@
+"""
+Command line front-end (no GUI, never imports tkinter)
+
+    python -m pdfunlocker check file.pdf
+    python -m pdfunlocker scan /mnt/share/archive --json
+    python -m pdfunlocker recover file.pdf --wordlist words.txt --output out.pdf
+    python -m pdfunlocker recover file.pdf --markov old_passwords.txt --max-length 10
+    python -m pdfunlocker recover file.pdf --mask '?u?l?l?l?d?d'
+    python -m pdfunlocker recover file.pdf --mask '?u?l?l?l?d?d' --resume
+    python -m pdfunlocker recover file.pdf --wordlist words.txt --append-mask '?d?d?d?d'
+    python -m pdfunlocker recover file.pdf --mask '?l?l?l?l?l?l' --stats-jsonl stats.jsonl
+    python -m pdfunlocker batch archive/ --report report.csv --output-dir unlocked/
+    python -m pdfunlocker coordinate file.pdf --mask '?a?a?a?a?a?a' --listen 0.0.0.0:7878
+    python -m pdfunlocker work coordinator-host:7878 --workers 16
+    python -m pdfunlocker benchmark --output bench.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from . import batch, benchmark, core, distributed, stats, triage
+from .cache import TriedCache
+from .dedup import DEFAULT_MEMORY, deduplicate
+from .hybrid import Hybrid
+from .markov import DEFAULT_MAX_LENGTH, DEFAULT_MIN_LENGTH, DEFAULT_ORDER, MarkovError, MarkovSource
+from .mask import Mask, MaskError
+from .rules import DEFAULT_RULES, RuleError, RuleSet, load_rules
+from .schedule import Scheduler, WordSource
+from .session import CHECKPOINT_INTERVAL, Session
+from .wordlist import Wordlist
+
+
+def build_rules(args):
+    """RuleSet for wordlists from --rules/--rule, or None"""
+    rules = list(args.rule or [])
+    for path in args.rules or []:
+        rules += DEFAULT_RULES if path == "default" else load_rules(path)
+    return RuleSet(rules) if rules else None
+
+
+def build_mask(args, mask=None):
+    """Mask from --mask (or the given mask text) and the -1 .. -4 custom charsets"""
+    custom = {}
+    for key in "1234":
+        charset = getattr(args, f"charset{key}")
+        if charset:
+            custom[key] = charset
+    return Mask(args.mask if mask is None else mask, custom)
+
+
+def hybrid_mask(args):
+    """The --append-mask or --prepend-mask text, or None"""
+    return args.append_mask or args.prepend_mask
+
+
+def build_hybrid(args):
+    """The built-in list and the wordlists, each word with the mask appended or prepended"""
+    words = [] if args.no_common else [core.COMMON_PASSWORDS]
+    words += [Wordlist(path) for path in args.wordlist]
+    return Hybrid(words, build_mask(args, hybrid_mask(args)), prepend=bool(args.prepend_mask))
+
+
+def build_candidates(args, revision=None):
+    """Merge the selected candidate sources, most likely first (or a mask or hybrid keyspace)
+
+    Explicit --password candidates come first; the built-in list, the
+    wordlists and the Markov model are then interleaved by estimated
+    likelihood, and unless --no-dedup each candidate is tried only once
+    (as the document's security handler revision, if given, encodes it).
+    """
+    if args.mask:
+        return build_mask(args)
+    if hybrid_mask(args):
+        return build_hybrid(args)
+    rules = build_rules(args)
+    schedule = Scheduler(first=args.password)
+    if not args.no_common:
+        schedule.add(core.common_source())
+    for path in args.wordlist:
+        schedule.add(WordSource(Wordlist(path), rules, name=path))
+    if args.markov:
+        source = MarkovSource(args.markov, args.markov_order, args.min_length,
+                              args.max_length)
+        source.model  # Train (or load) now, before the search starts
+        schedule.add(source)
+    if args.no_dedup:
+        return schedule
+    return deduplicate(schedule, args.dedup_memory * 1024 * 1024, args.dedup_dir, revision)
+
+
+def candidate_total(args, candidates):
+    """Size of the configured keyspace (an upper bound), or None if it is not known up front"""
+    if args.mask or hybrid_mask(args):
+        return candidates.keyspace
+    if args.markov:
+        return None
+    rules = build_rules(args)
+    total = len(args.password or [])
+    if not args.no_common:
+        total += core.common_password_count()
+    for path in args.wordlist:
+        count = Wordlist(path).count()
+        if count is None:
+            return None
+        total += rules.keyspace(count) if rules else count
+    return total
+
+
+def attack_config(args):
+    """Description of the attack saved in the session (a resume must match it)"""
+    charsets = {key: getattr(args, f"charset{key}") for key in "1234"
+                if getattr(args, f"charset{key}")}
+    if args.mask:
+        return {"mask": args.mask, "charsets": charsets}
+    wordlists = [[os.path.abspath(path), os.path.getsize(path)] for path in args.wordlist]
+    if hybrid_mask(args):
+        return {
+            "hybrid": hybrid_mask(args),
+            "prepend": bool(args.prepend_mask),
+            "charsets": charsets,
+            "common": not args.no_common,
+            "wordlists": wordlists,
+        }
+    rules = build_rules(args)
+    return {
+        "passwords": args.password or [],
+        "common": not args.no_common,
+        "wordlists": wordlists,
+        "rules": rules.rules if rules else [],
+        "markov": ([os.path.abspath(args.markov), os.path.getsize(args.markov),
+                    args.markov_order, args.min_length, args.max_length]
+                   if args.markov else None),
+        "order": "likelihood",
+        "dedup": not args.no_dedup,
+    }
+
+
+def show_keyspace(args, candidates):
+    """Print the size of a mask or hybrid attack before it starts"""
+    if args.mask:
+        print(f"Mask {args.mask}: {candidates.keyspace} candidates")
+    elif hybrid_mask(args):
+        print(f"Hybrid {candidates.pattern}: {candidates.keyspace} candidates")
+
+
+def default_output(path):
+    base_name, ext = os.path.splitext(path)
+    if not ext or ext.lower() != '.pdf':
+        ext = '.pdf'
+    return f"{base_name}_unlocked{ext}"
+
+
+def cmd_check(args):
+    info = core.check_encryption(args.file)
+    print(f"{args.file}: {info.description}")
+    return 0
+
+
+def cmd_scan(args):
+    paths = batch.find_pdfs(args.inputs)
+    counts = {}
+    for result in triage.scan_many(paths, args.threads, args.budget):
+        if args.json:
+            print(json.dumps(result.as_dict()), flush=True)
+        else:
+            print(f"{result.path}: {result.description}", flush=True)
+        status = {True: "encrypted", False: "not encrypted", None: "unknown"}[result.encrypted]
+        counts[status] = counts.get(status, 0) + 1
+    if not args.json:
+        print(", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+              or "No PDF files found", file=sys.stderr)
+    return 0 if paths else 2
+
+
+def cmd_recover(args):
+    info = core.check_encryption(args.file)
+    if not info.encrypted:
+        print(f"{args.file} is not encrypted - no password needed")
+        return 0
+    print(f"{args.file}: {info.description}")
+    if info.owner_only:
+        print("✓ No user password needed - only the restrictions have to be removed")
+        return save_unlocked(args, "")
+
+    cache = None if args.no_cache else TriedCache.for_document(args.file)
+    password = core.recall_password(args.file, cache) if cache is not None else None
+    if password is not None:
+        print(f"✓ Password found: {core.display_password(password)} "
+              f"(remembered from an earlier run)")
+        return save_unlocked(args, password)
+
+    candidates = build_candidates(args, info.revision)
+    show_keyspace(args, candidates)
+
+    start = args.skip
+    session = None
+    if not args.no_session:
+        session = Session.for_document(args.file, attack_config(args), args.session)
+        if args.resume:
+            position = session.load()
+            if position:
+                print(f"Resuming after candidate {position} ({session.path})")
+            else:
+                print("No matching session to resume; starting from the beginning")
+            start = max(start, position)
+
+    total = None
+    if not args.quiet or args.stats_jsonl:
+        total = candidate_total(args, candidates)
+    meter = stats.ThroughputMeter(total, start)
+
+    def show_progress(attempts):
+        if not args.quiet:
+            print(f"\rTested: {attempts}  ({stats.describe(meter.snapshot())})  ",
+                  end="", file=sys.stderr, flush=True)
+
+    def show_warning(message):
+        print(f"\nWarning: {message}", file=sys.stderr)
+
+    reporter = None
+    if args.stats_jsonl:
+        stream = sys.stdout if args.stats_jsonl == "-" else open(args.stats_jsonl, "a",
+                                                                 encoding="utf-8")
+        reporter = stats.JsonLinesReporter(meter, stream, args.stats_interval,
+                                           {"file": args.file})
+        reporter.start()
+    try:
+        result = core.search(args.file, candidates,
+                             workers=args.workers, chunk_size=args.chunk_size,
+                             progress=show_progress, start=start, session=session,
+                             checkpoint_interval=args.checkpoint_interval, cache=cache,
+                             meter=meter, log=show_warning)
+    finally:
+        if reporter is not None:
+            reporter.finish()
+            if reporter.stream is not sys.stdout:
+                reporter.stream.close()
+    if not args.quiet:
+        print(file=sys.stderr)
+        workers = stats.describe_workers(meter.snapshot())
+        if workers:
+            print(f"Per worker: {workers}", file=sys.stderr)
+    if result.skipped:
+        print(f"Skipped {result.skipped} candidates already known to be wrong")
+
+    if not result.found:
+        print(f"✗ No password found after {result.attempts} attempts "
+              f"({result.elapsed:.1f}s)")
+        return 1
+
+    print(f"✓ Password found: {core.display_password(result.password)} "
+          f"(attempt #{result.index + 1}, {result.elapsed:.1f}s)")
+    return save_unlocked(args, result.password)
+
+
+def cmd_coordinate(args):
+    info = core.check_encryption(args.file)
+    if not info.encrypted:
+        print(f"{args.file} is not encrypted - no password needed")
+        return 0
+    print(f"{args.file}: {info.description}")
+    if info.owner_only:
+        print("✓ No user password needed - only the restrictions have to be removed")
+        return save_unlocked(args, "")
+
+    cache = None if args.no_cache else TriedCache.for_document(args.file)
+    password = core.recall_password(args.file, cache) if cache is not None else None
+    if password is not None:
+        print(f"✓ Password found: {core.display_password(password)} "
+              f"(remembered from an earlier run)")
+        return save_unlocked(args, password)
+
+    candidates = build_candidates(args, info.revision)
+    show_keyspace(args, candidates)
+
+    start = 0
+    session = None
+    if not args.no_session:
+        session = Session.for_document(args.file, attack_config(args), args.session)
+        if args.resume:
+            start = session.load()
+            if start:
+                print(f"Resuming after candidate {start} ({session.path})")
+            else:
+                print("No matching session to resume; starting from the beginning")
+
+    meter = stats.ThroughputMeter(candidate_total(args, candidates), start)
+    progress_shown = [False]
+
+    def log(line):
+        if not args.quiet:
+            # Start below the progress line instead of after it
+            print(("\n" if progress_shown[0] else "") + line, file=sys.stderr, flush=True)
+            progress_shown[0] = False
+
+    coordinator = distributed.Coordinator(args.file, candidates, args.listen, start,
+                                          args.lease_size, args.lease_timeout, args.token,
+                                          session, args.checkpoint_interval, meter, log)
+    address = coordinator.listen()
+    print(f"Waiting for workers on {address}")
+    spawned = distributed.spawn_workers(coordinator.local_address, args.spawn, args.token)
+
+    def show_progress(attempts):
+        if not args.quiet:
+            print(f"\rTested: {attempts}  Workers: {len(coordinator.workers)}  "
+                  f"({stats.describe(meter.snapshot())})  ", end="", file=sys.stderr, flush=True)
+            progress_shown[0] = True
+
+    try:
+        result = coordinator.run(show_progress)
+    finally:
+        for process in spawned:
+            try:
+                process.wait(distributed.HEARTBEAT_INTERVAL * 2)
+            except subprocess.TimeoutExpired:
+                process.terminate()
+    if not args.quiet:
+        if progress_shown[0]:
+            print(file=sys.stderr)
+        workers = stats.describe_workers(meter.snapshot())
+        if workers:
+            print(f"Per worker: {workers}", file=sys.stderr)
+
+    if not result.found:
+        print(f"✗ No password found after {result.attempts} attempts "
+              f"({result.elapsed:.1f}s)")
+        return 1
+
+    if cache is not None:
+        cache.remember(result.password)
+    print(f"✓ Password found: {core.display_password(result.password)} "
+          f"(candidate #{result.index + 1}, {result.elapsed:.1f}s)")
+    return save_unlocked(args, result.password)
+
+
+def cmd_work(args):
+    log = None if args.quiet else (lambda line: print(line, file=sys.stderr, flush=True))
+    checked = distributed.run_worker(args.address, args.workers, args.token, args.chunk_size,
+                                     args.connect_timeout, log)
+    if not args.quiet:
+        print(f"Checked {checked} candidates", file=sys.stderr)
+    return 0
+
+
+def save_unlocked(args, password):
+    """Write the unlocked copy unless --no-unlock was given"""
+    if args.output or not args.no_unlock:
+        output = args.output or default_output(args.file)
+        result = core.unlock(args.file, password, output, args.save_profile)
+        print(f"✓ Unlocked copy saved: {output} ({result.description})")
+    return 0
+
+
+def cmd_batch(args):
+    paths = batch.find_pdfs(args.inputs)
+    if not paths:
+        print("No PDF files found", file=sys.stderr)
+        return 2
+    # Fail on bad rules, masks or wordlists before the long part starts
+    build_candidates(args)
+
+    print(f"Classifying {len(paths)} files...")
+    items = batch.classify(paths, args.threads)
+
+    log = None if args.quiet else print
+    recovery = batch.BatchRecovery(lambda: build_candidates(args),
+                                   workers=args.workers, chunk_size=args.chunk_size,
+                                   output_dir=args.output_dir,
+                                   save_profile=args.save_profile,
+                                   use_cache=not args.no_cache, log=log)
+    recovery.run(items)
+
+    if args.report:
+        batch.write_report(items, args.report)
+        print(f"Report written: {args.report}")
+    counts = batch.summarize(items)
+    print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    return 1 if counts.get("not found") or counts.get("error") else 0
+
+
+def cmd_benchmark(args):
+    log = None if args.quiet else (lambda line: print(line, file=sys.stderr, flush=True))
+    report = benchmark.run(pages=args.pages, profiles=args.profile, methods=args.method,
+                           seconds=args.seconds, log=log)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+def _int_list(text):
+    try:
+        return [int(part) for part in text.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma separated numbers: {text!r}")
+
+
+def add_candidate_arguments(parser):
+    """Options selecting the candidates (shared by recover and batch)"""
+    parser.add_argument("-w", "--wordlist", action="append", default=[],
+                        help="file with one candidate per line, optionally "
+                             "gzip/xz/zstd compressed (repeatable)")
+    parser.add_argument("-p", "--password", action="append",
+                        help="extra candidate to try first (repeatable)")
+    parser.add_argument("-r", "--rules", action="append",
+                        help="rule file to apply to wordlists, or 'default' "
+                             "for the built-in rules (repeatable)")
+    parser.add_argument("--rule", action="append",
+                        help="single rule to apply to wordlists, e.g. 'c$1' (repeatable)")
+    parser.add_argument("--no-common", action="store_true",
+                        help="skip the built-in common password list")
+    parser.add_argument("--markov", metavar="CORPUS",
+                        help="also try candidates from a Markov model trained on a "
+                             "password file (cached after the first run)")
+    parser.add_argument("--markov-order", type=int, default=DEFAULT_ORDER,
+                        help=f"characters of context for --markov, 2-4 (default: {DEFAULT_ORDER})")
+    parser.add_argument("--min-length", type=int, default=DEFAULT_MIN_LENGTH,
+                        help=f"shortest --markov candidate (default: {DEFAULT_MIN_LENGTH})")
+    parser.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH,
+                        help=f"longest --markov candidate (default: {DEFAULT_MAX_LENGTH})")
+    parser.add_argument("-m", "--mask",
+                        help="try every candidate matching a mask such as "
+                             "'?u?l?l?l?d?d' instead of the lists")
+    for key in "1234":
+        parser.add_argument(f"-{key}", f"--charset{key}", metavar="CHARSET",
+                            help=f"custom charset for ?{key} in the mask, e.g. '?l?d_'")
+    hybrid = parser.add_mutually_exclusive_group()
+    hybrid.add_argument("--append-mask", metavar="MASK",
+                        help="try every word of the built-in list and the wordlists "
+                             "followed by every candidate of a mask, e.g. '?d?d?d?d' "
+                             "(rules and --markov are not used)")
+    hybrid.add_argument("--prepend-mask", metavar="MASK",
+                        help="the same with the mask before each word, e.g. '?d?d'")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="don't skip candidates the lists and rules already produced")
+    parser.add_argument("--dedup-memory", type=int, metavar="MB",
+                        default=DEFAULT_MEMORY // (1024 * 1024),
+                        help="memory for remembering tried candidates; beyond it they "
+                             "spill to sorted files on disk "
+                             f"(default: {DEFAULT_MEMORY // (1024 * 1024)})")
+    parser.add_argument("--dedup-dir", metavar="DIR",
+                        help="where the spilled files go (default: the temp directory)")
+
+
+def add_save_arguments(parser):
+    parser.add_argument("--save-profile", choices=list(core.SAVE_PROFILES),
+                        default=core.DEFAULT_SAVE_PROFILE,
+                        help="how to write unlocked copies: fast (streams copied as "
+                             "they are), compact (object streams, recompressed) or "
+                             f"linearized (default: {core.DEFAULT_SAVE_PROFILE})")
+
+
+def add_pool_arguments(parser):
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="candidates per task (default: calibrated)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m pdfunlocker",
+        description="Recover PDF passwords and remove them (command line version)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    check = commands.add_parser("check", help="report whether a PDF is encrypted")
+    check.add_argument("file")
+    check.set_defaults(func=cmd_check)
+
+    scan = commands.add_parser("scan", help="quickly report the encryption of many PDFs "
+                                             "(reads only the end of each file)")
+    scan.add_argument("inputs", nargs="+", metavar="PATH",
+                      help="PDF file, directory (searched recursively) or glob")
+    scan.add_argument("--threads", type=int, default=triage.SCAN_THREADS,
+                      help=f"files read in parallel (default: {triage.SCAN_THREADS})")
+    scan.add_argument("--budget", type=int, default=triage.READ_BUDGET, metavar="BYTES",
+                      help=f"most bytes read per file (default: {triage.READ_BUDGET})")
+    scan.add_argument("--json", action="store_true",
+                      help="one JSON object per file instead of text")
+    scan.set_defaults(func=cmd_scan)
+
+    recover = commands.add_parser("recover", help="search for the password and unlock")
+    recover.add_argument("file")
+    add_candidate_arguments(recover)
+    recover.add_argument("--skip", type=int, default=0, metavar="N",
+                         help="start after the first N candidates")
+    recover.add_argument("--resume", action="store_true",
+                         help="continue an interrupted search with the same options")
+    recover.add_argument("--session", metavar="FILE",
+                         help="session file (default: one per document in ~/.pdfunlocker)")
+    recover.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL,
+                         metavar="SECONDS", help="how often to save the session "
+                                                 f"(default: {CHECKPOINT_INTERVAL:g})")
+    recover.add_argument("--no-session", action="store_true",
+                         help="do not save progress")
+    recover.add_argument("--no-cache", action="store_true",
+                         help="neither skip nor remember candidates tried in earlier runs")
+    add_pool_arguments(recover)
+    recover.add_argument("-o", "--output",
+                         help="where to save the unlocked PDF (default: *_unlocked.pdf)")
+    recover.add_argument("--no-unlock", action="store_true",
+                         help="only report the password")
+    add_save_arguments(recover)
+    recover.add_argument("--stats-jsonl", metavar="FILE",
+                         help="append throughput statistics to FILE as JSON lines "
+                              "('-' for stdout)")
+    recover.add_argument("--stats-interval", type=float, default=stats.DEFAULT_INTERVAL,
+                         metavar="SECONDS", help="seconds between statistics lines "
+                                                 f"(default: {stats.DEFAULT_INTERVAL:g})")
+    recover.add_argument("-q", "--quiet", action="store_true",
+                         help="no progress output")
+    recover.set_defaults(func=cmd_recover)
+
+    batch_cmd = commands.add_parser("batch", help="recover every PDF in folders or globs")
+    batch_cmd.add_argument("inputs", nargs="+", metavar="PATH",
+                           help="PDF file, directory (searched recursively) or glob")
+    add_candidate_arguments(batch_cmd)
+    add_pool_arguments(batch_cmd)
+    batch_cmd.add_argument("--threads", type=int, default=batch.CLASSIFY_THREADS,
+                           help="threads used to classify the files "
+                                f"(default: {batch.CLASSIFY_THREADS})")
+    batch_cmd.add_argument("--report", metavar="FILE",
+                           help="write a per-file report (.json for JSON, otherwise CSV)")
+    batch_cmd.add_argument("--output-dir", metavar="DIR",
+                           help="save unlocked copies of the recovered files here")
+    add_save_arguments(batch_cmd)
+    batch_cmd.add_argument("--no-cache", action="store_true",
+                           help="neither skip nor remember candidates tried in earlier runs")
+    batch_cmd.add_argument("-q", "--quiet", action="store_true",
+                           help="no per-file output")
+    batch_cmd.set_defaults(func=cmd_batch)
+
+    coordinate = commands.add_parser("coordinate",
+                                     help="search with workers on several machines "
+                                          "(see 'work')")
+    coordinate.add_argument("file")
+    add_candidate_arguments(coordinate)
+    coordinate.add_argument("--listen", default=distributed.DEFAULT_ADDRESS,
+                            metavar="HOST:PORT",
+                            help="where workers connect: HOST:PORT (0.0.0.0 for every "
+                                 "interface) or unix:PATH "
+                                 f"(default: {distributed.DEFAULT_ADDRESS})")
+    coordinate.add_argument("--token", default=os.environ.get(distributed.TOKEN_VARIABLE),
+                            help="shared secret workers must present (default: "
+                                 f"${distributed.TOKEN_VARIABLE})")
+    coordinate.add_argument("--spawn", type=int, default=0, metavar="N",
+                            help="also start N worker processes on this machine")
+    coordinate.add_argument("--lease-size", type=int, default=None, metavar="N",
+                            help="candidates per lease (default: about "
+                                 f"{distributed.LEASE_TARGET_SECONDS:g}s of work for "
+                                 "the worker)")
+    coordinate.add_argument("--lease-timeout", type=float, default=distributed.LEASE_TIMEOUT,
+                            metavar="SECONDS",
+                            help="hand a lease out again when its worker has been silent "
+                                 f"this long (default: {distributed.LEASE_TIMEOUT:g})")
+    coordinate.add_argument("--resume", action="store_true",
+                            help="continue an interrupted search with the same options")
+    coordinate.add_argument("--session", metavar="FILE",
+                            help="session file (default: one per document in ~/.pdfunlocker)")
+    coordinate.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL,
+                            metavar="SECONDS", help="how often to save the session "
+                                                    f"(default: {CHECKPOINT_INTERVAL:g})")
+    coordinate.add_argument("--no-session", action="store_true",
+                            help="do not save progress")
+    coordinate.add_argument("--no-cache", action="store_true",
+                            help="neither recall nor remember the recovered password")
+    coordinate.add_argument("-o", "--output",
+                            help="where to save the unlocked PDF (default: *_unlocked.pdf)")
+    coordinate.add_argument("--no-unlock", action="store_true",
+                            help="only report the password")
+    add_save_arguments(coordinate)
+    coordinate.add_argument("-q", "--quiet", action="store_true",
+                            help="no progress output")
+    coordinate.set_defaults(func=cmd_coordinate)
+
+    work = commands.add_parser("work", help="check candidates handed out by a coordinator")
+    work.add_argument("address", metavar="HOST:PORT",
+                      help="the coordinator's address (HOST:PORT or unix:PATH)")
+    work.add_argument("--token", default=os.environ.get(distributed.TOKEN_VARIABLE),
+                      help=f"the coordinator's shared secret (default: "
+                           f"${distributed.TOKEN_VARIABLE})")
+    add_pool_arguments(work)
+    work.add_argument("--connect-timeout", type=float, default=distributed.CONNECT_TIMEOUT,
+                      metavar="SECONDS",
+                      help="how long to wait for the coordinator to come up "
+                           f"(default: {distributed.CONNECT_TIMEOUT:g})")
+    work.add_argument("-q", "--quiet", action="store_true",
+                      help="no output")
+    work.set_defaults(func=cmd_work)
+
+    bench = commands.add_parser("benchmark",
+                                help="measure password checks per second on generated files")
+    bench.add_argument("--pages", type=_int_list, default=None,
+                       help="comma separated page counts (default: "
+                            + ",".join(map(str, benchmark.DEFAULT_PAGES)) + ")")
+    bench.add_argument("--profile", action="append",
+                       choices=[profile[0] for profile in benchmark.PROFILES],
+                       help="security revision to test (repeatable, default: all)")
+    bench.add_argument("--method", action="append", choices=list(benchmark.METHODS),
+                       help="checking method to test (repeatable, default: all)")
+    bench.add_argument("--seconds", type=float, default=benchmark.DEFAULT_SECONDS,
+                       help="time spent on each measurement")
+    bench.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    bench.add_argument("-q", "--quiet", action="store_true",
+                       help="no per-measurement lines on stderr")
+    bench.set_defaults(func=cmd_benchmark)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except core.PDFLibraryError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    except (RuleError, MaskError, MarkovError, core.PDFSyntaxError,
+            distributed.DistributedError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("\nInterrupted - run again with --resume to continue", file=sys.stderr)
+        return 130
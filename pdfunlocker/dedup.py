@@ -0,0 +1,379 @@
+"""
+Streaming candidate deduplication
+Drops candidates a stream has already produced (a wordlist entry the
+built-in list or a rule variation already yielded, say), so nothing is
+checked twice however the sources overlap.
+
+Each candidate is reduced to a 64-bit fingerprint kept in an array-backed
+open-addressing table: 8 bytes a slot and no Python object per entry.
+When the table is full at its memory cap it is sorted into a run file on
+disk and emptied. Later candidates are looked up in the table, then in
+each run, by binary search through a small in-memory index of the run
+and one block read from the file. Once there are too many runs they are
+merged into one. With NumPy, candidates are fingerprinted and looked up
+BATCH_SIZE at a time, so the stage keeps up with the parallel engine.
+
+Only streams that can repeat a candidate need this: deduplicate() wraps
+a Scheduler with more than one source, or with rule variations (two
+words can vary into the same candidate), and leaves the others alone.
+
+Candidates are compared as the bytes the security handler checks: given
+the document's revision, a str is encoded as encode_password() does, so
+'é' from the built-in list and b'\xe9' from a wordlist are one candidate
+for revisions 2-4 and two for 5 and 6. Without a revision only ASCII
+text is taken as equal to its bytes.
+
+The first occurrence of each candidate is kept, in stream order, so the
+deduplicated stream is as deterministic as its input and a session
+position means the same thing when a search is resumed. A new candidate
+is only dropped by mistake if its fingerprint collides with one already
+seen: odds of about n / 2**64 after n candidates.
+"""
+
+import hashlib
+import heapq
+import itertools
+import mmap
+import os
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+
+from . import vectorized
+from .security import encode_password
+
+# Memory cap of the in-memory table, in bytes (it starts small and doubles up to it)
+DEFAULT_MEMORY = 256 * 1024 * 1024
+MIN_MEMORY = 64 * 1024
+
+# Spill once the table is this full (linear probing slows down past it)
+MAX_LOAD = 0.5
+
+# One index entry per this many fingerprints of a run (the block read per lookup)
+RUN_BLOCK = 512
+
+# Merge all runs into one when there are more than this many
+MAX_RUNS = 8
+
+# Without NumPy a spill is sorted this many fingerprints at a time
+SORT_CHUNK = 1 << 20
+
+# Fingerprints written or merged per file operation
+IO_CHUNK = 1 << 16
+
+# Candidates fingerprinted and looked up together when NumPy is available
+BATCH_SIZE = 4096
+
+_EMPTY = 0  # Table slot marker; a zero fingerprint is stored as 1
+
+
+def _digest(candidate, revision):
+    if revision is not None:
+        candidate = encode_password(candidate, revision)
+    elif isinstance(candidate, str):
+        if not candidate.isascii():
+            # Encoded differently by different revisions: never equal to bytes
+            return hashlib.blake2b(candidate.encode("utf-8"), digest_size=8,
+                                   person=b"str").digest()
+        candidate = candidate.encode("ascii")
+    return hashlib.blake2b(candidate, digest_size=8).digest()
+
+
+def fingerprint(candidate, revision=None):
+    """64-bit fingerprint of the bytes a candidate is checked as (see the module docstring)"""
+    return int.from_bytes(_digest(candidate, revision), "little") or 1
+
+
+def fingerprints(np, candidates, revision=None):
+    """fingerprint() of many candidates, as a NumPy uint64 array"""
+    digests = b"".join(_digest(candidate, revision) for candidate in candidates)
+    values = np.frombuffer(digests, dtype="<u8").astype(np.uint64)
+    values[values == _EMPTY] = 1
+    return values
+
+
+class _Run:
+    """A sorted file of fingerprints, with every RUN_BLOCK-th one kept in memory"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = os.path.getsize(path) // 8
+        self._file = open(path, "rb")
+        self._map = None
+        if self.count:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = array("Q")
+        for first in range(0, self.count, RUN_BLOCK):
+            self.index.append(self._block(first // RUN_BLOCK)[0])
+
+    def _block(self, number):
+        values = array("Q")
+        start = number * RUN_BLOCK * 8
+        values.frombytes(self._map[start:start + RUN_BLOCK * 8])
+        return values
+
+    def __contains__(self, value):
+        number = bisect_right(self.index, value) - 1
+        if number < 0:
+            return False
+        block = self._block(number)
+        position = bisect_left(block, value)
+        return position < len(block) and block[position] == value
+
+    def contains_many(self, np, values):
+        """A boolean array: whether each of the sorted, distinct values is in the run"""
+        if not self.count:
+            return np.zeros(len(values), dtype=bool)
+        run = np.frombuffer(self._map, dtype=np.uint64)
+        positions = np.minimum(np.searchsorted(run, values), self.count - 1)
+        return run[positions] == values
+
+    def __iter__(self):
+        for start in range(0, self.count * 8, IO_CHUNK * 8):
+            values = array("Q")
+            values.frombytes(self._map[start:start + IO_CHUNK * 8])
+            yield from values
+
+    def delete(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+        os.unlink(self.path)
+
+
+def _zeros(count):
+    return array("Q", [_EMPTY]) * count
+
+
+def _write_run(path, values):
+    """Write sorted fingerprints (any iterable) to path, IO_CHUNK at a time"""
+    with open(path, "wb") as f:
+        chunk = array("Q")
+        for value in values:
+            chunk.append(value)
+            if len(chunk) >= IO_CHUNK:
+                chunk.tofile(f)
+                chunk = array("Q")
+        chunk.tofile(f)
+
+
+class FingerprintSet:
+    """A set of 64-bit fingerprints that holds at most `memory` bytes in its table
+
+    Fingerprints past the cap live in sorted run files in a temporary
+    directory (under `directory`, default the system temp dir), which
+    close() deletes.
+    """
+
+    def __init__(self, memory=DEFAULT_MEMORY, directory=None):
+        # Slot counts are powers of two, so a slot is fingerprint & mask
+        self.max_slots = 1 << ((max(MIN_MEMORY, memory) // 8).bit_length() - 1)
+        self._allocate(min(self.max_slots, MIN_MEMORY // 8))
+        self.directory = directory
+        self.runs = []
+        self.spills = 0
+        self._temp = None
+        self._names = 0
+
+    def _allocate(self, slots):
+        self.table = _zeros(slots)
+        self.mask = slots - 1
+        self.limit = int(slots * MAX_LOAD)
+        self.count = 0  # In the table
+
+    def __len__(self):
+        return self.count + sum(run.count for run in self.runs)
+
+    def add(self, value):
+        """Add a fingerprint; returns False if it was already in the set"""
+        table = self.table
+        mask = self.mask
+        slot = value & mask
+        while True:
+            current = table[slot]
+            if current == _EMPTY:
+                break
+            if current == value:
+                return False
+            slot = (slot + 1) & mask
+        for run in self.runs:
+            if value in run:
+                return False
+        table[slot] = value
+        self.count += 1
+        if self.count >= self.limit:
+            if len(table) < self.max_slots:
+                self._grow()
+            else:
+                self._spill()
+        return True
+
+    def add_many(self, np, values):
+        """Add a batch of fingerprints (a NumPy uint64 array, in stream order)
+
+        Returns a boolean array: True where a value was not in the set
+        before, counting only its first occurrence in the batch.
+        """
+        new = np.zeros(len(values), dtype=bool)
+        distinct, first = np.unique(values, return_index=True)
+        unseen = ~self._table_contains(np, distinct)
+        for run in self.runs:
+            unseen[unseen] = ~run.contains_many(np, distinct[unseen])
+        distinct = distinct[unseen]
+        if self.count + len(distinct) >= self.limit:
+            while len(self.table) < self.max_slots \
+                    and self.count + len(distinct) >= self.limit:
+                self._grow(np)
+            if self.count + len(distinct) >= self.limit:
+                self._spill()
+        self._insert(np, distinct)
+        new[first[unseen]] = True
+        return new
+
+    def _table_contains(self, np, values):
+        """Linear probing for many distinct values at once"""
+        table = np.frombuffer(self.table, dtype=np.uint64)
+        mask = np.uint64(self.mask)
+        found = np.zeros(len(values), dtype=bool)
+        active = np.arange(len(values))
+        slots = values & mask
+        while len(active):
+            current = table[slots]
+            found[active[current == values[active]]] = True
+            going = (current != _EMPTY) & (current != values[active])
+            active = active[going]
+            slots = (slots[going] + np.uint64(1)) & mask
+        return found
+
+    def _insert(self, np, values):
+        """Put distinct values that are not in the table yet into it"""
+        table = np.frombuffer(self.table, dtype=np.uint64)
+        mask = np.uint64(self.mask)
+        self.count += len(values)
+        slots = values & mask
+        while len(values):
+            free = table[slots] == _EMPTY
+            # Values after the same free slot: the first one takes it, the rest move on
+            _, winners = np.unique(slots[free], return_index=True)
+            placed = np.flatnonzero(free)[winners]
+            table[slots[placed]] = values[placed]
+            moving = np.ones(len(values), dtype=bool)
+            moving[placed] = False
+            values = values[moving]
+            slots = (slots[moving] + np.uint64(1)) & mask
+
+    def _grow(self, np=None):
+        """Double the table and re-insert its fingerprints"""
+        old = self.table
+        self._allocate(len(old) * 2)
+        if np is not None:
+            values = np.frombuffer(old, dtype=np.uint64)
+            self._insert(np, values[values != _EMPTY])
+            return
+        self.count = len(old) - old.count(_EMPTY)
+        table = self.table
+        mask = self.mask
+        for value in old:
+            if value != _EMPTY:
+                slot = value & mask
+                while table[slot] != _EMPTY:
+                    slot = (slot + 1) & mask
+                table[slot] = value
+
+    def _run_path(self):
+        if self._temp is None:
+            self._temp = tempfile.TemporaryDirectory(prefix="pdfunlocker-dedup-",
+                                                     dir=self.directory)
+        self._names += 1
+        return os.path.join(self._temp.name, f"run-{self._names}.bin")
+
+    def _spill(self):
+        """Move the table's fingerprints to sorted runs on disk and empty it"""
+        np = vectorized.load_numpy() if vectorized.NUMPY_AVAILABLE else None
+        if np is not None:
+            values = np.frombuffer(self.table, dtype=np.uint64)
+            chunks = [np.sort(values[values != _EMPTY])]
+        else:
+            chunks = (sorted(value for value in self.table[first:first + SORT_CHUNK]
+                             if value != _EMPTY)
+                      for first in range(0, len(self.table), SORT_CHUNK))
+        for chunk in chunks:
+            if len(chunk):
+                path = self._run_path()
+                if np is not None:
+                    chunk.tofile(path)
+                else:
+                    _write_run(path, chunk)
+                self.runs.append(_Run(path))
+        self._allocate(len(self.table))
+        self.spills += 1
+        if len(self.runs) > MAX_RUNS:
+            self._merge()
+
+    def _merge(self):
+        """Merge every run into one (runs never share a fingerprint)"""
+        path = self._run_path()
+        _write_run(path, heapq.merge(*self.runs))
+        for run in self.runs:
+            run.delete()
+        self.runs = [_Run(path)]
+
+    def close(self):
+        """Delete the run files"""
+        for run in self.runs:
+            run.delete()
+        self.runs = []
+        if self._temp is not None:
+            self._temp.cleanup()
+            self._temp = None
+
+
+class Deduplicator:
+    """A candidate stream with repeats removed (see the module docstring)
+
+    `revision` is the document's security handler revision, if known.
+    Iterating starts over with an empty set, like iterating the source
+    again. `duplicates` counts what the last iteration dropped.
+    """
+
+    def __init__(self, candidates, memory=DEFAULT_MEMORY, directory=None, revision=None):
+        self.candidates = candidates
+        self.memory = memory
+        self.directory = directory
+        self.revision = revision
+        self.duplicates = 0
+
+    def __iter__(self):
+        seen = FingerprintSet(self.memory, self.directory)
+        self.duplicates = 0
+        np = vectorized.load_numpy() if vectorized.NUMPY_AVAILABLE else None
+        revision = self.revision
+        try:
+            if np is None:
+                add = seen.add
+                for candidate in self.candidates:
+                    if add(fingerprint(candidate, revision)):
+                        yield candidate
+                    else:
+                        self.duplicates += 1
+                return
+            iterator = iter(self.candidates)
+            while True:
+                batch = list(itertools.islice(iterator, BATCH_SIZE))
+                if not batch:
+                    return
+                new = seen.add_many(np, fingerprints(np, batch, revision))
+                for candidate, keep in zip(batch, new.tolist()):
+                    if keep:
+                        yield candidate
+                self.duplicates += len(batch) - int(new.sum())
+        finally:
+            seen.close()
+
+
+def deduplicate(schedule, memory=DEFAULT_MEMORY, directory=None, revision=None):
+    """A Deduplicator around a Scheduler that can repeat a candidate, else the Scheduler"""
+    streams = len(schedule.sources) + (1 if schedule.first else 0)
+    if streams > 1 or any(getattr(source, "rules", None) for source in schedule.sources):
+        return Deduplicator(schedule, memory, directory, revision)
+    return schedule
@@ -0,0 +1,668 @@
+"""
+Distributed recovery
+A coordinator owns the keyspace of one search and hands it out in leases
+to workers on any number of machines, over a TCP or Unix socket:
+
+    python -m pdfunlocker coordinate file.pdf --listen 0.0.0.0:7878 --mask '?a?a?a?a?a?a'
+    python -m pdfunlocker work coordinator-host:7878
+
+A lease is a range of candidate indexes. Index-addressable sources (masks)
+are described to each worker once, so a lease is just [first, last); for
+other streams (wordlists, rules, the built-in list) the coordinator reads
+the candidates and the lease carries them. Either way workers need
+neither the PDF nor the wordlists, only the document's encryption
+parameters: they check leases with the same PasswordVerifier engine as a
+local search and report a hit, which the coordinator confirms with
+core.verify, just like the GUI's test_password does.
+
+Workers renew their lease with a heartbeat while they check it. A lease
+whose worker disconnects or stops sending heartbeats is handed out again,
+and the first confirmed hit stops everyone.
+
+Messages are JSON objects, one per line. Nothing is encrypted, so use a
+trusted network or a Unix socket, and a shared --token.
+"""
+
+import base64
+import collections
+import hmac
+import itertools
+import json
+import os
+import socket
+import socketserver
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+from . import core
+from .engine import ParallelSearch, SearchResult, WorkerPool, calibrate, default_workers, is_indexed
+from .mask import Mask
+from .security import EncryptionParams, PasswordVerifier
+from .session import CHECKPOINT_INTERVAL, Checkpointer
+
+PROTOCOL_VERSION = 1
+DEFAULT_ADDRESS = "127.0.0.1:7878"
+
+# Size leases so each takes about this long on the worker that gets it
+LEASE_TARGET_SECONDS = 10.0
+MAX_LEASE_SIZE = 1000000
+# Leases that carry their candidates are kept smaller
+MAX_LIST_LEASE_SIZE = 50000
+
+# A lease that is neither finished nor renewed within this time is handed out again
+LEASE_TIMEOUT = 60.0
+HEARTBEAT_INTERVAL = 5.0
+
+# How long a worker keeps trying to reach a coordinator that is not up yet
+CONNECT_TIMEOUT = 30.0
+
+# How long a worker waits when every remaining lease is taken
+WAIT_SECONDS = 1.0
+
+MAX_MESSAGE = 64 * 1024 * 1024
+
+# Environment variable the work command reads its token from
+TOKEN_VARIABLE = "PDFUNLOCKER_TOKEN"
+
+
+class DistributedError(Exception):
+    """Raised for bad addresses, refused workers and protocol errors"""
+
+
+def parse_address(text):
+    """(socket.AF_UNIX, path) for 'unix:PATH', otherwise (socket.AF_INET, (host, port))"""
+    if text.startswith("unix:"):
+        if not hasattr(socket, "AF_UNIX"):
+            raise DistributedError("Unix sockets are not available on this system")
+        return socket.AF_UNIX, text[len("unix:"):]
+    host, _, port = text.rpartition(":")
+    try:
+        port = int(port)
+    except ValueError:
+        raise DistributedError(f"Invalid address {text!r} (use HOST:PORT or unix:PATH)")
+    return socket.AF_INET, (host or "127.0.0.1", port)
+
+
+def send_message(stream, message):
+    stream.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def read_message(stream):
+    """The next message, or None once the other side has closed the connection"""
+    line = stream.readline(MAX_MESSAGE)
+    if not line:
+        return None
+    if not line.endswith(b"\n"):
+        raise DistributedError("Message too long or cut off")
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise DistributedError("Malformed message")
+    return message
+
+
+def encode_candidate(candidate):
+    """JSON form of a candidate: 's:' + text or 'b:' + base64 bytes (None stays None)"""
+    if candidate is None:
+        return None
+    if isinstance(candidate, str):
+        return "s:" + candidate
+    return "b:" + base64.b64encode(candidate).decode("ascii")
+
+
+def decode_candidate(value):
+    if value is None:
+        return None
+    if value.startswith("s:"):
+        return value[2:]
+    if value.startswith("b:"):
+        return base64.b64decode(value[2:])
+    raise DistributedError(f"Malformed candidate {value[:20]!r}")
+
+
+def describe_source(source):
+    """What a worker needs to rebuild an index-addressable source, or None if it cannot"""
+    if isinstance(source, Mask):
+        return {"type": "mask", "mask": source.mask, "charsets": source.charset_definitions}
+    return None
+
+
+def build_source(spec):
+    """The source describe_source() described"""
+    if spec.get("type") == "mask":
+        return Mask(spec["mask"], spec["charsets"])
+    raise DistributedError(f"Unknown source type {spec.get('type')!r}")
+
+
+class LeaseRange:
+    """Indexes below `last` of an index-addressable source
+
+    ParallelSearch.run(LeaseRange(source, last), start=first) checks
+    exactly the lease [first, last).
+    """
+
+    def __init__(self, source, last):
+        self.source = source
+        self.keyspace = last
+
+    def iter_range(self, start, stop=None):
+        stop = self.keyspace if stop is None else min(stop, self.keyspace)
+        return self.source.iter_range(start, stop)
+
+
+class Lease:
+    """Candidates first .. last-1, held by at most one worker at a time"""
+
+    def __init__(self, number, first, last, candidates=None):
+        self.number = number
+        self.first = first
+        self.last = last
+        self.candidates = candidates  # Encoded, when the workers cannot generate them
+        self.worker = None
+        self.expires = 0.0
+
+    def message(self):
+        message = {"type": "lease", "lease": self.number, "first": self.first, "last": self.last}
+        if self.candidates is not None:
+            message["candidates"] = self.candidates
+        return message
+
+
+class _Worker:
+    """A connected worker as the coordinator sees it"""
+
+    def __init__(self, name, processes):
+        self.name = name
+        self.processes = processes
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.coordinator.serve(self.rfile, self.wfile, self.client_address)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class Coordinator:
+    """Hands a search's keyspace out to workers as leases and collects the results
+
+    listen() binds the socket and starts serving; run() then waits until
+    a hit is confirmed, the keyspace is exhausted or stop() is called,
+    and returns a SearchResult. With a session, the position below which
+    every lease is finished is checkpointed, as in core.search. A
+    stats.ThroughputMeter is fed every finished lease with its worker.
+    """
+
+    def __init__(self, path, candidates, address=DEFAULT_ADDRESS, start=0, lease_size=None,
+                 lease_timeout=LEASE_TIMEOUT, token=None, session=None,
+                 checkpoint_interval=CHECKPOINT_INTERVAL, meter=None, log=None):
+        params = EncryptionParams.from_file(path)
+        if not PasswordVerifier.supports(params):
+            raise DistributedError("Distributed recovery needs the built-in password check, "
+                                   "which does not support this document")
+        self.path = path
+        self.params = params
+        self.verifier = PasswordVerifier(params)
+        self.source = candidates
+        self.indexed = is_indexed(candidates)
+        self.spec = describe_source(candidates) if self.indexed else None
+        self.address = address
+        self.lease_size = lease_size
+        self.lease_timeout = lease_timeout
+        self.token = token
+        self.session = session
+        self.checkpoint_interval = checkpoint_interval
+        self.meter = meter
+        self.log = log or (lambda line: None)
+        self.progress = None
+
+        self.attempts = 0
+        self.completed = start  # Every candidate below this index has been checked
+        self.workers = {}  # name -> _Worker, while connected
+        self.server = None
+        self._next = start
+        self._iterator = None if self.indexed else itertools.islice(iter(candidates), start, None)
+        self._exhausted = False
+        self._leases = {}  # number -> unfinished Lease
+        self._requeued = collections.deque()  # numbers of leases to hand out again
+        self._finished = {}  # first -> last of finished leases past the watermark
+        self._numbers = itertools.count(1)
+        self._cost = None
+        self._hit = None
+        self._stopped = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    # Serving
+
+    def listen(self):
+        """Bind the socket and serve workers on a background thread; returns the bound address"""
+        family, location = parse_address(self.address)
+        self._cost = calibrate(self.verifier)
+        if family == socket.AF_INET:
+            self.server = _TCPServer(location, _Handler)
+            host, port = self.server.server_address[:2]
+            self.address = f"{host}:{port}"
+        else:
+            try:
+                if stat.S_ISSOCK(os.stat(location).st_mode):
+                    os.unlink(location)  # Left over from an earlier run
+            except FileNotFoundError:
+                pass
+            self.server = _UnixServer(location, _Handler)
+        self.server.coordinator = self
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.2},
+                         daemon=True).start()
+        return self.address
+
+    @property
+    def local_address(self):
+        """Where a worker on this machine connects (0.0.0.0 is not an address to connect to)"""
+        if self.address.startswith("0.0.0.0:"):
+            return "127.0.0.1:" + self.address.split(":", 1)[1]
+        return self.address
+
+    def run(self, progress=None):
+        """Serve until the search is over; progress(attempts) is called as leases finish"""
+        self.progress = progress
+        if self.server is None:
+            self.listen()
+        started = time.perf_counter()
+        checkpointer = None
+        if self.session is not None:
+            checkpointer = Checkpointer(self.session, lambda: self.completed,
+                                        self.checkpoint_interval)
+            checkpointer.start()
+        try:
+            while not self._done.wait(1.0):
+                with self._lock:
+                    self._expire()
+        finally:
+            self._done.set()
+            if checkpointer is not None:
+                checkpointer.finish()
+            self.server.shutdown()
+            self.server.server_close()
+            if self.server.address_family != socket.AF_INET:
+                try:
+                    os.unlink(parse_address(self.address)[1])
+                except OSError:
+                    pass
+
+        if self._hit is not None:
+            result = SearchResult(self._hit[0], self._hit[1], self.attempts)
+        else:
+            result = SearchResult(attempts=self.attempts, stopped=self._stopped)
+        result.elapsed = time.perf_counter() - started
+        if self.session is not None and not result.stopped:
+            self.session.discard()
+        return result
+
+    def stop(self):
+        """Finish early (safe from another thread); workers are told to stop"""
+        self._stopped = True
+        self._done.set()
+
+    def serve(self, rfile, wfile, client_address):
+        """Talk to one worker until it disconnects"""
+        worker = None
+        try:
+            hello = read_message(rfile)
+            if hello is None:
+                return
+            error = self._refusal(hello)
+            if error:
+                send_message(wfile, {"type": "error", "message": error})
+                return
+            name = f"{hello.get('host') or client_address}/{hello.get('pid')}"
+            worker = _Worker(name, max(1, int(hello.get("workers") or 1)))
+            with self._lock:
+                self.workers[name] = worker
+            self.log(f"Worker {name} connected ({worker.processes} processes)")
+            send_message(wfile, {"type": "job", "params": self.params.as_dict(),
+                                 "source": self.spec})
+            while True:
+                message = read_message(rfile)
+                if message is None:
+                    return
+                kind = message.get("type")
+                if kind == "lease":
+                    reply = self._assign(worker)
+                elif kind == "done":
+                    self._complete(worker, message)
+                    reply = self._assign(worker)
+                elif kind == "found":
+                    self._found(worker, message)
+                    reply = self._assign(worker)
+                elif kind == "heartbeat":
+                    reply = self._renew(worker, message)
+                else:
+                    reply = {"type": "error", "message": f"Unknown message type {kind!r}"}
+                send_message(wfile, reply)
+        except (OSError, ValueError, KeyError, TypeError, DistributedError) as e:
+            self.log(f"Worker {worker.name if worker else client_address}: {e}")
+        finally:
+            if worker is not None:
+                self._disconnect(worker)
+
+    def _refusal(self, hello):
+        """Why a worker's hello is refused, or None"""
+        if hello.get("type") != "hello" or hello.get("version") != PROTOCOL_VERSION:
+            return f"This coordinator speaks protocol version {PROTOCOL_VERSION}"
+        if self.token and not hmac.compare_digest(str(hello.get("token") or "").encode("utf-8"),
+                                                  self.token.encode("utf-8")):
+            return "Wrong token"
+        return None
+
+    # Leases (all called with self._lock held, except the public handlers)
+
+    def _lease_size(self, worker):
+        if self.lease_size:
+            return self.lease_size
+        per_process = LEASE_TARGET_SECONDS / self._cost if self._cost else MAX_LEASE_SIZE
+        limit = MAX_LEASE_SIZE if self.spec is not None else MAX_LIST_LEASE_SIZE
+        return int(max(self.verifier.batch_size, min(limit, per_process * worker.processes)))
+
+    def _new_lease(self, size):
+        first = self._next
+        if self.indexed:
+            last = min(first + size, self.source.keyspace)
+            if first >= last:
+                return None
+            candidates = None
+            if self.spec is None:
+                candidates = [encode_candidate(candidate)
+                              for candidate in self.source.iter_range(first, last)]
+        else:
+            candidates = [encode_candidate(candidate)
+                          for candidate in itertools.islice(self._iterator, size)]
+            if not candidates:
+                return None
+            last = first + len(candidates)
+        self._next = last
+        return Lease(next(self._numbers), first, last, candidates)
+
+    def _assign(self, worker):
+        """The reply to a worker asking for work: a lease, 'wait' or 'stop'"""
+        with self._lock:
+            if self._done.is_set():
+                return {"type": "stop"}
+            self._expire()
+            lease = None
+            while self._requeued and lease is None:
+                lease = self._leases.get(self._requeued.popleft())
+            if lease is None and not self._exhausted:
+                lease = self._new_lease(self._lease_size(worker))
+                if lease is None:
+                    self._exhausted = True
+                else:
+                    self._leases[lease.number] = lease
+            if lease is None:
+                if not self._leases:
+                    self._done.set()  # Everything checked, no hit
+                    return {"type": "stop"}
+                return {"type": "wait", "seconds": WAIT_SECONDS}
+            lease.worker = worker.name
+            lease.expires = time.monotonic() + self.lease_timeout
+            return lease.message()
+
+    def _expire(self):
+        now = time.monotonic()
+        for lease in self._leases.values():
+            if lease.worker is not None and lease.expires < now:
+                self.log(f"Lease {lease.number} of {lease.worker} expired; handing it out again")
+                self._release(lease)
+
+    def _release(self, lease):
+        lease.worker = None
+        self._requeued.append(lease.number)
+
+    def _finish_lease(self, lease, checked):
+        """Count a lease as checked and advance the watermark"""
+        del self._leases[lease.number]
+        self.attempts += checked
+        self._finished[lease.first] = lease.last
+        completed = self.completed
+        while completed in self._finished:
+            completed = self._finished.pop(completed)
+        self.completed = completed
+
+    def _split_lease(self, lease, checked):
+        """Finish the first `checked` candidates of a lease and hand out the rest again"""
+        rest = Lease(next(self._numbers), lease.first + checked, lease.last,
+                     None if lease.candidates is None else lease.candidates[checked:])
+        if rest.first < rest.last:
+            self._leases[rest.number] = rest
+            self._requeued.append(rest.number)
+        lease.last = rest.first
+        self._finish_lease(lease, checked)
+
+    def _complete(self, worker, message):
+        with self._lock:
+            lease = self._leases.get(message["lease"])
+            if lease is None:
+                return  # Handed out again and finished by another worker
+            checked = lease.last - lease.first
+            self._finish_lease(lease, checked)
+            attempts = self.attempts
+        if self.meter is not None:
+            self.meter.record(checked, worker.name, message.get("seconds"))
+        if self.progress:
+            self.progress(attempts)
+
+    def _found(self, worker, message):
+        password = decode_candidate(message["password"])
+        index = int(message["index"])
+        # The verifier rejects a bogus report cheaply; pikepdf confirms a real one
+        confirmed = core.verify(self.path, password, self.verifier)
+        with self._lock:
+            lease = self._leases.get(message["lease"])
+            if lease is not None:
+                checked = max(0, min(int(message.get("checked", 0)), lease.last - lease.first))
+                if confirmed:
+                    self._finish_lease(lease, checked)
+                else:
+                    # The rest of the lease was never checked
+                    self._split_lease(lease, checked)
+            if confirmed and self._hit is None:
+                self._hit = (password, index)
+                self._done.set()
+        if confirmed:
+            self.log(f"Worker {worker.name} found the password")
+        else:
+            self.log(f"Worker {worker.name} reported a password that does not open the file")
+
+    def _renew(self, worker, message):
+        with self._lock:
+            if self._done.is_set():
+                return {"type": "stop"}
+            lease = self._leases.get(message.get("lease"))
+            if lease is not None and lease.worker == worker.name:
+                lease.expires = time.monotonic() + self.lease_timeout
+        return {"type": "ok"}
+
+    def _disconnect(self, worker):
+        with self._lock:
+            self.workers.pop(worker.name, None)
+            for lease in self._leases.values():
+                if lease.worker == worker.name:
+                    self._release(lease)
+        if not self._done.is_set():
+            self.log(f"Worker {worker.name} disconnected")
+
+
+class _Connection:
+    """A worker's connection to the coordinator (requests may come from two threads)"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.stream = sock.makefile("rwb")
+        self._lock = threading.Lock()
+
+    def request(self, message):
+        with self._lock:
+            send_message(self.stream, message)
+            reply = read_message(self.stream)
+        if reply is None:
+            raise ConnectionError("the coordinator closed the connection")
+        return reply
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self.sock.close()
+
+
+def connect(address, timeout=CONNECT_TIMEOUT):
+    """Connect to a coordinator, retrying for up to `timeout` seconds while it starts"""
+    family, location = parse_address(address)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if family == socket.AF_INET:
+                sock = socket.create_connection(location)
+            else:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                try:
+                    sock.connect(location)
+                except OSError:
+                    sock.close()
+                    raise
+            return _Connection(sock)
+        except OSError as e:
+            if time.monotonic() >= deadline:
+                raise DistributedError(f"Cannot reach the coordinator at {address}: {e}")
+            time.sleep(0.5)
+
+
+class _Heartbeat(threading.Thread):
+    """Renews a lease while it is checked; stops the search when the coordinator says so"""
+
+    def __init__(self, connection, lease, engine, interval=HEARTBEAT_INTERVAL):
+        super().__init__(daemon=True)
+        self.connection = connection
+        self.lease = lease
+        self.engine = engine
+        self.interval = interval
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.wait(self.interval):
+            try:
+                reply = self.connection.request({"type": "heartbeat", "lease": self.lease})
+            except (OSError, ValueError, DistributedError):
+                reply = {"type": "stop"}
+            if reply.get("type") == "stop":
+                self.engine.stop()
+                return
+
+    def finish(self):
+        self._finished.set()
+        self.join()
+
+
+def _check_lease(connection, engine, source, lease):
+    """Check one lease; returns the report for the coordinator, or None if told to stop"""
+    first = lease["first"]
+    heartbeat = _Heartbeat(connection, lease["lease"], engine)
+    heartbeat.start()
+    started = time.perf_counter()
+    try:
+        if "candidates" in lease:
+            candidates = [decode_candidate(value) for value in lease["candidates"]]
+            result = engine.run(candidates)
+            if result.found:
+                result.index += first
+        else:
+            result = engine.run(LeaseRange(source, lease["last"]), start=first)
+    finally:
+        heartbeat.finish()
+    report = {"lease": lease["lease"], "checked": result.attempts,
+              "seconds": round(time.perf_counter() - started, 3)}
+    if result.found:
+        report.update(type="found", index=result.index,
+                      password=encode_candidate(result.password))
+    elif result.stopped:
+        return None
+    else:
+        report["type"] = "done"
+    return report
+
+
+def run_worker(address, workers=None, token=None, chunk_size=None,
+               connect_timeout=CONNECT_TIMEOUT, log=None):
+    """Check leases from the coordinator at address until it says stop
+
+    Uses a local pool of `workers` processes. Returns the number of
+    candidates this worker checked.
+    """
+    log = log or (lambda line: None)
+    workers = max(1, workers or default_workers())
+    connection = connect(address, connect_timeout)
+    checked = 0
+    try:
+        job = connection.request({"type": "hello", "version": PROTOCOL_VERSION,
+                                  "token": token or "", "host": socket.gethostname(),
+                                  "pid": os.getpid(), "workers": workers})
+        if job.get("type") == "error":
+            raise DistributedError(f"Refused by the coordinator: {job.get('message')}")
+        if job.get("type") != "job":
+            return checked
+        params = EncryptionParams.from_dict(job["params"])
+        source = build_source(job["source"]) if job.get("source") else None
+        log(f"Connected to {address}: {params.algorithm}, revision {params.R}, "
+            f"{workers} processes")
+
+        pool = WorkerPool(workers) if workers > 1 else None
+        try:
+            engine = ParallelSearch(PasswordVerifier(params), workers, chunk_size, pool=pool)
+            reply = connection.request({"type": "lease"})
+            while True:
+                kind = reply.get("type")
+                if kind == "stop":
+                    break
+                if kind == "error":
+                    raise DistributedError(reply.get("message"))
+                if kind == "wait":
+                    time.sleep(reply.get("seconds", WAIT_SECONDS))
+                    reply = connection.request({"type": "lease"})
+                    continue
+                report = _check_lease(connection, engine, source, reply)
+                if report is None:
+                    break
+                checked += report["checked"]
+                if report["type"] == "found":
+                    log(f"Found the password in lease {reply['lease']}")
+                reply = connection.request(report)
+        finally:
+            if pool is not None:
+                pool.close()
+    except OSError as e:
+        log(f"Lost the coordinator: {e}")
+    finally:
+        connection.close()
+    return checked
+
+
+def spawn_workers(address, count, token=None):
+    """Start `count` local worker processes, e.g. to try a setup on one host
+
+    Each runs `python -m pdfunlocker work` with a single search process.
+    """
+    command = [sys.executable, "-m", "pdfunlocker", "work", address, "--workers", "1", "--quiet"]
+    env = dict(os.environ)
+    if token:
+        env[TOKEN_VARIABLE] = token  # Not on the command line, where others could read it
+    return [subprocess.Popen(command, env=env) for _ in range(count)]
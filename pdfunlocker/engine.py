@@ -0,0 +1,395 @@
+"""
+Parallel verification engine
+Shards a candidate stream across a process pool; every worker builds its
+PasswordVerifier once and the first hit stops all the others.
+"""
+
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .security import PasswordVerifier
+
+# Aim for chunks that take this long to check, so IPC stays negligible
+TARGET_CHUNK_SECONDS = 0.2
+MIN_CHUNK_SIZE = 1
+MAX_CHUNK_SIZE = 65536
+
+# calibrate() starts with batches of this many probes
+CALIBRATION_BATCH = 64
+
+# Per-process state, set by _init_worker (or per document in a shared pool)
+_worker_verifier = None
+_worker_params = None
+_worker_stop = None
+
+
+def default_workers():
+    """Number of worker processes to use when none is configured"""
+    return os.cpu_count() or 1
+
+
+def _init_worker(params, stop_event):
+    """Load the document's encryption parameters once per worker"""
+    global _worker_stop
+    _worker_stop = stop_event
+    if params is not None:
+        _use_params(params)
+
+
+def _use_params(params):
+    """Build the verifier for a document unless this worker already has it"""
+    global _worker_verifier, _worker_params
+    if _worker_params is None or _worker_params.fingerprint != params.fingerprint:
+        _worker_verifier = PasswordVerifier(params)
+        _worker_params = params
+
+
+def _check_candidates(start, candidates, params=None):
+    """Check candidates numbered from start (None marks one to skip)
+
+    params is only sent by searches sharing a WorkerPool.
+    Returns (start, number checked, hit index or None, hit password or None,
+    worker pid, seconds spent).
+    """
+    started = time.perf_counter()
+    if params is not None:
+        _use_params(params)
+    find = _worker_verifier.find
+    stop = _worker_stop
+    checked = 0
+    for batch in _batches(candidates, _worker_verifier.batch_size):
+        if stop.is_set():
+            break
+        hit = find(batch)
+        if hit is not None:
+            return (start, checked + hit + 1, start + checked + hit, batch[hit],
+                    os.getpid(), time.perf_counter() - started)
+        checked += len(batch)
+    return start, checked, None, None, os.getpid(), time.perf_counter() - started
+
+
+def _batches(candidates, size):
+    """Split a list or iterator into lists of up to size candidates
+
+    Workers hand each batch to PasswordVerifier.find (size is the
+    verifier's batch_size) and look at the stop flag between batches.
+    """
+    if isinstance(candidates, list):
+        for first in range(0, len(candidates), size):
+            yield candidates[first:first + size]
+        return
+    iterator = iter(candidates)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _check_range(source, start, stop, params=None):
+    """Check an index range of an index-addressable source (e.g. a Mask)"""
+    return _check_candidates(start, source.iter_range(start, stop), params)
+
+
+def is_indexed(source):
+    """Whether a source can generate any index range itself (e.g. a Mask)"""
+    return hasattr(source, "iter_range") and hasattr(source, "keyspace")
+
+
+def calibrate(verifier, budget=0.05):
+    """Measure the cost of one candidate check in seconds
+
+    Probes go through find(), as in a worker, in batches that grow up to
+    the verifier's batch_size: a vectorised check costs less per candidate
+    in larger batches, so the last (largest) batch sets the estimate. An
+    untimed first batch does any one-off setup, such as importing NumPy.
+    """
+    numbers = itertools.count()
+    size = min(verifier.batch_size, CALIBRATION_BATCH)
+
+    def probes(count):
+        return [b"\x00calibration%d" % number for number in itertools.islice(numbers, count)]
+
+    verifier.find(probes(size))
+    elapsed = 0.0
+    calls = 0
+    while True:
+        batch = probes(size)
+        started = time.perf_counter()
+        verifier.find(batch)
+        seconds = time.perf_counter() - started
+        elapsed += seconds
+        calls += 1
+        if elapsed >= budget or calls >= 1000:
+            return seconds / size
+        size = min(size * 4, verifier.batch_size)
+
+
+def calibration_size(verifier):
+    """The fewest probes calibrate() checks (its warm-up batch and one timed batch)"""
+    return 2 * min(verifier.batch_size, CALIBRATION_BATCH)
+
+
+def chunk_size_for(verifier, target=TARGET_CHUNK_SECONDS):
+    """Pick a chunk size so each task runs for about `target` seconds"""
+    return chunk_size_for_cost(calibrate(verifier), target, verifier.batch_size)
+
+
+def chunk_size_for_cost(cost, target=TARGET_CHUNK_SECONDS, batch_size=1):
+    """Chunk size for a known cost per candidate (in seconds)
+
+    A chunk is never smaller than one of the verifier's batches, which
+    would throw away the point of batching.
+    """
+    size = int(target / cost) if cost > 0 else MAX_CHUNK_SIZE
+    return max(MIN_CHUNK_SIZE, batch_size, min(MAX_CHUNK_SIZE, size))
+
+
+class SearchResult:
+    """Outcome of a search run"""
+
+    def __init__(self, password=None, index=None, attempts=0, elapsed=0.0, stopped=False,
+                 skipped=0):
+        self.password = password
+        self.index = index
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.stopped = stopped
+        self.skipped = skipped
+
+    @property
+    def found(self):
+        return self.index is not None
+
+
+class WorkerPool:
+    """A process pool shared by consecutive searches (e.g. a batch of documents)
+
+    Tasks carry the document's parameters; each worker rebuilds its
+    verifier only when the document changes.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or default_workers())
+        context = multiprocessing.get_context()
+        self.stop_event = context.Event()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(None, self.stop_event),
+        )
+
+    def close(self):
+        self.stop_event.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ParallelSearch:
+    """Checks a candidate stream on a pool of worker processes
+
+    With a `tried` filter (see cache.TriedFilter), list candidates already
+    in it are skipped and every candidate proven wrong is added to it.
+    Index-addressable sources are left to sessions instead. A
+    stats.ThroughputMeter is fed every finished task with its worker.
+    """
+
+    def __init__(self, verifier, workers=None, chunk_size=None, tried=None, pool=None,
+                 meter=None):
+        self.verifier = verifier
+        self.meter = meter
+        self.pool = pool
+        if pool is not None:
+            workers = pool.workers
+        self.workers = max(1, workers or default_workers())
+        self.chunk_size = chunk_size or chunk_size_for(verifier)
+        self.tried = tried
+        self.skipped = 0
+        self._stop_event = None
+        self._stop_requested = False
+        # Every candidate below this index has been checked (for checkpoints)
+        self.completed = 0
+
+    def stop(self):
+        """Ask a running search to finish early (safe from another thread)"""
+        self._stop_requested = True
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    def run(self, candidates, progress=None, start=0):
+        """Search candidates, skipping the first `start` of them
+
+        progress(attempts) is called as chunks complete. Index-addressable
+        sources are split into index ranges that workers generate
+        themselves; other iterables are sent over in chunks.
+        """
+        self.completed = start
+        self.skipped = 0
+        started = time.perf_counter()
+        try:
+            if self.workers == 1:
+                result = self._run_inline(candidates, progress, start)
+            else:
+                result = self._run_pool(candidates, progress, start)
+        finally:
+            # A stop request ends one run, even one made before it started
+            self._stop_requested = False
+        result.elapsed = time.perf_counter() - started
+        result.skipped = self.skipped
+        return result
+
+    def _tasks(self, candidates, start):
+        """Yield (function, arguments) tasks covering candidates from start"""
+        if is_indexed(candidates):
+            for first in range(start, candidates.keyspace, self.chunk_size):
+                last = min(first + self.chunk_size, candidates.keyspace)
+                yield _check_range, (candidates, first, last)
+            return
+
+        iterator = itertools.islice(candidates, start, None)
+        tried = self.tried
+        while True:
+            chunk = list(itertools.islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            if tried is not None:
+                # Keep the indexes stable: known-wrong candidates become None
+                chunk = [None if known else candidate
+                         for candidate, known in zip(chunk, tried.check(chunk))]
+                self.skipped += chunk.count(None)
+            yield _check_candidates, (start, chunk)
+            start += len(chunk)
+
+    def _record(self, args, checked, hit):
+        """Add the candidates a finished task proved wrong to the tried filter"""
+        if self.tried is None or not isinstance(args[1], list):
+            return
+        if hit:
+            checked -= 1
+        self.tried.update(candidate for candidate in args[1][:checked]
+                          if candidate is not None)
+
+    def _run_inline(self, candidates, progress, start):
+        find = self.verifier.find
+        batch_size = self.verifier.batch_size
+        meter = self.meter
+        worker = os.getpid()
+        attempts = 0
+        for function, args in self._tasks(candidates, start):
+            task_started = time.perf_counter()
+            if function is _check_range:
+                source, first, last = args
+                chunk = source.iter_range(first, last)
+            else:
+                first, chunk = args
+            checked = 0
+            for batch in _batches(chunk, batch_size):
+                hit = find(batch)
+                if hit is not None:
+                    offset = checked + hit
+                    self._record(args, offset + 1, True)
+                    if meter is not None:
+                        meter.record(offset + 1, worker, time.perf_counter() - task_started)
+                    return SearchResult(batch[hit], first + offset, attempts + offset + 1)
+                checked += len(batch)
+            self._record(args, checked, False)
+            if meter is not None:
+                meter.record(checked, worker, time.perf_counter() - task_started)
+            attempts += checked
+            self.completed = first + checked
+            if progress:
+                progress(attempts)
+            if self._stop_requested:
+                return SearchResult(attempts=attempts, stopped=True)
+        return SearchResult(attempts=attempts)
+
+    def _run_pool(self, candidates, progress, start):
+        if self.pool is not None:
+            executor = self.pool.executor
+            self._stop_event = self.pool.stop_event
+            self._stop_event.clear()
+            extra = (self.verifier.params,)
+        else:
+            context = multiprocessing.get_context()
+            self._stop_event = context.Event()
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.verifier.params, self._stop_event),
+            )
+            extra = ()
+        if self._stop_requested:
+            self._stop_event.set()
+
+        tasks = self._tasks(candidates, start)
+        pending = {}
+        finished = {}  # task start -> end of what it checked, past the watermark
+        attempts = 0
+        hit = None
+        exhausted = False
+
+        try:
+            while True:
+                # Keep every worker busy with one task queued behind it
+                while not exhausted and not self._stop_event.is_set() \
+                        and len(pending) < self.workers * 2:
+                    try:
+                        function, args = next(tasks)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[executor.submit(function, *args, *extra)] = args
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    args = pending.pop(future)
+                    first, checked, index, password, worker, seconds = future.result()
+                    self._record(args, checked, index is not None)
+                    if self.meter is not None:
+                        self.meter.record(checked, worker, seconds)
+                    attempts += checked
+                    finished[first] = first + checked
+                    if index is not None and hit is None:
+                        hit = (password, index)
+                        self._stop_event.set()
+
+                # Advance the watermark over contiguous finished tasks
+                completed = self.completed
+                while completed in finished:
+                    completed = finished.pop(completed)
+                self.completed = completed
+
+                if progress and done:
+                    progress(attempts)
+        finally:
+            self._stop_event.set()
+            if self.pool is None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            elif pending:
+                # Leave the shared pool idle for the next search
+                wait(pending)
+            self._stop_event = None
+
+        if hit is not None:
+            return SearchResult(hit[0], hit[1], attempts)
+        return SearchResult(attempts=attempts, stopped=self._stop_requested)
+
+
+def search(verifier, candidates, workers=None, chunk_size=None, progress=None, start=0,
+           tried=None, meter=None):
+    """Convenience wrapper: run a ParallelSearch over candidates"""
+    return ParallelSearch(verifier, workers, chunk_size, tried,
+                          meter=meter).run(candidates, progress, start)
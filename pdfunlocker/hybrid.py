@@ -0,0 +1,146 @@
+"""
+Hybrid attack keyspace
+Every word of one or more word lists combined with every candidate of a
+mask, appended ("word?d?d?d?d") or prepended ("?d?dword"), which covers
+the usual shape of a real password: a word plus a number or a date.
+
+Like a Mask, any index in [0, keyspace) maps directly to a candidate, so
+the space can be split into exact ranges for worker processes, a search
+can restart from any offset, and its size is known before it starts.
+Each word is combined with the whole mask before the next word, so the
+most popular words are tried first.
+
+Worker tasks carry the Hybrid itself, so it stays small when pickled:
+wordlists travel as their path and line index, and in-memory word lists
+as one packed buffer.
+"""
+
+import itertools
+from array import array
+
+from .wordlist import Wordlist
+
+
+class PackedWords:
+    """An in-memory word list as one bytes buffer and an array of offsets"""
+
+    def __init__(self, words):
+        words = [word.encode("utf-8") if isinstance(word, str) else bytes(word)
+                 for word in words]
+        self.data = b"".join(words)
+        self.offsets = array("I" if len(self.data) < 1 << 32 else "Q", [0])
+        self.offsets.extend(itertools.accumulate(map(len, words)))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return self.words(0, len(self))
+
+    def words(self, start, stop):
+        """Words start .. stop-1"""
+        data = self.data
+        offsets = self.offsets[start:stop + 1]
+        return (data[first:last] for first, last in zip(offsets, offsets[1:]))
+
+
+class Hybrid:
+    """An index-addressable words × mask keyspace
+
+    `words` is a list of word sources: Wordlist objects (plain files start
+    at any word through their line index; compressed ones carry on from
+    where the process last read them; pipes, which can only be read once,
+    are read into memory) or lists of str/bytes. Index i
+    is word i // mask.keyspace combined with mask candidate
+    i % mask.keyspace.
+
+    The words are counted when the size is first needed, since that reads
+    every wordlist once; a GUI builds the Hybrid on its event loop and
+    leaves the counting to the search thread.
+    """
+
+    def __init__(self, words, mask, prepend=False):
+        self.mask = mask
+        self.prepend = prepend
+        self.sources = [source if isinstance(source, Wordlist) and source.regular
+                        else PackedWords(source)
+                        for source in words]
+        self._counts = None
+
+    @property
+    def counts(self):
+        """Words in each source"""
+        if self._counts is None:
+            counts = []
+            for source in self.sources:
+                if isinstance(source, Wordlist):
+                    count = source.count()
+                    if count is None:  # Compressed: a full pass is the only way
+                        count = sum(1 for _ in source)
+                else:
+                    count = len(source)
+                counts.append(count)
+            self._counts = counts
+        return self._counts
+
+    @property
+    def word_count(self):
+        return sum(self.counts)
+
+    @property
+    def keyspace(self):
+        return self.word_count * self.mask.keyspace
+
+    @property
+    def pattern(self):
+        """The attack in one string, e.g. '<word>?d?d?d?d'"""
+        return f"{self.mask.mask}<word>" if self.prepend else f"<word>{self.mask.mask}"
+
+    def __repr__(self):
+        return f"Hybrid({self.pattern!r}, keyspace={self.keyspace})"
+
+    def __iter__(self):
+        return self.iter_range(0, self.keyspace)
+
+    def _words(self, start, stop):
+        """Words start .. stop-1, across the sources in order"""
+        for source, count in zip(self.sources, self.counts):
+            if start < count:
+                last = min(stop, count)
+                if isinstance(source, Wordlist):
+                    yield from source.lines(start, last)
+                else:
+                    yield from source.words(start, last)
+            start = max(0, start - count)
+            stop -= count
+            if stop <= 0:
+                return
+
+    def candidate(self, index):
+        """The candidate at a given index"""
+        if not 0 <= index < self.keyspace:
+            raise IndexError(f"Index {index} outside keyspace {self.keyspace}")
+        number, offset = divmod(index, self.mask.keyspace)
+        word = next(self._words(number, number + 1))
+        tail = self.mask.candidate(offset)
+        return tail + word if self.prepend else word + tail
+
+    def iter_range(self, start, stop=None):
+        """Yield candidates start .. stop-1, reading only the words they need"""
+        stop = self.keyspace if stop is None else min(stop, self.keyspace)
+        if start >= stop:
+            return
+        size = self.mask.keyspace
+        first, offset = divmod(start, size)
+        remaining = stop - start
+        for word in self._words(first, -(-stop // size)):
+            count = min(size - offset, remaining)
+            tails = self.mask.iter_range(offset, offset + count)
+            if self.prepend:
+                for tail in tails:
+                    yield tail + word
+            else:
+                for tail in tails:
+                    yield word + tail
+            remaining -= count
+            offset = 0
@@ -0,0 +1,159 @@
+"""
+GUI log console
+Keeps a long session's log cheap to display: lines are queued and the
+GUI inserts them into its text widget in one batch per timer tick, the
+widget only ever holds the most recent lines (a ring buffer), and the
+complete log streams to a rotating file under data_dir()/logs, which is
+what saving or copying the log reads. Nothing here imports tkinter.
+"""
+
+import collections
+import glob
+import os
+import time
+
+from .session import data_dir
+
+# Lines kept in the widget
+MAX_LINES = 2000
+
+# How often the GUI should insert queued lines
+FLUSH_INTERVAL_MS = 200
+
+# Log file rotation: size of one file and how many older files are kept
+MAX_BYTES = 5 * 1024 * 1024
+BACKUPS = 3
+
+# Session logs kept in data_dir()/logs (older ones are deleted)
+KEEP_SESSIONS = 20
+
+
+def session_log_path(name="gui"):
+    """A new log file name for this process, e.g. logs/gui-20240101-120000-1234.log"""
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(data_dir(), "logs", f"{name}-{stamp}-{os.getpid()}.log")
+
+
+def prune_logs(directory, keep=KEEP_SESSIONS):
+    """Delete all but the newest `keep` session logs (with their rotated files)"""
+    logs = sorted(glob.glob(os.path.join(directory, "*.log")), key=os.path.getmtime)
+    for path in logs[:-keep] if keep else logs:
+        for old in [path] + glob.glob(glob.escape(path) + ".*"):
+            try:
+                os.unlink(old)
+            except OSError:
+                pass
+
+
+class LogConsole:
+    """Log lines for a GUI: batches and a ring buffer for the widget, a rotating file for all
+
+    add() queues a line and writes it to the file; the GUI calls flush()
+    on a timer and applies the result to its widget. Without a usable log
+    file, read() falls back to the lines still in the ring buffer.
+    """
+
+    def __init__(self, path=None, max_lines=MAX_LINES, max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.path = path or session_log_path()
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.recent = collections.deque(maxlen=max_lines)  # what the widget shows
+        self._pending = []
+        self._stamp_second = None
+        self._stamp = ""
+        self._file = None
+        self._size = 0
+        try:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            prune_logs(directory)
+            self._open()
+        except OSError:
+            self._file = None
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._size = os.path.getsize(self.path)
+
+    def _timestamp(self):
+        """(clock, date and time) strings, formatted once per second"""
+        now = time.time()
+        second = int(now)
+        if second != self._stamp_second:
+            self._stamp_second = second
+            self._stamp = (time.strftime("%H:%M:%S", time.localtime(now)),
+                           time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)))
+        return self._stamp
+
+    def add(self, message):
+        """Queue a message for the widget and append it to the log file"""
+        clock, date_time = self._timestamp()
+        self._pending.append(f"[{clock}] {message}")
+        if self._file is not None:
+            self._write(f"{date_time} {message}\n")
+
+    def _write(self, text):
+        try:
+            if self._size + len(text) > self.max_bytes:
+                self._rotate()
+            self._file.write(text)
+            self._size += len(text)  # Characters: close enough for rotation
+        except (OSError, ValueError):
+            self._file = None  # Keep the widget going without the file
+
+    def _rotate(self):
+        """path -> path.1 -> ... -> path.<backups>, then start a new path"""
+        self._file.close()
+        for number in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{number}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{number + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.unlink(self.path)
+        self._open()
+
+    def flush(self):
+        """Lines queued since the last flush as (text to append, lines to delete from the top)"""
+        pending = self._pending
+        if not pending:
+            return "", 0
+        self._pending = []
+        recent = self.recent
+        # Lines that would scroll out before the widget ever showed them are skipped
+        pending = pending[-recent.maxlen:]
+        removed = 0
+        for line in pending:
+            if len(recent) == recent.maxlen:
+                removed += recent[0].count("\n") + 1
+            recent.append(line)
+        return "".join(line + "\n" for line in pending), removed
+
+    def clear(self):
+        """Forget the widget's lines (the log file keeps them)"""
+        self.recent.clear()
+        self._pending = []
+
+    def read(self):
+        """The whole log: the rotated files, oldest first, then the current one"""
+        if self._file is None:
+            return "".join(line + "\n" for line in list(self.recent) + self._pending)
+        self._file.flush()
+        parts = []
+        for number in range(self.backups, 0, -1):
+            parts.append(f"{self.path}.{number}")
+        parts.append(self.path)
+        text = []
+        for part in parts:
+            try:
+                with open(part, "r", encoding="utf-8") as f:
+                    text.append(f.read())
+            except OSError:
+                pass
+        return "".join(text)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,223 @@
+"""
+Markov-chain candidate generator
+Trains a character-level Markov model of order 2-4 on a local password
+corpus (one password per line, plain or compressed like any wordlist)
+and enumerates candidates in descending probability within a length
+range.
+
+Transition probabilities are quantized into integer costs (half bits of
+-log2 p). Enumeration walks the candidates level by level: pass L yields
+every candidate whose total cost is exactly L, depth first with branches
+pruned as soon as they cost more than L. Only the current path is held in
+memory, however large the keyspace.
+
+Trained models are cached under data_dir()/cache in a compact binary
+format, keyed by the corpus path, size, modification time and order, so
+later runs start without re-reading the corpus.
+"""
+
+import hashlib
+import math
+import os
+import struct
+
+from .session import atomic_write, data_dir
+from .wordlist import Wordlist
+
+MIN_ORDER = 2
+MAX_ORDER = 4
+DEFAULT_ORDER = 3
+DEFAULT_MIN_LENGTH = 1
+DEFAULT_MAX_LENGTH = 8
+
+# Cost resolution: one level is half a bit of -log2(probability)
+LEVELS_PER_BIT = 2
+MAX_STEP = 255
+
+END = -1  # transition symbol that ends the candidate
+
+MODEL_MAGIC = b"PUMARKV1"
+_HEADER = struct.Struct(">BI")
+_CONTEXT = struct.Struct(">BH")
+_TRANSITION = struct.Struct(">hB")
+
+
+class MarkovError(ValueError):
+    """Raised for unusable Markov settings or model files"""
+
+
+class MarkovModel:
+    """Transition costs: context bytes -> [(cost, next byte or END)], cheapest first
+
+    The context is the last `order` bytes of the prefix (fewer at the
+    start of a candidate, which is how the start is modelled).
+    """
+
+    def __init__(self, order, transitions):
+        if not MIN_ORDER <= order <= MAX_ORDER:
+            raise MarkovError(f"Markov order must be {MIN_ORDER}-{MAX_ORDER}, not {order}")
+        self.order = order
+        self.transitions = transitions
+
+    @classmethod
+    def train(cls, words, order=DEFAULT_ORDER):
+        """Count the transitions in an iterable of passwords (bytes or str)"""
+        if not MIN_ORDER <= order <= MAX_ORDER:
+            raise MarkovError(f"Markov order must be {MIN_ORDER}-{MAX_ORDER}, not {order}")
+        counts = {}
+        for word in words:
+            if isinstance(word, str):
+                word = word.encode("utf-8")
+            if not word:
+                continue
+            for i in range(len(word) + 1):
+                context = word[max(0, i - order):i]
+                symbol = word[i] if i < len(word) else END
+                table = counts.setdefault(context, {})
+                table[symbol] = table.get(symbol, 0) + 1
+
+        transitions = {}
+        for context, table in counts.items():
+            total = sum(table.values())
+            steps = []
+            for symbol, count in table.items():
+                step = round(-math.log2(count / total) * LEVELS_PER_BIT)
+                steps.append((min(MAX_STEP, step), symbol))
+            steps.sort()
+            transitions[context] = steps
+        return cls(order, transitions)
+
+    def to_bytes(self):
+        parts = [MODEL_MAGIC, _HEADER.pack(self.order, len(self.transitions))]
+        for context, steps in sorted(self.transitions.items()):
+            parts.append(_CONTEXT.pack(len(context), len(steps)))
+            parts.append(context)
+            for step, symbol in steps:
+                parts.append(_TRANSITION.pack(symbol, step))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data.startswith(MODEL_MAGIC):
+            raise MarkovError("Not a Markov model file")
+        pos = len(MODEL_MAGIC)
+        order, context_count = _HEADER.unpack_from(data, pos)
+        pos += _HEADER.size
+        transitions = {}
+        for _ in range(context_count):
+            length, step_count = _CONTEXT.unpack_from(data, pos)
+            pos += _CONTEXT.size
+            context = data[pos:pos + length]
+            pos += length
+            steps = []
+            for _ in range(step_count):
+                symbol, step = _TRANSITION.unpack_from(data, pos)
+                pos += _TRANSITION.size
+                steps.append((step, symbol))
+            transitions[context] = steps
+        return cls(order, transitions)
+
+    def _walk(self, level, min_length, max_length):
+        """Yield (level, candidate) for every candidate of total cost `level`
+
+        Returns True if some branch was cut off for costing more, i.e. a
+        higher level may still hold candidates.
+        """
+        transitions = self.transitions
+        order = self.order
+        pruned = False
+        # Depth first over (prefix, cost, the context's steps, next step)
+        stack = [(b"", 0, transitions.get(b"", ()), 0)]
+        while stack:
+            prefix, cost, steps, i = stack.pop()
+            if i >= len(steps):
+                continue
+            step, symbol = steps[i]
+            total = cost + step
+            if total > level:
+                # Steps are sorted, so the rest of this context costs more too
+                pruned = True
+                continue
+            stack.append((prefix, cost, steps, i + 1))
+            if symbol == END:
+                if total == level and len(prefix) >= min_length:
+                    yield level, prefix
+            elif len(prefix) < max_length:
+                extended = prefix + bytes((symbol,))
+                stack.append((extended, total, transitions.get(extended[-order:], ()), 0))
+        return pruned
+
+    def candidates(self, min_length=DEFAULT_MIN_LENGTH, max_length=DEFAULT_MAX_LENGTH):
+        """Yield (level, candidate) for the whole keyspace, most probable first"""
+        if min_length > max_length:
+            raise MarkovError(f"Minimum length {min_length} is above the maximum {max_length}")
+        level = 0
+        more = True
+        while more:
+            more = yield from self._walk(level, min_length, max_length)
+            level += 1
+
+
+def _model_path(corpus, order):
+    """Cache file for a corpus: changes whenever the corpus file does"""
+    stat = os.stat(corpus)
+    key = f"{os.path.abspath(corpus)}|{stat.st_size}|{stat.st_mtime_ns}|{order}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(data_dir(), "cache", f"markov-{digest}.bin")
+
+
+def load_model(corpus, order=DEFAULT_ORDER, use_cache=True):
+    """The model for a corpus file, trained once and then read from the cache"""
+    path = _model_path(corpus, order)
+    if use_cache:
+        try:
+            with open(path, "rb") as f:
+                return MarkovModel.from_bytes(f.read())
+        except (OSError, MarkovError, struct.error):
+            pass
+    model = MarkovModel.train(Wordlist(corpus), order)
+    if use_cache:
+        try:
+            atomic_write(path, model.to_bytes())
+        except OSError:
+            pass  # The cache only saves time
+    return model
+
+
+class MarkovSource:
+    """Scheduler source: a corpus's model enumerated most probable first
+
+    The model is loaded (or trained) on first use, so building the source
+    is instant and the work happens wherever the candidates are consumed.
+    """
+
+    def __init__(self, corpus, order=DEFAULT_ORDER, min_length=DEFAULT_MIN_LENGTH,
+                 max_length=DEFAULT_MAX_LENGTH, weight=1.0, use_cache=True, name="markov"):
+        if not MIN_ORDER <= order <= MAX_ORDER:
+            raise MarkovError(f"Markov order must be {MIN_ORDER}-{MAX_ORDER}, not {order}")
+        if not 1 <= min_length <= max_length:
+            raise MarkovError(f"Invalid length range {min_length}-{max_length}")
+        self.corpus = corpus
+        self.order = order
+        self.min_length = min_length
+        self.max_length = max_length
+        self.weight = weight
+        self.use_cache = use_cache
+        self.name = name
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = load_model(self.corpus, self.order, self.use_cache)
+        return self._model
+
+    def __iter__(self):
+        for _, candidate in self.model.candidates(self.min_length, self.max_length):
+            yield candidate
+
+    def scored(self):
+        base = math.log(self.weight)
+        scale = math.log(2) / LEVELS_PER_BIT
+        for level, candidate in self.model.candidates(self.min_length, self.max_length):
+            yield base - level * scale, candidate
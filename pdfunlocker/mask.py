@@ -0,0 +1,161 @@
+"""
+Mask attack keyspace
+A mask such as "Dept?d?d?d?d" or "?u?l?l?l?d?d" describes every candidate
+of a known shape. Any index in [0, keyspace) maps directly to a candidate,
+so the space can be split into exact ranges for worker processes and a
+search can restart from any offset without materialising anything.
+
+Placeholders:
+    ?l  abcdefghijklmnopqrstuvwxyz
+    ?u  ABCDEFGHIJKLMNOPQRSTUVWXYZ
+    ?d  0123456789
+    ?h  0123456789abcdef
+    ?H  0123456789ABCDEF
+    ?s  special characters (space and punctuation)
+    ?a  ?l?u?d?s
+    ?1 .. ?4  custom charsets
+    ??  a literal '?'
+Any other character stands for itself.
+"""
+
+import string
+
+BUILTIN_CHARSETS = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "h": "0123456789abcdef",
+    "H": "0123456789ABCDEF",
+    "s": " " + string.punctuation,
+}
+BUILTIN_CHARSETS["a"] = (BUILTIN_CHARSETS["l"] + BUILTIN_CHARSETS["u"]
+                         + BUILTIN_CHARSETS["d"] + BUILTIN_CHARSETS["s"])
+
+
+class MaskError(ValueError):
+    """Raised for masks that cannot be parsed"""
+
+
+def _expand_charset(text, custom):
+    """Expand placeholders inside a custom charset definition, e.g. '?l?d_'"""
+    out = []
+    i = 0
+    while i < len(text):
+        if text[i] == "?" and i + 1 < len(text):
+            key = text[i + 1]
+            if key in BUILTIN_CHARSETS:
+                out.append(BUILTIN_CHARSETS[key])
+            elif key in custom:
+                out.append(custom[key])
+            elif key == "?":
+                out.append("?")
+            else:
+                raise MaskError(f"Unknown charset ?{key}")
+            i += 2
+        else:
+            out.append(text[i])
+            i += 1
+    # Keep the first occurrence of each character, in order
+    return "".join(dict.fromkeys("".join(out)))
+
+
+class Mask:
+    """An index-addressable mask keyspace"""
+
+    def __init__(self, mask, custom_charsets=None):
+        self.mask = mask
+        # As given, so the same mask can be rebuilt elsewhere (e.g. by a remote worker)
+        self.charset_definitions = {str(key): charset
+                                    for key, charset in (custom_charsets or {}).items()}
+        custom = {}
+        for key, charset in (custom_charsets or {}).items():
+            custom[str(key)] = _expand_charset(charset, custom)
+        self.custom_charsets = custom
+
+        self.positions = []
+        i = 0
+        while i < len(mask):
+            char = mask[i]
+            if char == "?":
+                if i + 1 >= len(mask):
+                    raise MaskError(f"Mask {mask!r} ends with a lone '?'")
+                key = mask[i + 1]
+                if key == "?":
+                    charset = "?"
+                elif key in BUILTIN_CHARSETS:
+                    charset = BUILTIN_CHARSETS[key]
+                elif key in custom:
+                    charset = custom[key]
+                else:
+                    raise MaskError(f"Mask {mask!r}: unknown charset ?{key}")
+                i += 2
+            else:
+                charset = char
+                i += 1
+            if not charset:
+                raise MaskError(f"Mask {mask!r}: empty charset")
+            self.positions.append([c.encode("utf-8") for c in charset])
+
+        self.keyspace = 1
+        for charset in self.positions:
+            self.keyspace *= len(charset)
+
+    def __repr__(self):
+        return f"Mask({self.mask!r}, keyspace={self.keyspace})"
+
+    def __iter__(self):
+        return self.iter_range(0, self.keyspace)
+
+    def _digits(self, index):
+        """Mixed-radix digits of index (the last position changes fastest)"""
+        digits = [0] * len(self.positions)
+        for pos in range(len(self.positions) - 1, -1, -1):
+            index, digits[pos] = divmod(index, len(self.positions[pos]))
+        return digits
+
+    def candidate(self, index):
+        """The candidate at a given index"""
+        if not 0 <= index < self.keyspace:
+            raise IndexError(f"Index {index} outside keyspace {self.keyspace}")
+        return b"".join(charset[digit]
+                        for charset, digit in zip(self.positions, self._digits(index)))
+
+    def iter_range(self, start, stop=None):
+        """Yield candidates start .. stop-1 (odometer order, no per-index division)"""
+        stop = self.keyspace if stop is None else min(stop, self.keyspace)
+        if start >= stop:
+            return
+        positions = self.positions
+        last = len(positions) - 1
+        if last < 0:
+            yield b""
+            return
+
+        digits = self._digits(start)
+        chars = [charset[digit] for charset, digit in zip(positions, digits)]
+        prefix = b"".join(chars[:-1])
+        tail = positions[last]
+        remaining = stop - start
+
+        while remaining > 0:
+            # Run the fastest position over what is left of its charset
+            first = digits[last]
+            count = min(len(tail) - first, remaining)
+            for char in tail[first:first + count]:
+                yield prefix + char
+            remaining -= count
+            if remaining <= 0:
+                return
+
+            # Carry into the slower positions
+            digits[last] = 0
+            pos = last - 1
+            while pos >= 0:
+                digits[pos] += 1
+                if digits[pos] < len(positions[pos]):
+                    chars[pos] = positions[pos][digits[pos]]
+                    break
+                digits[pos] = 0
+                chars[pos] = positions[pos][0]
+                pos -= 1
+            prefix = b"".join(chars[:-1])
@@ -0,0 +1,603 @@
+"""
+Minimal PDF object reader
+Reads the trailer, cross-reference data and single indirect objects
+without building the whole document, or, given a byte budget, just the
+trailer and the objects it points to from the end of the file.
+"""
+
+import os
+import re
+import zlib
+
+
+WHITESPACE = b"\x00\t\n\x0c\r "
+DELIMITERS = b"()<>[]{}/%"
+
+_NUMBER_RE = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)")
+_REF_RE = re.compile(rb"(\d+)\s+(\d+)\s+R")
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+_OBJ_HEADER_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+_TAIL_SIZE = 4096
+_MAX_TAIL_SIZE = 1024 * 1024
+# A budgeted reader starts with a larger tail, which often holds /Encrypt too
+_BUDGET_TAIL_SIZE = 16 * 1024
+
+
+class PDFSyntaxError(Exception):
+    """Raised when the file cannot be read as a PDF"""
+
+
+class Name(str):
+    """A PDF name object (stored without the leading slash)"""
+
+
+class Ref:
+    """An indirect object reference"""
+    __slots__ = ("num", "gen")
+
+    def __init__(self, num, gen=0):
+        self.num = num
+        self.gen = gen
+
+    def __eq__(self, other):
+        return isinstance(other, Ref) and (self.num, self.gen) == (other.num, other.gen)
+
+    def __hash__(self):
+        return hash((self.num, self.gen))
+
+    def __repr__(self):
+        return f"Ref({self.num}, {self.gen})"
+
+
+def skip_whitespace(data, pos):
+    """Skip whitespace and comments"""
+    length = len(data)
+    while pos < length:
+        ch = data[pos]
+        if ch in WHITESPACE:
+            pos += 1
+        elif ch == 0x25:  # '%' comment runs to end of line
+            while pos < length and data[pos] not in b"\r\n":
+                pos += 1
+        else:
+            break
+    return pos
+
+
+def _read_token(data, pos):
+    """Read a bare keyword/number token"""
+    end = pos
+    length = len(data)
+    while end < length and data[end] not in WHITESPACE and data[end] not in DELIMITERS:
+        end += 1
+    return data[pos:end], end
+
+
+def _parse_literal_string(data, pos):
+    """Parse a (literal) string; pos points after the opening parenthesis"""
+    out = bytearray()
+    depth = 1
+    length = len(data)
+    while pos < length:
+        ch = data[pos]
+        if ch == 0x5C:  # backslash
+            pos += 1
+            if pos >= length:
+                break
+            esc = data[pos]
+            if esc in b"01234567":
+                digits = data[pos:pos + 3]
+                count = 0
+                while count < len(digits) and digits[count] in b"01234567":
+                    count += 1
+                out.append(int(digits[:count], 8) & 0xFF)
+                pos += count
+                continue
+            if esc == 0x0D:  # line continuation
+                pos += 1
+                if pos < length and data[pos] == 0x0A:
+                    pos += 1
+                continue
+            if esc == 0x0A:
+                pos += 1
+                continue
+            out.append({0x6E: 0x0A, 0x72: 0x0D, 0x74: 0x09,
+                        0x62: 0x08, 0x66: 0x0C}.get(esc, esc))
+            pos += 1
+            continue
+        if ch == 0x28:
+            depth += 1
+        elif ch == 0x29:
+            depth -= 1
+            if depth == 0:
+                return bytes(out), pos + 1
+        out.append(ch)
+        pos += 1
+    raise PDFSyntaxError("Unterminated string")
+
+
+def _parse_hex_string(data, pos):
+    """Parse a <hex> string; pos points after the opening bracket"""
+    end = data.find(b">", pos)
+    if end < 0:
+        raise PDFSyntaxError("Unterminated hex string")
+    digits = bytes(ch for ch in data[pos:end] if ch not in WHITESPACE)
+    if len(digits) % 2:
+        digits += b"0"
+    try:
+        return bytes.fromhex(digits.decode("ascii")), end + 1
+    except ValueError:
+        raise PDFSyntaxError("Invalid hex string")
+
+
+def parse_object(data, pos=0):
+    """Parse one PDF object at pos, returning (object, end position)"""
+    pos = skip_whitespace(data, pos)
+    if pos >= len(data):
+        raise PDFSyntaxError("Unexpected end of data")
+
+    ch = data[pos]
+
+    if data.startswith(b"<<", pos):
+        result = {}
+        pos += 2
+        while True:
+            pos = skip_whitespace(data, pos)
+            if data.startswith(b">>", pos):
+                return result, pos + 2
+            key, pos = parse_object(data, pos)
+            if not isinstance(key, Name):
+                raise PDFSyntaxError("Dictionary key is not a name")
+            value, pos = parse_object(data, pos)
+            result[str(key)] = value
+
+    if ch == 0x5B:  # '['
+        result = []
+        pos += 1
+        while True:
+            pos = skip_whitespace(data, pos)
+            if pos >= len(data):
+                raise PDFSyntaxError("Unterminated array")
+            if data[pos] == 0x5D:
+                return result, pos + 1
+            value, pos = parse_object(data, pos)
+            result.append(value)
+
+    if ch == 0x2F:  # '/'
+        token, end = _read_token(data, pos + 1)
+        name = re.sub(rb"#([0-9A-Fa-f]{2})",
+                      lambda m: bytes([int(m.group(1), 16)]), token)
+        return Name(name.decode("latin-1")), end
+
+    if ch == 0x28:  # '('
+        return _parse_literal_string(data, pos + 1)
+
+    if ch == 0x3C:  # '<'
+        return _parse_hex_string(data, pos + 1)
+
+    ref = _REF_RE.match(data, pos)
+    if ref:
+        return Ref(int(ref.group(1)), int(ref.group(2))), ref.end()
+
+    number = _NUMBER_RE.match(data, pos)
+    if number:
+        text = number.group(0)
+        if b"." in text:
+            return float(text), number.end()
+        return int(text), number.end()
+
+    token, end = _read_token(data, pos)
+    if token == b"true":
+        return True, end
+    if token == b"false":
+        return False, end
+    if token == b"null":
+        return None, end
+    raise PDFSyntaxError(f"Unexpected token at offset {pos}: {token[:20]!r}")
+
+
+def _png_unpredict(data, columns):
+    """Undo PNG row predictors (used by cross-reference streams)"""
+    row_len = columns + 1
+    prev = bytearray(columns)
+    out = bytearray()
+    for start in range(0, len(data) - row_len + 1, row_len):
+        kind = data[start]
+        row = bytearray(data[start + 1:start + row_len])
+        if kind == 1:  # Sub
+            for i in range(1, columns):
+                row[i] = (row[i] + row[i - 1]) & 0xFF
+        elif kind == 2:  # Up
+            for i in range(columns):
+                row[i] = (row[i] + prev[i]) & 0xFF
+        elif kind == 3:  # Average
+            for i in range(columns):
+                left = row[i - 1] if i else 0
+                row[i] = (row[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif kind == 4:  # Paeth
+            for i in range(columns):
+                a = row[i - 1] if i else 0
+                b = prev[i]
+                c = prev[i - 1] if i else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                if pa <= pb and pa <= pc:
+                    pred = a
+                elif pb <= pc:
+                    pred = b
+                else:
+                    pred = c
+                row[i] = (row[i] + pred) & 0xFF
+        out += row
+        prev = row
+    return bytes(out)
+
+
+def _decode_xref_stream(obj, stream):
+    """Unfilter a cross-reference stream; returns (rows, field widths, row length, sections)
+
+    sections lists the (first object number, count) pairs of /Index.
+    """
+    if not isinstance(obj, dict) or obj.get("Type") != "XRef" or stream is None:
+        raise PDFSyntaxError("Invalid cross-reference stream")
+
+    filters = obj.get("Filter")
+    if isinstance(filters, list):
+        filters = filters[0] if filters else None
+    if filters == "FlateDecode":
+        stream = zlib.decompress(stream)
+    elif filters is not None:
+        raise PDFSyntaxError(f"Unsupported xref filter: {filters}")
+
+    parms = obj.get("DecodeParms") or {}
+    if isinstance(parms, list):
+        parms = parms[0] if parms else {}
+    widths = obj["W"]
+    row_len = sum(widths)
+    if parms.get("Predictor", 1) >= 10:
+        stream = _png_unpredict(stream, parms.get("Columns", row_len))
+
+    index = obj.get("Index", [0, obj.get("Size", 0)])
+    return stream, widths, row_len, list(zip(index[0::2], index[1::2]))
+
+
+def _xref_fields(rows, pos, widths):
+    """The fields of the cross-reference stream row at pos"""
+    fields = []
+    for width in widths:
+        fields.append(int.from_bytes(rows[pos:pos + width], "big"))
+        pos += width
+    return fields
+
+
+class ReadBudgetExceeded(PDFSyntaxError):
+    """Raised when a PDFReader would have to read more than its budget"""
+
+
+class ReadBudget:
+    """How many bytes a PDFReader may read; `used` counts those it has read"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+
+    def spend(self, length):
+        if self.used + length > self.limit:
+            raise ReadBudgetExceeded(f"more than {self.limit} bytes needed")
+        self.used += length
+
+
+class PDFReader:
+    """Random-access reader for the trailer and individual objects
+
+    With a ReadBudget the reader never reads more than the budget allows
+    (it raises ReadBudgetExceeded instead) and works from the end of the
+    file: it reads trailers only until one has /Encrypt, skips the
+    cross-reference entries, and finds an object in the tail it already
+    holds or else through the one cross-reference entry for it.
+    """
+
+    def __init__(self, fileobj, budget=None):
+        self.file = fileobj
+        self.file.seek(0, os.SEEK_END)
+        self.size = self.file.tell()
+        self.budget = budget
+        self.offsets = {}
+        self.trailer = {}
+        self._tail = b""
+        self._tail_start = self.size
+        self._xref_sections = []  # (offset, is a table) of each section read, newest first
+        self._seen_sections = set()
+        self._next_section = self._find_startxref()
+        self._read_cross_references()
+
+    def _read_at(self, offset, length):
+        """Bytes at offset, from the tail already read when possible"""
+        if offset >= self._tail_start:
+            start = offset - self._tail_start
+            return self._tail[start:start + length]
+        if self.budget is not None:
+            self.budget.spend(max(0, min(length, self.size - offset)))
+        self.file.seek(offset)
+        return self.file.read(length)
+
+    def _find_startxref(self):
+        """Locate the last startxref, reading only the tail of the file (kept for later reads)"""
+        if self.budget is None:
+            tail_size, max_size = _TAIL_SIZE, _MAX_TAIL_SIZE
+        else:
+            max_size = self.budget.limit - self.budget.used
+            tail_size = min(_BUDGET_TAIL_SIZE, max_size)
+        while True:
+            start = max(0, self.size - tail_size)
+            self._tail = self._read_at(start, self._tail_start - start) + self._tail
+            self._tail_start = start
+            matches = list(_STARTXREF_RE.finditer(self._tail))
+            if matches:
+                return int(matches[-1].group(1))
+            if start == 0 or tail_size >= max_size:
+                raise PDFSyntaxError(f"startxref not found in the last {len(self._tail)} bytes")
+            tail_size = min(tail_size * 4, max_size)
+
+    def _read_chunk(self, offset, length=8192):
+        return self._read_at(offset, length)
+
+    def _read_cross_references(self):
+        for _ in self._sections():
+            if self.budget is not None and "Encrypt" in self.trailer:
+                break
+
+    def _sections(self):
+        """Yield (offset, is a table) for each cross-reference section, reading them as needed"""
+        index = 0
+        while index < len(self._xref_sections) or self._read_section():
+            yield self._xref_sections[index]
+            index += 1
+
+    def _read_section(self):
+        """Read the next (older) cross-reference section; False if there is none"""
+        offset = self._next_section
+        if offset is None or offset in self._seen_sections:
+            return False
+        self._seen_sections.add(offset)
+        chunk = self._read_chunk(offset, 8192 if self.budget is None else 64)
+        pos = skip_whitespace(chunk, 0)
+        if chunk.startswith(b"xref", pos):
+            trailer = self._read_xref_table(offset + pos)
+            self._xref_sections.append((offset + pos, True))
+            xref_stream = trailer.get("XRefStm")
+            if isinstance(xref_stream, int):
+                self._read_xref_stream(xref_stream)
+                self._xref_sections.append((xref_stream, False))
+        else:
+            trailer = self._read_xref_stream(offset)
+            self._xref_sections.append((offset, False))
+
+        # Newer trailers take precedence over older ones
+        for key, value in trailer.items():
+            self.trailer.setdefault(key, value)
+
+        prev = trailer.get("Prev")
+        self._next_section = prev if isinstance(prev, int) else None
+        return True
+
+    def _read_xref_table(self, offset):
+        """Read a classic xref table (only its subsection headers if budgeted) and its trailer"""
+        if self.budget is not None:
+            trailer_offset, _ = self._walk_table(offset, None)
+            trailer, _ = self._parse_with_growth(trailer_offset)
+            return trailer
+
+        data = b""
+        chunk_size = 65536
+        while True:
+            more = self._read_at(offset + len(data), chunk_size)
+            if not more:
+                raise PDFSyntaxError("Trailer not found")
+            data += more
+            trailer_pos = data.find(b"trailer")
+            if trailer_pos >= 0 and data.find(b">>", trailer_pos) >= 0:
+                break
+            chunk_size *= 2
+
+        lines = data[4:trailer_pos].split()
+        i = 0
+        while i + 1 < len(lines):
+            first, count = int(lines[i]), int(lines[i + 1])
+            i += 2
+            for n in range(count):
+                if i + 3 > len(lines):
+                    break
+                entry_offset, entry_gen, kind = lines[i:i + 3]
+                i += 3
+                if kind == b"n":
+                    self.offsets.setdefault(first + n, (int(entry_offset), int(entry_gen)))
+
+        trailer, _ = self._parse_with_growth(offset + trailer_pos + len(b"trailer"))
+        return trailer
+
+    def _walk_table(self, offset, wanted):
+        """Follow an xref table's subsection headers, reading no other entries
+
+        Returns (offset after 'trailer', None), or (None, offset of object
+        `wanted` or None) once the subsection holding it is reached.
+        """
+        pos = offset + len(b"xref")
+        while True:
+            line = self._read_at(pos, 64)
+            start = skip_whitespace(line, 0)
+            if line.startswith(b"trailer", start):
+                return pos + start + len(b"trailer"), None
+            match = re.match(rb"(\d+)\s+(\d+)[ \t]*\r?\n?", line[start:])
+            if not match:
+                raise PDFSyntaxError("Bad xref subsection header")
+            first, count = int(match.group(1)), int(match.group(2))
+            pos += start + match.end()
+            if wanted is not None and first <= wanted < first + count:
+                entry = self._read_at(pos + 20 * (wanted - first), 20).split()
+                if len(entry) >= 3 and entry[2] == b"n":
+                    return None, int(entry[0])
+                return None, None
+            pos += 20 * count
+
+    def _parse_with_growth(self, offset):
+        """Parse an object at offset, reading more of the file if needed"""
+        length = 4096
+        while True:
+            data = self._read_at(offset, length)
+            try:
+                return parse_object(data, 0)
+            except PDFSyntaxError:
+                if offset + length >= self.size:
+                    raise
+                length *= 4
+
+    def _read_indirect(self, offset, with_stream=True):
+        """Read 'N G obj ... endobj' at offset, returning (object, stream data)"""
+        length = 4096
+        while True:
+            data = self._read_at(offset, length)
+            header = _OBJ_HEADER_RE.match(data)
+            if not header:
+                raise PDFSyntaxError(f"No object at offset {offset}")
+            try:
+                obj, end = parse_object(data, header.end())
+                break
+            except PDFSyntaxError:
+                if offset + length >= self.size:
+                    raise
+                length *= 4
+
+        stream = None
+        pos = skip_whitespace(data, end)
+        if with_stream and isinstance(obj, dict) and data.startswith(b"stream", pos):
+            pos += len(b"stream")
+            if data.startswith(b"\r\n", pos):
+                pos += 2
+            elif data.startswith(b"\n", pos):
+                pos += 1
+            start = offset + pos
+            stream_length = obj.get("Length")
+            if isinstance(stream_length, int):
+                stream = self._read_at(start, stream_length)
+            else:
+                rest = self._read_at(start, self.size - start)
+                stream = rest[:rest.find(b"endstream")].rstrip(b"\r\n")
+        return obj, stream
+
+    def _read_xref_stream(self, offset):
+        """Read a cross-reference stream (PDF 1.5+); only its dictionary if budgeted"""
+        if self.budget is not None:
+            obj, _ = self._read_indirect(offset, with_stream=False)
+            if not isinstance(obj, dict) or obj.get("Type") != "XRef":
+                raise PDFSyntaxError("Invalid cross-reference stream")
+        else:
+            obj, stream = self._read_indirect(offset)
+            rows, widths, row_len, sections = _decode_xref_stream(obj, stream)
+            pos = 0
+            for first, count in sections:
+                for num in range(first, first + count):
+                    if pos + row_len > len(rows):
+                        break
+                    fields = _xref_fields(rows, pos, widths)
+                    pos += row_len
+                    kind = fields[0] if widths[0] else 1
+                    if kind == 1:
+                        gen = fields[2] if len(fields) > 2 else 0
+                        self.offsets.setdefault(num, (fields[1], gen))
+
+        return {k: v for k, v in obj.items()
+                if k not in ("Type", "W", "Index", "Filter", "DecodeParms", "Length")}
+
+    def _stream_entry(self, offset, num):
+        """Offset of object num from the cross-reference stream at offset, or None"""
+        obj, stream = self._read_indirect(offset)
+        rows, widths, row_len, sections = _decode_xref_stream(obj, stream)
+        row = 0
+        for first, count in sections:
+            if first <= num < first + count:
+                fields = _xref_fields(rows, (row + num - first) * row_len, widths)
+                kind = fields[0] if widths[0] else 1
+                return fields[1] if kind == 1 else None
+            row += count
+        return None
+
+    def _locate(self, num, gen):
+        """Offset of an object for a budgeted reader: the tail first, then the xref data"""
+        pattern = re.compile(rb"(?<![0-9])%d\s+%d\s+obj" % (num, gen))
+        match = None
+        for match in pattern.finditer(self._tail):
+            pass
+        if match:
+            return self._tail_start + match.start()
+        for offset, table in self._sections():
+            if table:
+                _, found = self._walk_table(offset, num)
+            else:
+                found = self._stream_entry(offset, num)
+            if found is not None:
+                return found
+        return None
+
+    def _scan_for_object(self, num, gen):
+        """Fallback: search the file body for 'num gen obj'"""
+        import mmap
+        pattern = re.compile(rb"(?<![0-9])%d\s+%d\s+obj" % (num, gen))
+        with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            match = None
+            for match in pattern.finditer(mapped):
+                pass
+            return match.start() if match else None
+
+    def get_object(self, ref):
+        """Resolve an indirect reference (non-stream objects only)"""
+        if not isinstance(ref, Ref):
+            return ref
+        if self.budget is not None:
+            offset = self._locate(ref.num, ref.gen)
+            if offset is None:
+                raise PDFSyntaxError(f"Object {ref.num} {ref.gen} not found")
+            obj, _ = self._read_indirect(offset, with_stream=False)
+            return obj
+        offset = self.offsets.get(ref.num, (None, None))[0]
+        if offset is not None:
+            try:
+                obj, _ = self._read_indirect(offset)
+                return obj
+            except PDFSyntaxError:
+                pass
+        offset = self._scan_for_object(ref.num, ref.gen)
+        if offset is None:
+            raise PDFSyntaxError(f"Object {ref.num} {ref.gen} not found")
+        obj, _ = self._read_indirect(offset)
+        return obj
+
+    def resolve(self, obj):
+        """Recursively resolve references inside dictionaries and arrays"""
+        obj = self.get_object(obj)
+        if isinstance(obj, dict):
+            return {k: self.resolve(v) if isinstance(v, Ref) else v
+                    for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.get_object(v) for v in obj]
+        return obj
+
+
+def read_trailer(path, budget=None):
+    """Return (trailer dict, resolved /Encrypt dict or None) for a PDF file
+
+    With a ReadBudget, only the end of the file is read (see PDFReader).
+    """
+    with open(path, "rb") as f:
+        reader = PDFReader(f, budget)
+        encrypt = reader.trailer.get("Encrypt")
+        if encrypt is not None:
+            encrypt = reader.resolve(encrypt)
+            if not isinstance(encrypt, dict):
+                raise PDFSyntaxError("Invalid /Encrypt entry")
+            if isinstance(encrypt.get("CF"), dict):
+                encrypt["CF"] = {k: reader.resolve(v) for k, v in encrypt["CF"].items()}
+        trailer = dict(reader.trailer)
+        if "ID" in trailer:
+            trailer["ID"] = reader.resolve(trailer["ID"])
+        return trailer, encrypt
@@ -0,0 +1,178 @@
+"""
+Rule-based candidate mutation
+Applies a rule set (a subset of the hashcat rule syntax) to any stream of
+base words lazily and in a fixed order: every variation of the first word,
+then every variation of the second, and so on. Memory use depends only on
+the number of rules, never on the number of words.
+
+Supported operations (combine them in one rule, e.g. "c$1$2"):
+    :       keep the word as is
+    l u     lowercase / uppercase
+    c C     capitalize / lowercase first, uppercase the rest
+    t       toggle the case of every letter
+    TN      toggle the case of the character at position N (0-9, A-Z)
+    r       reverse
+    d       duplicate
+    $X      append character X
+    ^X      prepend character X
+    sXY     replace every X with Y
+"""
+
+import time
+
+
+class RuleError(ValueError):
+    """Raised for rules that cannot be parsed"""
+
+
+def year_rules(first=None, last=None):
+    """Rules appending each year from last down to first (default: the last 6 years)"""
+    if last is None:
+        last = time.localtime().tm_year
+    if first is None:
+        first = last - 5
+    rules = []
+    for year in range(last, first - 1, -1):
+        rules.append("".join("$" + digit for digit in str(year)))
+    return rules
+
+
+LEET_RULE = "sa4se3si1so0ss5st7"
+
+DEFAULT_RULES = [
+    ":", "u", "c",
+    "$!", "$@", "$#", "$$",
+    "$1", "$1$2$3", "$4$5$6", "$7$8$9", "c$1", "c$1$2$3", "c$!",
+    "r", LEET_RULE,
+] + year_rules()
+
+
+def _position(char):
+    if char.isdigit():
+        return int(char)
+    if "A" <= char <= "Z":
+        return ord(char) - ord("A") + 10
+    raise RuleError(f"Invalid position: {char!r}")
+
+
+def _toggle_at(position):
+    def toggle(word):
+        if position >= len(word):
+            return word
+        return word[:position] + word[position:position + 1].swapcase() + word[position + 1:]
+    return toggle
+
+
+def _append(suffix):
+    return lambda word: word + suffix
+
+
+def _prepend(prefix):
+    return lambda word: prefix + word
+
+
+def _substitute(old, new):
+    return lambda word: word.replace(old, new)
+
+
+def parse_rule(text):
+    """Compile a rule string into a list of bytes -> bytes functions"""
+    ops = []
+    i = 0
+    while i < len(text):
+        op = text[i]
+        i += 1
+        if op in " \t:":
+            continue
+        if op == "l":
+            ops.append(bytes.lower)
+        elif op == "u":
+            ops.append(bytes.upper)
+        elif op == "c":
+            ops.append(bytes.capitalize)
+        elif op == "C":
+            ops.append(lambda word: word[:1].lower() + word[1:].upper())
+        elif op == "t":
+            ops.append(bytes.swapcase)
+        elif op == "r":
+            ops.append(lambda word: word[::-1])
+        elif op == "d":
+            ops.append(lambda word: word + word)
+        elif op in "T$^s":
+            need = 2 if op == "s" else 1
+            args = text[i:i + need]
+            if len(args) < need:
+                raise RuleError(f"Rule {text!r}: '{op}' needs {need} argument(s)")
+            i += need
+            if op == "T":
+                ops.append(_toggle_at(_position(args)))
+            elif op == "$":
+                ops.append(_append(args.encode("utf-8")))
+            elif op == "^":
+                ops.append(_prepend(args.encode("utf-8")))
+            else:
+                ops.append(_substitute(args[0].encode("utf-8"), args[1].encode("utf-8")))
+        else:
+            raise RuleError(f"Rule {text!r}: unknown operation {op!r}")
+    return ops
+
+
+def load_rules(path):
+    """Read rules from a file (one per line, '#' starts a comment)"""
+    rules = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if line.strip() and not line.lstrip().startswith("#"):
+                rules.append(line)
+    return rules
+
+
+def _to_bytes(word):
+    if isinstance(word, str):
+        return word.encode("utf-8")
+    return bytes(word)
+
+
+class RuleSet:
+    """An ordered list of compiled rules"""
+
+    def __init__(self, rules=None):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self._compiled = [parse_rule(rule) for rule in self.rules]
+
+    def __len__(self):
+        return len(self._compiled)
+
+    def variant(self, word, index):
+        """The word after applying rule number index"""
+        candidate = word if type(word) is bytes else _to_bytes(word)
+        for op in self._compiled[index]:
+            candidate = op(candidate)
+        return candidate
+
+    def mutate(self, word):
+        """Yield each distinct variation of one word, in rule order"""
+        word = _to_bytes(word)
+        if not word:
+            # Nothing to mutate; try the empty password once
+            yield word
+            return
+        seen = set()
+        for ops in self._compiled:
+            candidate = word
+            for op in ops:
+                candidate = op(candidate)
+            if candidate not in seen:
+                seen.add(candidate)
+                yield candidate
+
+    def apply(self, words):
+        """Lazily yield the variations of every word in the stream"""
+        mutate = self.mutate
+        for word in words:
+            yield from mutate(word)
+
+    def keyspace(self, word_count):
+        """Upper bound on the number of candidates for word_count base words"""
+        return word_count * len(self._compiled)
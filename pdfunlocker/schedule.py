@@ -0,0 +1,153 @@
+"""
+Likelihood-ordered candidate scheduling
+Merges every candidate source (the built-in list, wordlists, rule
+variations, masks) into one stream, most likely candidate first, instead
+of exhausting one source or one word's variations before the next.
+
+Scores are natural-log likelihood estimates. Lists are taken to be in
+popularity order, so the word of rank r scores -ln(r + 1) (Zipf's law);
+rules are in the same kind of order, so applying rule i costs another
+-ln(i + 1); a mask spreads its weight evenly over its keyspace. Each
+source yields in non-increasing score order and the sources are merged
+lazily, so nothing is sorted or held in memory beyond a bounded frontier.
+
+The bound has a price: a rule-expanded source keeps at most
+MAX_OPEN_WORDS words open at once (see WordSource), and past that its
+order, and so the merged order, is only roughly best-first.
+"""
+
+import heapq
+import itertools
+import math
+
+# Words of a rule-mutated source whose variations are still being
+# interleaved; past this, new words wait until old ones are finished
+# and the source is no longer in exact score order
+MAX_OPEN_WORDS = 1 << 16
+
+
+def zipf_score(rank):
+    """Log likelihood of the item at rank (0 = most likely) in a popularity-ordered list"""
+    return -math.log(rank + 1)
+
+
+class WordSource:
+    """Words in popularity order, optionally expanded by a RuleSet
+
+    The pair (word rank, rule index) is enumerated best-first, so the
+    plain top words come before the year suffixes of the first one.
+
+    With rules, each word whose variations are not all yielded yet holds
+    a heap entry and a set of them, so at most MAX_OPEN_WORDS words are
+    open at once. Nearly every word stays open until its last (least
+    likely) rule, so a long list reaches the cap after about that many
+    words. From then on the next word only opens when an open one
+    finishes: scores are no longer non-increasing, and the word can come
+    after less likely variations of earlier words. Every candidate is
+    still yielded once, in a deterministic order.
+    """
+
+    def __init__(self, words, rules=None, weight=1.0, name="words"):
+        self.words = words
+        self.rules = rules
+        self.weight = weight
+        self.name = name
+
+    def scored(self):
+        """Yield (score, candidate), best first up to the MAX_OPEN_WORDS bound"""
+        base = math.log(self.weight)
+        if self.rules is None or not len(self.rules):
+            for rank, word in enumerate(self.words):
+                yield base + zipf_score(rank), word
+            return
+
+        variant = self.rules.variant
+        rule_scores = [zipf_score(index) for index in range(len(self.rules))]
+        last = len(rule_scores) - 1
+        words = iter(self.words)
+        heap = []
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        ranks = itertools.count()
+        open_count = 0
+
+        def open_next():
+            word = next(words, None)
+            if word is None:
+                return 0
+            rank = next(ranks)
+            score = base + zipf_score(rank)
+            # (rank, rule index) is unique, so the word score and the set of
+            # variations already yielded are never compared
+            heappush(heap, (-score, rank, 0, word, score, set()))
+            return 1
+
+        open_count += open_next()
+        want_next = False
+        while heap:
+            negative, rank, index, word, score, seen = heappop(heap)
+            candidate = variant(word, index)
+            if candidate not in seen:
+                seen.add(candidate)
+                yield -negative, candidate
+            if index < last and candidate:
+                heappush(heap, (-(score + rule_scores[index + 1]), rank, index + 1,
+                                word, score, seen))
+            else:
+                # Every rule applied (the empty word has no variations)
+                open_count -= 1
+            if index == 0:
+                want_next = True
+            if want_next and open_count < MAX_OPEN_WORDS:
+                open_count += open_next()
+                want_next = False
+
+
+class MaskSource:
+    """Every candidate of a mask, all equally likely"""
+
+    def __init__(self, mask, weight=1.0, name="mask"):
+        self.mask = mask
+        self.weight = weight
+        self.name = name
+
+    def scored(self):
+        score = math.log(self.weight) - math.log(max(1, self.mask.keyspace))
+        for candidate in self.mask:
+            yield score, candidate
+
+
+class Scheduler:
+    """One candidate stream merged from scored sources, most likely first
+
+    `first` holds candidates tried before everything else (such as
+    passwords given explicitly). The order is deterministic, so a saved
+    session position means the same thing when the search is resumed.
+
+    The merge is only as good as its sources: it is exactly best-first
+    while each source yields in non-increasing score order, which a
+    rule-expanded WordSource stops doing once it has MAX_OPEN_WORDS words
+    open. Past that the stream is still complete and deterministic, but
+    only roughly most likely first.
+    """
+
+    def __init__(self, first=None, sources=None):
+        self.first = list(first or [])
+        self.sources = list(sources or [])
+
+    def add(self, source):
+        self.sources.append(source)
+        return self
+
+    def scored(self):
+        """Yield (score, candidate) for the merged sources (after `first`)"""
+        streams = [source.scored() for source in self.sources]
+        if len(streams) == 1:
+            return streams[0]
+        # Ties keep source order: heapq.merge is stable
+        return heapq.merge(*streams, key=lambda item: -item[0])
+
+    def __iter__(self):
+        yield from self.first
+        for _, candidate in self.scored():
+            yield candidate
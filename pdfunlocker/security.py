@@ -0,0 +1,407 @@
+"""
+PDF Standard Security Handler
+Password verification straight from the /Encrypt dictionary, so a
+candidate check never has to open or parse the document itself.
+"""
+
+import hashlib
+import struct
+
+from . import vectorized
+from .pdfparse import PDFSyntaxError, read_trailer
+
+# Try to import an AES implementation (only needed for revision 6)
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    def aes_cbc_encrypt(key, iv, data):
+        encryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).encryptor()
+        return encryptor.update(data) + encryptor.finalize()
+
+    AES_AVAILABLE = True
+except ImportError:
+    try:
+        from Crypto.Cipher import AES
+
+        def aes_cbc_encrypt(key, iv, data):
+            return AES.new(key, AES.MODE_CBC, iv).encrypt(data)
+
+        AES_AVAILABLE = True
+    except ImportError:
+        aes_cbc_encrypt = None
+        AES_AVAILABLE = False
+
+# Padding string from the PDF specification (Algorithm 2, step a)
+PASSWORD_PAD = bytes([
+    0x28, 0xBF, 0x4E, 0x5E, 0x4E, 0x75, 0x8A, 0x41,
+    0x64, 0x00, 0x4E, 0x56, 0xFF, 0xFA, 0x01, 0x08,
+    0x2E, 0x2E, 0x00, 0xB6, 0xD0, 0x68, 0x3E, 0x80,
+    0x2F, 0x0C, 0xA9, 0xFE, 0x64, 0x53, 0x69, 0x7A,
+])
+
+
+def rc4(key, data):
+    """RC4 stream cipher (encryption and decryption are the same)"""
+    state = list(range(256))
+    key_len = len(key)
+    j = 0
+    for i in range(256):
+        j = (j + state[i] + key[i % key_len]) & 0xFF
+        state[i], state[j] = state[j], state[i]
+
+    out = bytearray(len(data))
+    i = j = 0
+    for n, byte in enumerate(data):
+        i = (i + 1) & 0xFF
+        j = (j + state[i]) & 0xFF
+        state[i], state[j] = state[j], state[i]
+        out[n] = byte ^ state[(state[i] + state[j]) & 0xFF]
+    return bytes(out)
+
+
+def pad_password(password):
+    """Pad or truncate a password to 32 bytes (revisions 2-4)"""
+    return (password + PASSWORD_PAD)[:32]
+
+
+def encode_password(password, revision):
+    """Convert a candidate to the bytes the security handler expects"""
+    if isinstance(password, (bytes, bytearray, memoryview)):
+        password = bytes(password)
+    elif revision >= 5:
+        password = password.encode("utf-8")
+    else:
+        try:
+            password = password.encode("latin-1")
+        except UnicodeEncodeError:
+            password = password.encode("utf-8")
+    if revision >= 5:
+        return password[:127]
+    return password
+
+
+def _as_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode("latin-1")
+    return b""
+
+
+# Attributes of EncryptionParams, for as_dict/from_dict
+_PARAM_FIELDS = ("filter", "V", "R", "O", "U", "OE", "UE", "P", "encrypt_metadata",
+                 "document_id", "method", "key_length")
+_BYTES_FIELDS = ("O", "U", "OE", "UE", "document_id")
+
+
+class EncryptionParams:
+    """The values of a document's /Encrypt dictionary needed to check passwords"""
+
+    def __init__(self, encrypt, document_id=b""):
+        self.filter = str(encrypt.get("Filter", ""))
+        self.V = int(encrypt.get("V", 0))
+        self.R = int(encrypt.get("R", 0))
+        self.O = _as_bytes(encrypt.get("O"))
+        self.U = _as_bytes(encrypt.get("U"))
+        self.OE = _as_bytes(encrypt.get("OE"))
+        self.UE = _as_bytes(encrypt.get("UE"))
+        self.P = int(encrypt.get("P", 0))
+        self.encrypt_metadata = bool(encrypt.get("EncryptMetadata", True))
+        self.document_id = document_id
+
+        # Crypt filter method (V4/V5 only)
+        self.method = "RC4"
+        crypt_filters = encrypt.get("CF")
+        stm_filter = str(encrypt.get("StmF", "Identity"))
+        if isinstance(crypt_filters, dict) and stm_filter in crypt_filters:
+            self.method = str(crypt_filters[stm_filter].get("CFM", "None"))
+            if self.method == "V2":
+                self.method = "RC4"
+        elif self.V >= 5:
+            self.method = "AESV3"
+
+        # Key length in bytes
+        if self.R == 2:
+            self.key_length = 5
+        elif self.R >= 5:
+            self.key_length = 32
+        else:
+            length = int(encrypt.get("Length", 40 if self.V < 4 else 128))
+            self.key_length = max(5, min(16, length // 8))
+
+    @classmethod
+    def from_file(cls, path):
+        """Read the parameters from a file, or return None if it is not encrypted"""
+        trailer, encrypt = read_trailer(path)
+        if not encrypt:
+            return None
+        return cls.from_trailer(trailer, encrypt)
+
+    @classmethod
+    def from_trailer(cls, trailer, encrypt):
+        """Build the parameters from a trailer and its resolved /Encrypt dictionary"""
+        ids = trailer.get("ID") or [b""]
+        return cls(encrypt, _as_bytes(ids[0]))
+
+    def as_dict(self):
+        """The values as JSON-ready data (bytes as hex), e.g. for a remote worker"""
+        values = {name: getattr(self, name) for name in _PARAM_FIELDS}
+        for name in _BYTES_FIELDS:
+            values[name] = values[name].hex()
+        return values
+
+    @classmethod
+    def from_dict(cls, values):
+        """Rebuild parameters from as_dict() output"""
+        params = cls.__new__(cls)
+        for name in _PARAM_FIELDS:
+            setattr(params, name, values[name])
+        for name in _BYTES_FIELDS:
+            setattr(params, name, bytes.fromhex(values[name]))
+        return params
+
+    @property
+    def fingerprint(self):
+        """Stable hex digest of the /Encrypt values and /ID (survives renames)"""
+        h = hashlib.sha256()
+        for value in (self.filter, self.V, self.R, self.P, self.key_length, self.method,
+                      self.encrypt_metadata):
+            h.update(str(value).encode("utf-8") + b"\x00")
+        for value in (self.O, self.U, self.OE, self.UE, self.document_id):
+            h.update(len(value).to_bytes(4, "big") + value)
+        return h.hexdigest()
+
+    @property
+    def is_standard(self):
+        return self.filter == "Standard"
+
+    @property
+    def algorithm(self):
+        """Human readable cipher name, e.g. 'RC4-40' or 'AES-256'"""
+        if self.method == "AESV2":
+            return "AES-128"
+        if self.method == "AESV3" or self.R >= 5:
+            return "AES-256"
+        return f"RC4-{self.key_length * 8}"
+
+
+class PasswordVerifier:
+    """Checks candidate passwords against precomputed per-document values"""
+
+    # Candidates per find() call that keep the per-call overhead negligible
+    batch_size = 16
+
+    def __init__(self, params):
+        if not self.supports(params):
+            raise ValueError(f"Unsupported security handler: {params.filter} R{params.R}")
+
+        self.params = params
+        self.revision = params.R
+
+        if self.revision <= 4:
+            self.key_length = params.key_length
+            # Everything hashed after the padded password is constant
+            tail = params.O[:32] + struct.pack("<i", params.P) + params.document_id
+            if self.revision >= 4 and not params.encrypt_metadata:
+                tail += b"\xff\xff\xff\xff"
+            self._key_tail = tail
+            self._owner_value = params.O[:32]
+            if self.revision == 2:
+                self._user_value = params.U[:32]
+            else:
+                self._user_value = params.U[:16]
+                self._user_check = hashlib.md5(PASSWORD_PAD + params.document_id).digest()
+            self._screen = None  # built by the first batch (_rc4_screen)
+            if vectorized.NUMPY_AVAILABLE:
+                self.batch_size = vectorized.BATCH_SIZE
+        else:
+            self._u_hash = params.U[:32]
+            self._u_validation_salt = params.U[32:40]
+            self._u_prefix = params.U[:48]
+            self._o_hash = params.O[:32]
+            self._o_validation_salt = params.O[32:40]
+
+    @staticmethod
+    def supports(params):
+        """Whether the fast verifier can handle this document"""
+        if params is None or not params.is_standard:
+            return False
+        if params.R == 6:
+            return AES_AVAILABLE
+        return 2 <= params.R <= 5
+
+    @property
+    def array_batches(self):
+        """Whether find() checks large batches as NumPy arrays (revisions 2-4)"""
+        return self.revision <= 4 and vectorized.NUMPY_AVAILABLE
+
+    def verify(self, password):
+        """Return True if the password opens the document"""
+        return self.check(password) is not None
+
+    def find(self, candidates):
+        """Index of the first candidate in a list that opens the document, or None
+
+        None entries are skipped. Checking a batch this way avoids the
+        per-call overhead of verify(); for revisions 2-4 with NumPy, large
+        batches are checked as arrays (see vectorized.py).
+        """
+        if self.revision >= 5:
+            return self._find_aes256(candidates)
+        if vectorized.NUMPY_AVAILABLE and len(candidates) >= vectorized.MIN_BATCH:
+            screen = self._rc4_screen()
+            if screen is not None:
+                return self._find_rc4(candidates, screen)
+        verify = self.verify
+        for index, candidate in enumerate(candidates):
+            if candidate is not None and verify(candidate):
+                return index
+        return None
+
+    def check(self, password):
+        """Return 'user' or 'owner' for a matching password, otherwise None"""
+        password = encode_password(password, self.revision)
+        if self.revision <= 4:
+            if self._is_user_key(self._user_key(pad_password(password))):
+                return "user"
+            if self._is_owner_password(password):
+                return "owner"
+            return None
+
+        if self._hash(password, self._u_validation_salt, b"") == self._u_hash:
+            return "user"
+        if self._hash(password, self._o_validation_salt, self._u_prefix) == self._o_hash:
+            return "owner"
+        return None
+
+    def _find_aes256(self, candidates):
+        """find() for revisions 5 and 6, with the per-document values looked up once"""
+        hash_password = self._hash
+        revision = self.revision
+        u_salt = self._u_validation_salt
+        u_hash = self._u_hash
+        u_prefix = self._u_prefix
+        o_salt = self._o_validation_salt
+        o_hash = self._o_hash
+        for index, candidate in enumerate(candidates):
+            if candidate is None:
+                continue
+            if type(candidate) is bytes:
+                password = candidate[:127]
+            else:
+                password = encode_password(candidate, revision)
+            if hash_password(password, u_salt, b"") == u_hash:
+                return index
+            if hash_password(password, o_salt, u_prefix) == o_hash:
+                return index
+        return None
+
+    # Revisions 2-4 (RC4 / AES-128)
+
+    def _rc4_screen(self):
+        """The array screen for this document, built on first use (None without NumPy)
+
+        Building it imports NumPy, which only a search needs.
+        """
+        if self._screen is None and vectorized.load_numpy() is not None:
+            check_data = PASSWORD_PAD if self.revision == 2 else self._user_check
+            self._screen = vectorized.RC4Screen(self.revision, self.key_length, self._key_tail,
+                                                self._owner_value, check_data, self._user_value)
+        return self._screen
+
+    def _find_rc4(self, candidates, screen):
+        """find() for revisions 2-4: screen the whole batch as arrays, confirm the survivors"""
+        indexes = []
+        padded = []
+        for index, candidate in enumerate(candidates):
+            if candidate is not None:
+                indexes.append(index)
+                padded.append(pad_password(encode_password(candidate, self.revision)))
+        if not indexes:
+            return None
+        rows = vectorized.np.frombuffer(b"".join(padded), dtype=vectorized.np.uint8)
+        for row in screen.screen(rows.reshape(len(indexes), 32)):
+            index = indexes[row]
+            if self.verify(candidates[index]):
+                return index
+        return None
+
+    def _user_key(self, padded):
+        """Algorithm 2: compute the file key from a padded user password"""
+        digest = hashlib.md5(padded + self._key_tail).digest()
+        n = self.key_length
+        if self.revision >= 3:
+            for _ in range(50):
+                digest = hashlib.md5(digest[:n]).digest()
+        return digest[:n]
+
+    def _is_user_key(self, key):
+        """Algorithms 4/5: compare the encrypted check value with /U"""
+        if self.revision == 2:
+            return rc4(key, PASSWORD_PAD) == self._user_value
+        data = rc4(key, self._user_check)
+        for i in range(1, 20):
+            data = rc4(bytes(b ^ i for b in key), data)
+        return data == self._user_value
+
+    def _is_owner_password(self, password):
+        """Algorithm 7: recover the user password from /O and check it"""
+        digest = hashlib.md5(pad_password(password)).digest()
+        n = self.key_length
+        candidates = [digest]
+        if self.revision >= 3:
+            full = digest
+            for _ in range(50):
+                full = hashlib.md5(full).digest()
+            candidates = [full]
+            if n < 16:
+                # Some writers hash only the first n bytes in each round
+                short = digest
+                for _ in range(50):
+                    short = hashlib.md5(short[:n]).digest()
+                candidates.append(short)
+
+        for digest in candidates:
+            key = digest[:n]
+            if self.revision == 2:
+                user_password = rc4(key, self._owner_value)
+            else:
+                user_password = self._owner_value
+                for i in range(19, -1, -1):
+                    user_password = rc4(bytes(b ^ i for b in key), user_password)
+            if self._is_user_key(self._user_key(user_password)):
+                return True
+        return False
+
+    # Revisions 5-6 (AES-256)
+
+    def _hash(self, password, salt, udata):
+        """Algorithm 2.A (R5) / 2.B (R6) password hash"""
+        digest = hashlib.sha256(password + salt + udata).digest()
+        if self.revision == 5:
+            return digest
+        return hardened_hash(password, digest, udata)
+
+
+def hardened_hash(password, digest, udata):
+    """Algorithm 2.B rounds (revision 6), starting from the initial SHA-256"""
+    hashes = (hashlib.sha256, hashlib.sha384, hashlib.sha512)
+    rounds = 0
+    while True:
+        block = (password + digest + udata) * 64
+        encrypted = aes_cbc_encrypt(digest[:16], digest[16:32], block)
+        digest = hashes[sum(encrypted[:16]) % 3](encrypted).digest()
+        rounds += 1
+        if rounds >= 64 and encrypted[-1] <= rounds - 32:
+            return digest[:32]
+
+
+def load_verifier(path):
+    """Return a PasswordVerifier for the file, or None if the fast path is unavailable"""
+    try:
+        params = EncryptionParams.from_file(path)
+    except (OSError, PDFSyntaxError, KeyError, TypeError, ValueError, IndexError):
+        return None
+    if not PasswordVerifier.supports(params):
+        return None
+    return PasswordVerifier(params)
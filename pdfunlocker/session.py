@@ -0,0 +1,170 @@
+"""
+Resumable search sessions
+A session file records which document is being searched (by encryption
+fingerprint, so renaming the file does not matter), the attack
+configuration and how far the search got: every candidate below
+`position` is known to be wrong. A checkpoint thread rewrites it
+atomically every few seconds, so the workers never wait on the disk.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .security import EncryptionParams
+
+# How often a running search writes its checkpoint
+CHECKPOINT_INTERVAL = 5.0
+
+SESSION_VERSION = 1
+
+
+def data_dir():
+    """Per-user directory for sessions and caches (survives the temp dir)"""
+    base = os.environ.get("PDFUNLOCKER_HOME")
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".pdfunlocker")
+    return base
+
+
+def document_fingerprint(path):
+    """Fingerprint of a document's encryption, or of its path if it has none we can read"""
+    try:
+        params = EncryptionParams.from_file(path)
+    except Exception:
+        params = None
+    if params is not None:
+        return params.fingerprint
+    return hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()
+
+
+def new_file_mode():
+    """Permissions a newly created file gets: 0o666 less the process umask"""
+    # Reading the umask means setting it; 0o022 is harmless if a thread creates a file meanwhile
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+@contextlib.contextmanager
+def atomic_file(path, mode=None):
+    """Yield a temp file in path's directory; on success fsync it and rename it to path
+
+    Readers never see a half-written file, and a failure leaves any
+    existing file untouched. The temp file is private unless mode is given.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write(path, data):
+    """Write bytes to path via a synced temp file in the same directory and a rename"""
+    with atomic_file(path) as f:
+        f.write(data)
+
+
+class Session:
+    """Progress of one attack against one document"""
+
+    def __init__(self, path, fingerprint, config, position=0, document=""):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.config = config
+        self.position = position
+        self.document = document
+
+    @classmethod
+    def for_document(cls, document, config, path=None):
+        """A fresh session for document; stored under data_dir() unless path is given"""
+        fingerprint = document_fingerprint(document)
+        if path is None:
+            path = os.path.join(data_dir(), "sessions", f"{fingerprint}.json")
+        return cls(path, fingerprint, config, document=os.path.abspath(document))
+
+    def load(self):
+        """Pick up the saved position if the file matches this document and attack
+
+        Returns the saved position (0 if there is nothing to resume).
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if (saved.get("version") != SESSION_VERSION
+                or saved.get("fingerprint") != self.fingerprint
+                or saved.get("config") != self.config):
+            return 0
+        self.position = int(saved.get("position", 0))
+        return self.position
+
+    def save(self):
+        """Atomically write the current state"""
+        state = {
+            "version": SESSION_VERSION,
+            "fingerprint": self.fingerprint,
+            "document": self.document,
+            "config": self.config,
+            "position": self.position,
+            "updated": time.time(),
+        }
+        atomic_write(self.path, json.dumps(state, indent=2).encode("utf-8"))
+
+    def discard(self):
+        """Remove the session file (the search is over)"""
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class Checkpointer(threading.Thread):
+    """Saves session.position = position() every interval seconds on its own thread"""
+
+    def __init__(self, session, position, interval=CHECKPOINT_INTERVAL):
+        super().__init__(daemon=True)
+        self.session = session
+        self.position = position
+        self.interval = interval
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.wait(self.interval):
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Write the position if it moved since the last save"""
+        position = self.position()
+        if position == self.session.position:
+            return
+        self.session.position = position
+        try:
+            self.session.save()
+        except OSError:
+            pass  # Keep searching; the next checkpoint may succeed
+
+    def finish(self):
+        """Stop the thread and write a final checkpoint"""
+        self._finished.set()
+        if self.is_alive():
+            self.join()
+        self.checkpoint()
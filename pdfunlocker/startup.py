@@ -0,0 +1,60 @@
+"""
+Startup profiling
+Wall-clock time of each step of a front-end's start (imports, building
+the window, first paint, the background pikepdf import), printed to
+stderr as the steps finish when the app is run with --profile-startup.
+For a per-module breakdown of the imports, run with python -X importtime.
+"""
+
+import sys
+import threading
+import time
+
+FLAG = "--profile-startup"
+
+
+class StartupProfile:
+    """Named steps of a start, each timed from the end of the previous one
+
+    Created as early as possible (before the heavy imports). A disabled
+    profile records nothing, so the app can mark its steps unconditionally.
+    """
+
+    def __init__(self, enabled=None, stream=None):
+        self.started = time.perf_counter()
+        self.enabled = FLAG in sys.argv[1:] if enabled is None else enabled
+        self.stream = stream
+        self.steps = []
+        self._last = self.started
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        """Record that step `name` just finished"""
+        if self.enabled:
+            self._record(name, None)
+
+    def run(self, name, function, *args):
+        """Call function(*args) as a step timed on its own (e.g. on a background thread)"""
+        begun = time.perf_counter()
+        result = function(*args)
+        if self.enabled:
+            self._record(name, begun)
+        return result
+
+    def _record(self, name, begun):
+        with self._lock:
+            now = time.perf_counter()
+            if begun is None:
+                begun = self._last
+                self._last = now
+            self.steps.append((name, now - begun, now - self.started))
+            stream = self.stream or sys.stderr
+            if stream is not None:  # No console for a windowed build
+                took = (now - begun) * 1000
+                at = (now - self.started) * 1000
+                print(f"startup: {name:<28} {took:7.1f} ms  (at {at:.1f} ms)",
+                      file=stream, flush=True)
+
+    def summary(self):
+        """One line for the app's log, e.g. 'imports 95 ms, widgets 60 ms, ...'"""
+        return ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds, _ in self.steps)
@@ -0,0 +1,210 @@
+"""
+Search throughput statistics
+Turns finished work into live numbers: candidates per second right now
+(over the last few seconds) and as an exponentially weighted moving
+average, the rate of every worker process, how much of the configured
+keyspace is covered and when it will be exhausted. Snapshots are plain
+dicts, ready for a status bar or a JSON-lines log.
+"""
+
+import collections
+import json
+import math
+import threading
+import time
+
+# Window of the "current" rate, in seconds
+RATE_WINDOW = 3.0
+
+# Half-life of the moving average, in seconds: older work counts half as much
+HALF_LIFE = 15.0
+
+# How often the command line writes a JSON line, in seconds
+DEFAULT_INTERVAL = 5.0
+
+
+class _Worker:
+    """Running totals for one worker process"""
+
+    def __init__(self):
+        self.candidates = 0
+        self.busy = 0.0
+        self.weighted_candidates = 0.0
+        self.weighted_busy = 0.0
+        self.updated = 0.0
+
+
+class ThroughputMeter:
+    """Live throughput of one search, fed as tasks finish
+
+    record() is called by the search (from any thread) and snapshot() by
+    whoever displays the numbers. `total` is the keyspace size if known
+    and `start` the number of candidates done before this run (a resume).
+    """
+
+    def __init__(self, total=None, start=0, window=RATE_WINDOW, half_life=HALF_LIFE,
+                 clock=time.monotonic):
+        self.total = total
+        self.start = start
+        self.window = window
+        self.tau = half_life / math.log(2)
+        self.clock = clock
+        self.started = clock()
+        self.attempts = 0
+        self._lock = threading.Lock()
+        self._recent = collections.deque([(self.started, 0)])
+        self._weighted = 0.0
+        self._updated = self.started
+        self._workers = {}
+
+    def _decay(self, since, now):
+        return math.exp(-(now - since) / self.tau)
+
+    def record(self, checked, worker=None, seconds=None):
+        """Count `checked` finished candidates; a worker reports its busy seconds too"""
+        with self._lock:
+            now = self.clock()
+            self.attempts += checked
+            self._recent.append((now, self.attempts))
+            while len(self._recent) > 2 and self._recent[1][0] <= now - self.window:
+                self._recent.popleft()
+            self._weighted = self._weighted * self._decay(self._updated, now) + checked
+            self._updated = now
+            if worker is not None:
+                stats = self._workers.get(worker)
+                if stats is None:
+                    stats = self._workers[worker] = _Worker()
+                    stats.updated = now
+                decay = self._decay(stats.updated, now)
+                stats.candidates += checked
+                stats.weighted_candidates = stats.weighted_candidates * decay + checked
+                if seconds is not None:
+                    stats.busy += seconds
+                    stats.weighted_busy = stats.weighted_busy * decay + seconds
+                stats.updated = now
+
+    def snapshot(self):
+        """The current numbers as a JSON-ready dict"""
+        with self._lock:
+            now = self.clock()
+            elapsed = now - self.started
+            # Candidates finished within the window (counts only change on record())
+            cutoff = now - self.window
+            base = self._recent[0][1]
+            for when, attempts in self._recent:
+                if when > cutoff:
+                    break
+                base = attempts
+            span = min(self.window, elapsed)
+            rate = (self.attempts - base) / span if span > 0 else 0.0
+
+            # Early on, only the elapsed part of the weighting has any work in it
+            filled = 1.0 - math.exp(-elapsed / self.tau)
+            weighted = self._weighted * self._decay(self._updated, now)
+            average = weighted / (self.tau * filled) if filled > 0 else 0.0
+
+            workers = []
+            for worker, stats in sorted(self._workers.items(), key=lambda item: str(item[0])):
+                worker_rate = None
+                if stats.weighted_busy > 0:
+                    worker_rate = round(stats.weighted_candidates / stats.weighted_busy, 2)
+                workers.append({
+                    "worker": worker,
+                    "candidates": stats.candidates,
+                    "busy_seconds": round(stats.busy, 3),
+                    "rate": worker_rate,
+                })
+
+            position = self.start + self.attempts
+            snapshot = {
+                "time": round(time.time(), 3),
+                "elapsed": round(elapsed, 3),
+                "attempts": self.attempts,
+                "position": position,
+                "total": self.total,
+                "coverage": None,
+                "rate": round(rate, 2),
+                "average": round(average, 2),
+                "eta": None,
+                "workers": workers,
+            }
+            if self.total:
+                snapshot["coverage"] = round(min(1.0, position / self.total), 6)
+                if average > 0:
+                    snapshot["eta"] = round(max(0, self.total - position) / average, 1)
+            return snapshot
+
+
+class JsonLinesReporter(threading.Thread):
+    """Writes meter.snapshot() as one JSON object per line every interval seconds
+
+    `fields` are added to every line (e.g. the document). finish() writes
+    a last line with "final": true.
+    """
+
+    def __init__(self, meter, stream, interval=DEFAULT_INTERVAL, fields=None):
+        super().__init__(daemon=True)
+        self.meter = meter
+        self.stream = stream
+        self.interval = interval
+        self.fields = dict(fields or {})
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.wait(self.interval):
+            self.write()
+
+    def write(self, final=False):
+        line = dict(self.fields, **self.meter.snapshot())
+        line["final"] = final
+        self.stream.write(json.dumps(line) + "\n")
+        self.stream.flush()
+
+    def finish(self):
+        """Stop the thread and write the final line"""
+        self._finished.set()
+        if self.is_alive():
+            self.join()
+        self.write(final=True)
+
+
+def format_duration(seconds):
+    """Compact duration, e.g. '42s', '3m 05s', '2h 10m' or '4d 3h'"""
+    if seconds is None:
+        return "unknown"
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes:02d}m"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h"
+
+
+def format_rate(rate):
+    """Candidates per second, e.g. '850/s' or '12.3k/s'"""
+    if rate is None:
+        return "-"
+    if rate >= 1e6:
+        return f"{rate / 1e6:.1f}M/s"
+    if rate >= 1e4:
+        return f"{rate / 1e3:.1f}k/s"
+    return f"{rate:.0f}/s"
+
+
+def describe(snapshot):
+    """One status line, e.g. '4100/s now, 3950/s avg, 12.5% covered, ETA 4m 10s'"""
+    parts = [f"{format_rate(snapshot['rate'])} now", f"{format_rate(snapshot['average'])} avg"]
+    if snapshot["coverage"] is not None:
+        parts.append(f"{snapshot['coverage'] * 100:.1f}% covered")
+        parts.append(f"ETA {format_duration(snapshot['eta'])}")
+    return ", ".join(parts)
+
+
+def describe_workers(snapshot):
+    """Per-worker rates, e.g. '4120/s, 4085/s, 1730/s' (empty before any task finished)"""
+    return ", ".join(format_rate(worker["rate"]) for worker in snapshot["workers"])
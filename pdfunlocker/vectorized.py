@@ -0,0 +1,193 @@
+"""
+Vectorized MD5 and RC4
+The revision 2-4 password check as NumPy array operations over thousands
+of candidates at once. Row k of every array belongs to candidate k, so
+each of the 64 MD5 steps or 256 RC4 key-schedule steps is a handful of
+array operations for the whole batch instead of a Python loop per guess.
+Without NumPy, PasswordVerifier checks one candidate at a time.
+"""
+
+import importlib.util
+import math
+
+# NumPy is optional (for batch verification) and slow to import, so it is
+# only imported when the first batch is checked (see load_numpy)
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+np = None
+
+# Candidates per batch: enough to amortize the cost of each array
+# operation, few enough that the RC4 states (256 bytes each) stay in cache
+BATCH_SIZE = 4096
+
+# Below this many candidates the one-at-a-time check is faster
+MIN_BATCH = 64
+
+# Keystream bytes compared while screening: a wrong key passes with odds
+# of 2**-32 and is then rejected by the exact check
+SCREEN_BYTES = 4
+
+
+def load_numpy():
+    """Import NumPy on first call; returns the module, or None if it is unusable"""
+    global np, NUMPY_AVAILABLE
+    if np is None and NUMPY_AVAILABLE:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            NUMPY_AVAILABLE = False
+    return np
+
+
+_MD5_INIT = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)
+_MD5_SHIFTS = [7, 12, 17, 22] * 4 + [5, 9, 14, 20] * 4 + [4, 11, 16, 23] * 4 + [6, 10, 15, 21] * 4
+
+
+def _md5_schedule():
+    """(round, message word, shift, constant) for each of the 64 steps"""
+    steps = []
+    for step in range(64):
+        rounds = step // 16
+        word = (step, 5 * step + 1, 3 * step + 5, 7 * step)[rounds] % 16
+        constant = int(abs(math.sin(step + 1)) * 2 ** 32) & 0xFFFFFFFF
+        steps.append((rounds, word, _MD5_SHIFTS[step], constant))
+    return steps
+
+
+_MD5_STEPS = _md5_schedule()
+
+
+def md5(messages):
+    """MD5 of every row of an (N, L) uint8 array; returns an (N, 16) uint8 array"""
+    count, length = messages.shape
+    padded_length = (length + 8) // 64 * 64 + 64
+    data = np.zeros((count, padded_length), dtype=np.uint8)
+    data[:, :length] = messages
+    data[:, length] = 0x80
+    data[:, -8:] = np.frombuffer((length * 8).to_bytes(8, "little"), dtype=np.uint8)
+    words = data.view("<u4")
+
+    state = [np.full(count, value, dtype=np.uint32) for value in _MD5_INIT]
+    for block in range(0, padded_length // 4, 16):
+        x = [np.ascontiguousarray(words[:, block + k]) for k in range(16)]
+        a, b, c, d = state
+        for rounds, word, shift, constant in _MD5_STEPS:
+            if rounds == 0:
+                f = (b & c) | (~b & d)
+            elif rounds == 1:
+                f = (d & b) | (~d & c)
+            elif rounds == 2:
+                f = b ^ c ^ d
+            else:
+                f = c ^ (b | ~d)
+            f += a
+            f += np.uint32(constant)
+            f += x[word]
+            a, d, c = d, c, b
+            b = b + ((f << np.uint32(shift)) | (f >> np.uint32(32 - shift)))
+        state = [old + new for old, new in zip(state, (a, b, c, d))]
+    return np.stack(state, axis=1).astype("<u4").view(np.uint8)
+
+
+def rc4_keystream(keys, length):
+    """The first `length` RC4 keystream bytes for every row of an (N, n) uint8 array of keys
+
+    The N states are interleaved (byte i of state k at i * N + k), so a
+    step reads and writes one contiguous row for the i side of the swap.
+    """
+    count, key_length = keys.shape
+    lanes = np.arange(count, dtype=np.intp)
+    state = np.repeat(np.arange(256, dtype=np.uint8), count)
+    key_bytes = [np.ascontiguousarray(keys[:, i]) for i in range(key_length)]
+
+    j = np.zeros(count, dtype=np.uint8)
+    for i in range(256):
+        row = state[i * count:(i + 1) * count]
+        si = row.copy()
+        j += si
+        j += key_bytes[i % key_length]
+        index = j.astype(np.intp) * count + lanes
+        row[:] = state[index]
+        state[index] = si
+
+    out = np.empty((count, length), dtype=np.uint8)
+    j[:] = 0
+    for n in range(length):
+        i = (n + 1) & 0xFF
+        row = state[i * count:(i + 1) * count]
+        si = row.copy()
+        j += si
+        index = j.astype(np.intp) * count + lanes
+        sj = state[index]
+        row[:] = sj
+        state[index] = si
+        out[:, n] = state[(si + sj).astype(np.intp) * count + lanes]
+    return out
+
+
+class RC4Screen:
+    """Algorithms 2, 4/5 and 7 over a batch of padded passwords
+
+    screen() returns the rows that may be the user or owner password.
+    RC4 is only run far enough to compare the first SCREEN_BYTES of the
+    check value, so a row it returns still needs the exact check. Only
+    build one after load_numpy() has succeeded.
+    """
+
+    def __init__(self, revision, key_length, key_tail, owner_value, check_data, user_value):
+        self.revision = revision
+        self.key_length = key_length
+        self.rounds = 1 if revision == 2 else 20
+        self._key_tail = np.frombuffer(key_tail, dtype=np.uint8)
+        self._owner_value = np.frombuffer(owner_value, dtype=np.uint8)
+        self._check = np.frombuffer(check_data[:SCREEN_BYTES], dtype=np.uint8)
+        self._expected = np.frombuffer(user_value[:SCREEN_BYTES], dtype=np.uint8)
+
+    def screen(self, padded):
+        """Row numbers of an (N, 32) uint8 array of padded passwords that may match"""
+        possible = self._user_possible(self._user_keys(padded))
+        for key in self._owner_keys(padded):
+            # RC4 rounds are XORs with keystreams, so their order does not matter
+            user_password = self._owner_value ^ self._keystreams(key, 32)
+            possible |= self._user_possible(self._user_keys(user_password))
+        return np.flatnonzero(possible)
+
+    def _keystreams(self, keys, length):
+        """XOR of the keystreams of key ^ 0 ... key ^ (rounds - 1)"""
+        stream = rc4_keystream(keys, length)
+        for i in range(1, self.rounds):
+            stream ^= rc4_keystream(keys ^ np.uint8(i), length)
+        return stream
+
+    def _user_keys(self, padded):
+        """Algorithm 2: file keys for padded user passwords"""
+        tail = np.broadcast_to(self._key_tail, (len(padded), len(self._key_tail)))
+        digest = md5(np.hstack([padded, tail]))
+        n = self.key_length
+        if self.revision >= 3:
+            for _ in range(50):
+                digest = md5(digest[:, :n])
+        return digest[:, :n]
+
+    def _user_possible(self, keys):
+        """Algorithms 4/5 on the first bytes of the check value"""
+        encrypted = self._check ^ self._keystreams(keys, SCREEN_BYTES)
+        return (encrypted == self._expected).all(axis=1)
+
+    def _owner_keys(self, padded):
+        """Algorithm 7 RC4 keys for padded owner passwords (two variants for short keys)"""
+        digest = md5(padded)
+        n = self.key_length
+        if self.revision == 2:
+            return [digest[:, :n]]
+        full = digest
+        for _ in range(50):
+            full = md5(full)
+        keys = [full[:, :n]]
+        if n < 16:
+            # Some writers hash only the first n bytes in each round
+            short = digest
+            for _ in range(50):
+                short = md5(short[:, :n])
+            keys.append(short[:, :n])
+        return keys
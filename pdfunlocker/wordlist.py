@@ -0,0 +1,183 @@
+"""
+Wordlist reader
+Streams candidates from (possibly huge) wordlist files as bytes, one per
+line, without loading the file or building a Python list. Plain files
+are memory-mapped and can start at any line through a sparse index of
+line counts; gzip/xz/zstd files are decompressed as a stream. Pipes and
+FIFOs (-w /dev/stdin) can only be read once, front to back: they are
+streamed as plain text and not counted.
+"""
+
+import gzip
+import io
+import itertools
+import lzma
+import mmap
+import os
+import stat
+from array import array
+from bisect import bisect_left
+
+# Try to import zstandard (optional, for .zst wordlists)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MAGIC_NUMBERS = [
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+]
+
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+# The line index holds the number of lines before every block of this many
+# bytes; reaching a line then means skipping at most one block's lines
+INDEX_BLOCK_SIZE = 256 * 1024
+
+# path -> (line number, open stream) where this process last stopped reading
+# a compressed wordlist, so ranges read in order (a worker's tasks)
+# decompress it about once rather than from the start every time
+_streams = {}
+
+
+def detect_compression(path):
+    """Return 'gzip', 'xz', 'zstd' or None, based on the file's magic number"""
+    with open(path, "rb") as f:
+        header = f.read(8)
+    for magic, name in MAGIC_NUMBERS:
+        if header.startswith(magic):
+            return name
+    return None
+
+
+def _strip_line(line):
+    if line.endswith(b"\n"):
+        line = line[:-1]
+    if line.endswith(b"\r"):
+        line = line[:-1]
+    return line
+
+
+class Wordlist:
+    """A candidate source backed by a wordlist file"""
+
+    def __init__(self, path):
+        self.path = path
+        # Sniffing a pipe for compression would eat the start of it
+        self.regular = stat.S_ISREG(os.stat(path).st_mode)
+        self.compression = detect_compression(path) if self.regular else None
+        if self.compression == "zstd" and not ZSTD_AVAILABLE:
+            raise RuntimeError("zstd wordlists need the 'zstandard' package "
+                               "(pip install zstandard)")
+        self._count = None
+        self._index = None
+
+    def __iter__(self):
+        if self.compression is None:
+            return self._iter_mapped()
+        return self._iter_stream()
+
+    def lines(self, start, stop=None):
+        """Yield candidates start .. stop-1 (by line number, from 0)"""
+        if not self.regular:
+            return itertools.islice(self._iter_mapped(), start, stop)
+        if self.compression is not None:
+            return self._stream_lines(start, stop)
+        index = self._line_index()
+        # The last block starting before line `start` does (line 0 is in block 0)
+        block = max(0, bisect_left(index, start) - 1)
+        lines = self._iter_mapped(block * INDEX_BLOCK_SIZE, start - index[block] if index else 0)
+        return itertools.islice(lines, None if stop is None else max(0, stop - start))
+
+    def _iter_mapped(self, pos=0, skip=0):
+        """Split the memory-mapped file on newlines, from byte pos after skipping lines"""
+        with open(self.path, "rb") as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                return
+            except OSError:
+                if stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+                    raise
+                # A pipe or FIFO cannot be mapped: read the lines as they come
+                for line in f:
+                    yield _strip_line(line)
+                return
+        with mapped:
+            find = mapped.find
+            size = len(mapped)
+            for _ in range(skip):
+                end = find(b"\n", pos)
+                pos = end + 1 if end >= 0 else size
+            while pos < size:
+                end = find(b"\n", pos)
+                if end < 0:
+                    end = size
+                line = mapped[pos:end]
+                if line.endswith(b"\r"):
+                    line = line[:-1]
+                yield line
+                pos = end + 1
+
+    def _open_stream(self):
+        if self.compression == "gzip":
+            return gzip.open(self.path, "rb")
+        if self.compression == "xz":
+            return lzma.open(self.path, "rb")
+        raw = open(self.path, "rb")
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.BufferedReader(reader, STREAM_BUFFER_SIZE)
+
+    def _iter_stream(self):
+        """Decompress on the fly, one line at a time"""
+        with self._open_stream() as stream:
+            for line in stream:
+                yield _strip_line(line)
+
+    def _stream_lines(self, start, stop):
+        """lines() of a compressed file, carrying on from the last read when it is behind"""
+        position, lines = _streams.pop(self.path, (0, None))
+        if lines is None or position > start:
+            if lines is not None:
+                lines.close()
+            position, lines = 0, self._iter_stream()
+        try:
+            for _ in itertools.islice(lines, start - position):
+                position += 1
+            while stop is None or position < stop:
+                line = next(lines, None)
+                if line is None:
+                    return
+                position += 1
+                yield line
+        finally:
+            _streams[self.path] = (position, lines)
+
+    def count(self):
+        """Number of candidates (plain files only; None if compressed or a pipe)"""
+        if self._count is None and self.compression is None and self.regular:
+            self._line_index()
+        return self._count
+
+    def _line_index(self):
+        """Newlines before each INDEX_BLOCK_SIZE block of a plain file (read once, with count)"""
+        if self._index is None:
+            index = array("Q")
+            lines = 0
+            last = b"\n"
+            with open(self.path, "rb") as f:
+                while True:
+                    block = f.read(INDEX_BLOCK_SIZE)
+                    if not block:
+                        break
+                    index.append(lines)
+                    lines += block.count(b"\n")
+                    last = block[-1:]
+            if last != b"\n":
+                lines += 1
+            self._index = index
+            self._count = lines
+        return self._index
@@ -0,0 +1,49 @@
+"""Batch recovery: the checking backend is chosen once per kind of encryption"""
+
+import os
+import tempfile
+import unittest
+
+from pdfunlocker import batch, benchmark, core, engine
+
+
+@unittest.skipIf(core.pikepdf is None, "pikepdf is not installed")
+class BackendChoiceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.paths = []
+        for revision, aes, copies in ((6, True, 3), (4, True, 2)):
+            for number in range(copies):
+                path = os.path.join(self.directory.name, f"r{revision}-{number}.pdf")
+                benchmark.build_fixture(path, revision, aes, pages=1)
+                self.paths.append(path)
+
+        saved = dict(core._check_costs)
+        core._check_costs.clear()
+        self.addCleanup(core._check_costs.update, saved)
+        self.calibrated = []
+        calibrate = engine.calibrate
+
+        def counting(verifier, *args):
+            params = verifier.params
+            self.calibrated.append((params.R, params.key_length, params.method))
+            return calibrate(verifier, *args)
+
+        for module in (engine, core, batch):
+            if hasattr(module, "calibrate"):
+                setattr(module, "calibrate", counting)
+                self.addCleanup(setattr, module, "calibrate", calibrate)
+
+    def test_calibrates_once_per_kind(self):
+        candidates = ["wrong%d" % number for number in range(200)] + [benchmark.USER_PASSWORD]
+        recovery = batch.BatchRecovery(lambda: list(candidates), workers=1, use_cache=False)
+        items = recovery.run(batch.classify(self.paths))
+
+        self.assertEqual([item.status for item in items], ["recovered"] * len(self.paths))
+        self.assertEqual(sorted(set(self.calibrated)), sorted(self.calibrated))
+        self.assertEqual(len(self.calibrated), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+"""Deduplication compares candidates as the bytes the security handler checks"""
+
+import unittest
+
+from pdfunlocker import dedup, vectorized
+
+
+class RevisionTest(unittest.TestCase):
+    candidates = ["é", b"\xe9", b"\xc3\xa9", "abc", b"abc", "€", b"\xe2\x82\xac"]
+
+    def deduplicated(self, revision):
+        return list(dedup.Deduplicator(self.candidates, revision=revision))
+
+    def test_latin1_revisions(self):
+        self.assertEqual(self.deduplicated(4), ["é", b"\xc3\xa9", "abc", "€"])
+
+    def test_utf8_revisions(self):
+        self.assertEqual(self.deduplicated(6), ["é", b"\xe9", "abc", "€"])
+
+    def test_unknown_revision_keeps_non_ascii_text_apart(self):
+        self.assertEqual(self.deduplicated(None),
+                         ["é", b"\xe9", b"\xc3\xa9", "abc", "€", b"\xe2\x82\xac"])
+
+    def test_without_numpy(self):
+        available = vectorized.NUMPY_AVAILABLE
+        vectorized.NUMPY_AVAILABLE = False
+        self.addCleanup(setattr, vectorized, "NUMPY_AVAILABLE", available)
+        self.assertEqual(self.deduplicated(4), ["é", b"\xc3\xa9", "abc", "€"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""Distributed recovery: a reported hit that does not open the file loses no candidates"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+from pdfunlocker import benchmark, core, distributed
+
+
+@unittest.skipIf(core.pikepdf is None, "pikepdf is not installed")
+class FalseHitTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "r4.pdf")
+        benchmark.build_fixture(self.path, 4, True, pages=1)
+
+    def test_rest_of_lease_is_checked(self):
+        candidates = ["alpha", "beta", "wrong", "gamma", benchmark.USER_PASSWORD, "delta"]
+        coordinator = distributed.Coordinator(self.path, candidates, address="127.0.0.1:0",
+                                              lease_size=len(candidates))
+        address = coordinator.listen()
+
+        # A worker that claims the third candidate opens the file
+        connection = distributed.connect(address)
+        try:
+            job = connection.request({"type": "hello", "version": distributed.PROTOCOL_VERSION,
+                                      "host": "fake", "pid": 1, "workers": 1})
+            self.assertEqual(job["type"], "job")
+            lease = connection.request({"type": "lease"})
+            self.assertEqual((lease["first"], lease["last"]), (0, len(candidates)))
+            rest = connection.request({"type": "found", "lease": lease["lease"], "checked": 3,
+                                       "index": 2,
+                                       "password": distributed.encode_candidate("wrong")})
+        finally:
+            connection.close()
+        self.assertEqual((rest["type"], rest["first"], rest["last"]),
+                         ("lease", 3, len(candidates)))
+        self.assertEqual(coordinator.completed, 3)
+
+        worker = threading.Thread(target=distributed.run_worker, args=(address, 1), daemon=True)
+        worker.start()
+        result = coordinator.run()
+        worker.join(30)
+
+        self.assertTrue(result.found)
+        self.assertEqual((result.password, result.index), (benchmark.USER_PASSWORD, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()